@@ -0,0 +1,96 @@
+"""MongoDB aggregation pipelines backing the /api/analytics routes.
+
+Every function here takes a Motor database handle and pushes the grouping work
+to the server, so results are exact no matter how large the collections grow.
+"""
+
+
+def _chart(rows):
+    """Turn [{"_id": label, "count": n}, ...] into the {labels, values} chart shape"""
+    return {
+        "labels": [row["_id"] for row in rows],
+        "values": [row["count"] for row in rows]
+    }
+
+
+DEPARTMENT_PLACEMENTS_PIPELINE = [
+    # One row per placed student, then attach the student's department
+    {"$group": {"_id": "$student_id"}},
+    {"$lookup": {
+        "from": "students",
+        "localField": "_id",
+        "foreignField": "id",
+        "as": "student"
+    }},
+    {"$unwind": "$student"},
+    {"$group": {"_id": "$student.department", "count": {"$sum": 1}}},
+    {"$sort": {"_id": 1}},
+]
+
+YEARLY_TRENDS_PIPELINE = [
+    # Offers not yet converted by the date migration still hold ISO strings
+    {"$group": {"_id": {"$cond": [
+        {"$eq": [{"$type": "$date"}, "string"]},
+        {"$substrCP": ["$date", 0, 4]},
+        {"$toString": {"$year": "$date"}}
+    ]}, "count": {"$sum": 1}}},
+    {"$sort": {"_id": 1}},
+]
+
+ROLE_DISTRIBUTION_PIPELINE = [
+    {"$group": {"_id": "$role", "count": {"$sum": 1}}},
+    {"$sort": {"_id": 1}},
+]
+
+COMPANY_PACKAGES_PIPELINE = [
+    {"$project": {"_id": "$name", "count": "$package"}},
+]
+
+OFFER_STATS_PIPELINE = [
+    {"$facet": {
+        "packages": [
+            {"$group": {"_id": None, "average": {"$avg": "$package"}, "sum": {"$sum": "$package"}}},
+        ],
+        "placed": [
+            {"$group": {"_id": "$student_id"}},
+            {"$count": "count"},
+        ],
+    }},
+]
+
+
+async def _aggregate(collection, pipeline):
+    return await collection.aggregate(pipeline, allowDiskUse=True).to_list(None)
+
+
+async def department_placements(db):
+    """Placed-student count per department"""
+    return _chart(await _aggregate(db.offers, DEPARTMENT_PLACEMENTS_PIPELINE))
+
+
+async def yearly_trends(db):
+    """Offer count per year, oldest first"""
+    return _chart(await _aggregate(db.offers, YEARLY_TRENDS_PIPELINE))
+
+
+async def role_distribution(db):
+    """Offer count per role"""
+    return _chart(await _aggregate(db.offers, ROLE_DISTRIBUTION_PIPELINE))
+
+
+async def company_packages(db):
+    """Listed package per company"""
+    return _chart(await _aggregate(db.companies, COMPANY_PACKAGES_PIPELINE))
+
+
+async def offer_stats(db):
+    """Package sum/average and distinct placed-student count across all offers"""
+    result = await _aggregate(db.offers, OFFER_STATS_PIPELINE)
+    facets = result[0] if result else {}
+    packages = facets.get("packages") or [{"average": 0, "sum": 0}]
+    placed = facets.get("placed") or [{"count": 0}]
+    return {
+        "average_package": packages[0]["average"] or 0,
+        "package_sum": packages[0]["sum"] or 0,
+        "placed_students": placed[0]["count"]
+    }
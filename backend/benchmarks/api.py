@@ -0,0 +1,405 @@
+"""Per-endpoint load benchmark covering every /api route.
+
+Runs the app in-process against the MongoDB in MONGO_URL / DB_NAME, sends
+``--requests`` requests per endpoint at ``--concurrency`` and reports
+throughput and p50/p95/p99 latency for each. ``--output`` saves the report
+as a JSON baseline; ``--baseline`` compares the run against a saved one and
+exits 1 when an endpoint got slower than ``--tolerance`` allows. Registered
+routes without a scenario are listed under "uncovered".
+
+Everything the write scenarios create is marked and deleted at the end, and
+the analytics summaries are rebuilt. Load a dataset first:
+
+    cd backend
+    export DB_NAME=placementiq_bench
+    python manage.py generate --students 100000 --drop
+    python -m benchmarks.api --output benchmarks/baselines/100k.json
+    python -m benchmarks.api --baseline benchmarks/baselines/100k.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import random
+import sys
+import time
+import uuid
+
+from fastapi.routing import APIRoute
+
+from benchmarks.asgi import lifespan, request, summarize, timed
+
+# Prefix carried by everything the write scenarios create, for cleanup
+MARKER = "BENCH-"
+IMPORT_ROWS = 100
+SAMPLE_SIZE = 200
+COLLECTIONS = ("students", "companies", "drives", "offers")
+
+
+class Context:
+    """Shared state of a run: auth, sampled ids and ids created so far"""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.counter = itertools.count()
+        self.token = None
+        self.credentials = None
+        self.samples = {}
+        self.created = {name: [] for name in COLLECTIONS}
+
+    def pick(self, kind):
+        return self.rng.choice(self.samples[kind])
+
+    def created_id(self, kind):
+        return self.created[kind][next(self.counter) % len(self.created[kind])]
+
+    def take_created(self, kind):
+        return self.created[kind].pop()
+
+
+def remember(kind):
+    """``after`` hook recording the id of a created document"""
+    def after(ctx, response):
+        ctx.created[kind].append(response.json()["id"])
+    return after
+
+
+class Scenario:
+    """One endpoint call pattern.
+
+    ``path``, ``params``, ``body`` and ``content`` may be callables taking
+    the ``Context``; ``requests`` caps the request count for expensive routes.
+    ``prepare`` is awaited with the server module and the ``Context`` first.
+    A ``stream`` request is timed until its first event, then disconnected.
+    """
+
+    def __init__(self, method, route, path=None, params=None, body=None, content=None,
+                 auth=False, label=None, requests=None, after=None, prepare=None, stream=False):
+        self.method = method
+        self.route = route
+        self.path = path or route
+        self.params = params
+        self.body = body
+        self.content = content
+        self.auth = auth
+        self.requests = requests
+        self.after = after
+        self.prepare = prepare
+        self.stream = stream
+        self.name = f"{method} {route}" + (f" [{label}]" if label else "")
+
+    def request_args(self, ctx):
+        resolve = lambda value: value(ctx) if callable(value) else value
+        headers = {"Authorization": f"Bearer {ctx.token}"} if self.auth else {}
+        args = {"params": resolve(self.params), "json_body": resolve(self.body), "headers": headers,
+                "stream": self.stream}
+        if self.content:
+            args["content"], headers["Content-Type"] = self.content(ctx)
+        return resolve(self.path), args
+
+
+def student_body(ctx):
+    n = next(ctx.counter)
+    return {
+        "name": "Bench Student", "roll_number": f"{MARKER}{n}", "department": "CSE",
+        "cgpa": 8.0, "email": f"bench{n}@example.com", "phone": "+910000000000",
+    }
+
+
+def company_body(ctx):
+    n = next(ctx.counter)
+    return {"name": f"{MARKER}Company {n}", "domain": "Product", "package": 12.0, "location": "Pune"}
+
+
+def drive_body(ctx):
+    return {
+        "company_id": ctx.pick("companies"), "date": "2024-06-01",
+        "eligible_departments": ["CSE", "IT"], "role": "Software Engineer", "description": MARKER,
+    }
+
+
+def offer_body(ctx):
+    return {
+        "student_id": ctx.pick("students"), "company_id": ctx.pick("companies"),
+        "package": 10.0, "role": f"{MARKER}Engineer", "date": "2024-06-01",
+    }
+
+
+def jsonl(build):
+    def content(ctx):
+        rows = (json.dumps(build(ctx)) for _ in range(IMPORT_ROWS))
+        return ("\n".join(rows) + "\n").encode(), "application/x-ndjson"
+    return content
+
+
+def remember_job(ctx, response):
+    ctx.samples["shortlist_jobs"] = [response.json()["id"]]
+
+
+async def wait_for_shortlists(server, ctx, timeout=600):
+    """Let the shortlist job finish, then sample drives that have a shortlist"""
+    deadline = time.monotonic() + timeout
+    job_ids = ctx.samples.get("shortlist_jobs") or [None]
+    while time.monotonic() < deadline:
+        job = await server.db.shortlist_jobs.find_one({"id": job_ids[0]})
+        if not job or job["status"] != "running":
+            break
+        await asyncio.sleep(0.5)
+    ctx.samples["shortlists"] = await server.db.shortlists.distinct("drive_id")
+
+
+def register_body(ctx):
+    username = f"bench-{uuid.uuid4().hex[:12]}"
+    return {"username": username, "email": f"{username}@example.com", "password": "bench-password"}
+
+
+def scenarios():
+    return [
+        Scenario("GET", "/api/"),
+        Scenario("GET", "/api/health"),
+        Scenario("GET", "/api/metrics"),
+        Scenario("GET", "/api/metrics/mongo-pool"),
+        Scenario("POST", "/api/auth/register", body=register_body, requests=20),
+        Scenario("POST", "/api/auth/login", body=lambda ctx: ctx.credentials, requests=50),
+        Scenario("GET", "/api/auth/me", auth=True),
+
+        Scenario("GET", "/api/students"),
+        Scenario("GET", "/api/students", label="after", params=lambda ctx: {"after": ctx.pick("students")}),
+        Scenario("GET", "/api/students", label="filtered", params={"department": "CSE", "min_cgpa": 8.5}),
+        Scenario("GET", "/api/students", label="fields", params={"fields": "name,department", "limit": 100}),
+        Scenario("GET", "/api/students/{student_id}", path=lambda ctx: f"/api/students/{ctx.pick('students')}"),
+        Scenario("GET", "/api/students/{student_id}/profile",
+                 path=lambda ctx: f"/api/students/{ctx.pick('students')}/profile"),
+        Scenario("GET", "/api/companies"),
+        Scenario("GET", "/api/companies/{company_id}", path=lambda ctx: f"/api/companies/{ctx.pick('companies')}"),
+        Scenario("GET", "/api/drives"),
+        Scenario("GET", "/api/drives", label="date range", params={"date_from": "2024-01-01", "date_to": "2024-12-31"}),
+        Scenario("GET", "/api/drives/{drive_id}", path=lambda ctx: f"/api/drives/{ctx.pick('drives')}"),
+        Scenario("GET", "/api/drives/{drive_id}/eligible",
+                 path=lambda ctx: f"/api/drives/{ctx.pick('drives')}/eligible"),
+        Scenario("GET", "/api/drives/{drive_id}/eligible", label="filtered",
+                 path=lambda ctx: f"/api/drives/{ctx.pick('drives')}/eligible",
+                 params={"min_cgpa": 8.0, "max_package": 10.0, "limit": 20}),
+        Scenario("GET", "/api/offers"),
+        Scenario("GET", "/api/offers", label="student", params=lambda ctx: {"student_id": ctx.pick("students")}),
+        Scenario("GET", "/api/offers", label="company", params=lambda ctx: {"company_id": ctx.pick("companies")}),
+        Scenario("GET", "/api/offers/{offer_id}", path=lambda ctx: f"/api/offers/{ctx.pick('offers')}"),
+
+        Scenario("GET", "/api/search", label="name", params={"q": "rahul sharma"}),
+        Scenario("GET", "/api/search", label="prefix", params={"q": "21CSE10"}),
+        Scenario("GET", "/api/search", label="typo", params={"q": "sofware enginer", "types": "drive"}),
+
+        Scenario("GET", "/api/analytics/department-placements"),
+        Scenario("GET", "/api/analytics/company-packages"),
+        Scenario("GET", "/api/analytics/yearly-trends"),
+        Scenario("GET", "/api/analytics/role-distribution"),
+        Scenario("GET", "/api/analytics/stats"),
+        Scenario("GET", "/api/analytics/package-distribution"),
+        Scenario("GET", "/api/analytics/package-distribution", label="filtered",
+                 params={"department": "CSE", "year": 2024, "bucket": 0.5}),
+        Scenario("GET", "/api/analytics/package-distribution/by-department"),
+        Scenario("GET", "/api/analytics/package-distribution/by-year"),
+        Scenario("GET", "/api/stream", label="first event", stream=True, requests=50),
+
+        Scenario("GET", "/api/export/{collection}", label="students ndjson", path="/api/export/students",
+                 params={"format": "ndjson"}, auth=True, requests=3),
+        Scenario("GET", "/api/export/{collection}", label="offers csv gzip", path="/api/export/offers",
+                 params={"format": "csv", "gzip": "true"}, auth=True, requests=3),
+        Scenario("GET", "/api/export/analytics/{view}", path="/api/export/analytics/department-placements",
+                 auth=True, requests=20),
+
+        Scenario("POST", "/api/students", body=student_body, auth=True, after=remember("students")),
+        Scenario("POST", "/api/companies", body=company_body, auth=True, after=remember("companies")),
+        Scenario("POST", "/api/drives", body=drive_body, auth=True, after=remember("drives")),
+        Scenario("POST", "/api/offers", body=offer_body, auth=True, after=remember("offers")),
+        Scenario("PUT", "/api/students/{student_id}", body=student_body, auth=True,
+                 path=lambda ctx: f"/api/students/{ctx.created_id('students')}"),
+        Scenario("PUT", "/api/companies/{company_id}", body=company_body, auth=True,
+                 path=lambda ctx: f"/api/companies/{ctx.created_id('companies')}"),
+        Scenario("PUT", "/api/drives/{drive_id}", body=drive_body, auth=True,
+                 path=lambda ctx: f"/api/drives/{ctx.created_id('drives')}"),
+        Scenario("DELETE", "/api/offers/{offer_id}", auth=True,
+                 path=lambda ctx: f"/api/offers/{ctx.take_created('offers')}"),
+        Scenario("DELETE", "/api/drives/{drive_id}", auth=True,
+                 path=lambda ctx: f"/api/drives/{ctx.take_created('drives')}"),
+        Scenario("DELETE", "/api/companies/{company_id}", auth=True,
+                 path=lambda ctx: f"/api/companies/{ctx.take_created('companies')}"),
+        Scenario("DELETE", "/api/students/{student_id}", auth=True,
+                 path=lambda ctx: f"/api/students/{ctx.take_created('students')}"),
+
+        Scenario("POST", "/api/import/students", params={"format": "jsonl"}, content=jsonl(student_body),
+                 auth=True, requests=20),
+        Scenario("POST", "/api/import/companies", params={"format": "jsonl"}, content=jsonl(company_body),
+                 auth=True, requests=20),
+        Scenario("POST", "/api/import/offers", params={"format": "jsonl"}, content=jsonl(offer_body),
+                 auth=True, requests=20),
+        Scenario("POST", "/api/analytics/rebuild", auth=True, requests=3),
+        Scenario("POST", "/api/seed", requests=10),
+
+        Scenario("POST", "/api/shortlists/jobs", body={"include_past": True}, auth=True, requests=1,
+                 after=remember_job),
+        Scenario("GET", "/api/shortlists/jobs/{job_id}",
+                 path=lambda ctx: f"/api/shortlists/jobs/{ctx.samples['shortlist_jobs'][0]}"),
+        Scenario("GET", "/api/shortlists/jobs"),
+        Scenario("GET", "/api/shortlists/{drive_id}", prepare=wait_for_shortlists,
+                 path=lambda ctx: f"/api/shortlists/{ctx.pick('shortlists')}"),
+    ]
+
+
+def api_routes(app):
+    """``METHOD /path`` of every registered /api route"""
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.path.startswith("/api"):
+            for method in sorted(route.methods - {"HEAD"}):
+                yield f"{method} {route.path}"
+
+
+async def run_scenario(app, scenario, ctx, requests, warmup, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+    statuses = {}
+
+    async def one(record):
+        async with semaphore:
+            try:
+                path, kwargs = scenario.request_args(ctx)
+            except (IndexError, KeyError, ZeroDivisionError):
+                # Nothing to act on, e.g. a delete scenario after a failed create
+                statuses["no fixture"] = statuses.get("no fixture", 0) + 1
+                return
+            response, elapsed = await timed(app, scenario.method, path, **kwargs)
+            if scenario.after and response.status < 300:
+                scenario.after(ctx, response)
+            if record:
+                samples.append(elapsed)
+                statuses[str(response.status)] = statuses.get(str(response.status), 0) + 1
+
+    await asyncio.gather(*(one(False) for _ in range(warmup)))
+    start = time.perf_counter()
+    await asyncio.gather(*(one(True) for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    summary = summarize(samples, elapsed)
+    summary["statuses"] = statuses
+    summary["errors"] = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+    return summary
+
+
+async def sample_ids(db, collection, size=SAMPLE_SIZE):
+    pipeline = [{"$sample": {"size": size}}, {"$project": {"_id": 0, "id": 1}}]
+    return [doc["id"] for doc in await db[collection].aggregate(pipeline).to_list(None)]
+
+
+async def cleanup(server):
+    """Delete everything the scenarios created and rebuild the summaries"""
+    db = server.db
+    marked = {"$regex": f"^{MARKER}"}
+    bench_students = await db.students.distinct("id", {"roll_number": marked})
+    deleted = {
+        "offers": await db.offers.delete_many({"$or": [{"role": marked}, {"student_id": {"$in": bench_students}}]}),
+        "drives": await db.drives.delete_many({"description": MARKER}),
+        "companies": await db.companies.delete_many({"name": marked}),
+        "students": await db.students.delete_many({"roll_number": marked}),
+        "users": await db.users.delete_many({"username": {"$regex": "^bench-"}}),
+        "shortlist_jobs": await db.shortlist_jobs.delete_many({"requested_by": {"$regex": "^bench-"}}),
+    }
+    await server.summaries.rebuild(db)
+    server.response_cache.bump(*server.ALL_COLLECTIONS)
+    server.principal_cache.clear()
+    return {name: result.deleted_count for name, result in deleted.items()}
+
+
+def compare(report, baseline, tolerance, slack_ms):
+    """Endpoints that got slower, lost throughput or gained errors"""
+    regressions = []
+    for name, base in baseline["endpoints"].items():
+        current = report["endpoints"].get(name)
+        if current is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if current[metric] > base[metric] * (1 + tolerance) + slack_ms:
+                regressions.append({"endpoint": name, "metric": metric,
+                                    "baseline": base[metric], "current": current[metric]})
+        if current.get("throughput_rps", 0) < base.get("throughput_rps", 0) * (1 - tolerance):
+            regressions.append({"endpoint": name, "metric": "throughput_rps",
+                                "baseline": base["throughput_rps"], "current": current.get("throughput_rps", 0)})
+        if current["errors"] > base["errors"]:
+            regressions.append({"endpoint": name, "metric": "errors",
+                                "baseline": base["errors"], "current": current["errors"]})
+    return regressions
+
+
+async def main(args):
+    import server
+
+    ctx = Context(args.seed)
+    report = {"endpoints": {}}
+    async with lifespan(server.app):
+        db = server.db
+        dataset = {name: await db[name].estimated_document_count() for name in COLLECTIONS}
+        if not all(dataset.values()):
+            print("Every collection needs data; run `python manage.py generate` first", file=sys.stderr)
+            return 2
+        for name in COLLECTIONS:
+            ctx.samples[name] = await sample_ids(db, name)
+
+        ctx.credentials = {"username": f"bench-{uuid.uuid4().hex[:12]}", "password": "bench-password"}
+        response = await request(server.app, "POST", "/api/auth/register", json_body={
+            **ctx.credentials, "email": f"{ctx.credentials['username']}@example.com"
+        })
+        ctx.token = response.json()["access_token"]
+
+        try:
+            for scenario in scenarios():
+                if args.only and not any(part in scenario.name for part in args.only):
+                    continue
+                requests = min(args.requests, scenario.requests or args.requests)
+                warmup = min(args.warmup, scenario.requests // 10) if scenario.requests else args.warmup
+                if scenario.prepare:
+                    await scenario.prepare(server, ctx)
+                summary = await run_scenario(server.app, scenario, ctx, requests, warmup, args.concurrency)
+                report["endpoints"][scenario.name] = summary
+                print(f"{scenario.name}: p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms, "
+                      f"p99 {summary['p99_ms']} ms, {summary.get('throughput_rps', 0)} req/s", file=sys.stderr)
+        finally:
+            report["cleanup"] = await cleanup(server)
+
+    covered = {f"{scenario.method} {scenario.route}" for scenario in scenarios()}
+    report["uncovered"] = sorted(set(api_routes(server.app)) - covered)
+    report["meta"] = {
+        "dataset": dataset,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "warmup": args.warmup,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("dataset") != dataset:
+            print("Warning: dataset differs from the baseline's; comparisons are approximate", file=sys.stderr)
+        report["regressions"] = compare(report, baseline, args.tolerance, args.slack_ms)
+        status = 1 if report["regressions"] else 0
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    print(json.dumps(report, indent=2))
+    return status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per endpoint")
+    parser.add_argument("--only", nargs="+", help="Run only endpoints whose name contains one of these")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the report here, e.g. as a new baseline")
+    parser.add_argument("--baseline", help="Compare against this saved report; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown")
+    parser.add_argument("--slack-ms", type=float, default=2.0, help="Allowed absolute slowdown on top")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,135 @@
+"""Minimal in-process ASGI driver used by the benchmarks.
+
+Requests are dispatched straight into the ASGI app, so measurements include
+routing, validation, serialization and MongoDB time but no network stack.
+"""
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlencode
+
+
+class ASGIResponse:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+async def request(app, method, path, params=None, json_body=None, headers=None, content=None, stream=False):
+    """Send one HTTP request to ``app`` and collect the full response.
+
+    ``content`` is a raw request body; its content type goes in ``headers``.
+    With ``stream`` the client disconnects after the first non-empty body
+    chunk, for responses that never end such as Server-Sent Events.
+    """
+    body = content or b""
+    raw_headers = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    if json_body is not None:
+        body = json.dumps(json_body).encode()
+        raw_headers.append((b"content-type", b"application/json"))
+    raw_headers.append((b"content-length", str(len(body)).encode()))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": urlencode(params or {}, doseq=True).encode(),
+        "headers": raw_headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    sent = False
+    disconnected = asyncio.Event()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    status = None
+    response_headers = {}
+    chunks = []
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers.update(
+                (k.decode().lower(), v.decode()) for k, v in message.get("headers", [])
+            )
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if stream and chunks[-1]:
+                disconnected.set()
+
+    await app(scope, receive, send)
+    return ASGIResponse(status, response_headers, b"".join(chunks))
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Run the app's startup and shutdown handlers around a block"""
+    startup_done = asyncio.Event()
+    shutdown = asyncio.Event()
+    messages = asyncio.Queue()
+    await messages.put({"type": "lifespan.startup"})
+
+    async def receive():
+        message = await messages.get()
+        if message["type"] == "lifespan.shutdown":
+            shutdown.set()
+        return message
+
+    async def send(message):
+        if message["type"].startswith("lifespan.startup"):
+            startup_done.set()
+            if message["type"] == "lifespan.startup.failed":
+                raise RuntimeError(message.get("message", "startup failed"))
+
+    task = asyncio.create_task(app({"type": "lifespan", "asgi": {"version": "3.0"}}, receive, send))
+    await startup_done.wait()
+    try:
+        yield
+    finally:
+        await messages.put({"type": "lifespan.shutdown"})
+        await task
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(samples_ms, elapsed_s=None):
+    summary = {
+        "count": len(samples_ms),
+        "p50_ms": round(percentile(samples_ms, 50), 3),
+        "p95_ms": round(percentile(samples_ms, 95), 3),
+        "p99_ms": round(percentile(samples_ms, 99), 3),
+        "max_ms": round(max(samples_ms), 3) if samples_ms else 0.0,
+    }
+    if elapsed_s:
+        summary["throughput_rps"] = round(len(samples_ms) / elapsed_s, 1)
+    return summary
+
+
+async def timed(app, method, path, **kwargs):
+    """Like ``request`` but also returns the latency in milliseconds"""
+    start = time.perf_counter()
+    response = await request(app, method, path, **kwargs)
+    return response, (time.perf_counter() - start) * 1000
@@ -0,0 +1,101 @@
+"""Large list responses: response_model validation vs the trusted orjson path.
+
+Generates students and offers with ``datagen``, round-trips them through
+BSON so they look exactly like documents read from MongoDB, and serves them
+from two routes with the same ``response_model``: one returning the dicts
+(FastAPI validates and serializes them) and one returning
+``fastjson.trusted_response``. For each size it reports per-request latency,
+peak memory allocated during one request (tracemalloc) and whether both
+routes produced the same JSON. No database is needed.
+
+    cd backend
+    python -m benchmarks.list_responses --rows 1000 10000 100000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import tracemalloc
+from typing import List
+
+import bson
+from fastapi import FastAPI
+
+import datagen
+import fastjson
+from benchmarks.asgi import request
+from dates import CODEC_OPTIONS
+
+
+def make_docs(kind, count):
+    generator = datagen.Generator(seed=42)
+    if kind == "students":
+        docs = list(generator.students(count))
+    else:
+        students = [(doc["id"], doc["name"]) for doc in generator.students(min(count, 10000))]
+        companies = [(doc["id"], doc["name"], doc["package"]) for doc in generator.companies(100)]
+        docs = list(generator.offers(count, students, companies))
+    return [bson.decode(bson.encode(doc, codec_options=CODEC_OPTIONS), codec_options=CODEC_OPTIONS)
+            for doc in docs]
+
+
+def build_app(model, docs):
+    app = FastAPI()
+
+    @app.get("/validated", response_model=List[model])
+    async def validated():
+        return docs
+
+    @app.get("/trusted", response_model=List[model])
+    async def trusted():
+        return fastjson.trusted_response(docs, model)
+
+    return app
+
+
+async def measure(app, path, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = await request(app, "GET", path)
+        samples.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    await request(app, "GET", path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return response, {
+        "median_ms": round(statistics.median(samples), 2),
+        "min_ms": round(min(samples), 2),
+        "peak_alloc_mb": round(peak / 1e6, 2),
+        "bytes": len(response.body),
+    }
+
+
+async def main(args):
+    import server
+
+    models = {"students": server.Student, "offers": server.Offer}
+    results = {}
+    for kind in args.models:
+        for count in args.rows:
+            app = build_app(models[kind], make_docs(kind, count))
+            repeat = max(3, args.repeat * 1000 // count) if count < 10000 else args.repeat
+            validated, validated_stats = await measure(app, "/validated", repeat)
+            trusted, trusted_stats = await measure(app, "/trusted", repeat)
+            results[f"{kind}/{count}"] = {
+                "validated": validated_stats,
+                "trusted": trusted_stats,
+                "speedup": round(validated_stats["median_ms"] / trusted_stats["median_ms"], 2),
+                "same_json": json.loads(validated.body) == json.loads(trusted.body),
+            }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--models", nargs="+", default=["students", "offers"], choices=["students", "offers"])
+    parser.add_argument("--repeat", type=int, default=5, help="Requests per size (more for small sizes)")
+    asyncio.run(main(parser.parse_args()))
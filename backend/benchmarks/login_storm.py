@@ -0,0 +1,81 @@
+"""Login storm benchmark: /api/health latency while bcrypt work piles up.
+
+Runs the app in-process against the MongoDB in MONGO_URL, measures
+/api/health latency at rest, then again while a burst of concurrent logins
+hits /api/auth/login. With password work on the bounded pool the health
+p99 should stay flat; overflowing logins are answered with 503.
+
+    cd backend
+    python -m benchmarks.login_storm --logins 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from benchmarks.asgi import lifespan, request, summarize, timed
+
+
+async def probe_health(app, stop, interval):
+    samples = []
+    while not stop.is_set():
+        _, elapsed = await timed(app, "GET", "/api/health")
+        samples.append(elapsed)
+        await asyncio.sleep(interval)
+    return samples
+
+
+async def login_storm(app, credentials, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = {}
+
+    async def one_login():
+        async with semaphore:
+            response = await request(app, "POST", "/api/auth/login", json_body=credentials)
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+
+    await asyncio.gather(*(one_login() for _ in range(total)))
+    return statuses
+
+
+async def main(args):
+    import server
+
+    credentials = {"username": f"bench-{uuid.uuid4().hex[:8]}", "password": "bench-password"}
+    async with lifespan(server.app):
+        await request(server.app, "POST", "/api/auth/register", json_body={
+            **credentials, "email": f"{credentials['username']}@example.com"
+        })
+
+        stop = asyncio.Event()
+        probe = asyncio.create_task(probe_health(server.app, stop, args.interval))
+        await asyncio.sleep(args.baseline_seconds)
+        stop.set()
+        baseline = await probe
+
+        stop = asyncio.Event()
+        probe = asyncio.create_task(probe_health(server.app, stop, args.interval))
+        start = time.perf_counter()
+        statuses = await login_storm(server.app, credentials, args.logins, args.concurrency)
+        storm_seconds = time.perf_counter() - start
+        stop.set()
+        during = await probe
+
+        await server.db.users.delete_one({"username": credentials["username"]})
+
+    print(json.dumps({
+        "health_at_rest": summarize(baseline),
+        "health_during_storm": summarize(during),
+        "logins": {"total": args.logins, "seconds": round(storm_seconds, 2), "statuses": statuses},
+        "password_pool": server.password_pool.stats(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.01, help="Seconds between health probes")
+    parser.add_argument("--baseline-seconds", type=float, default=2.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,64 @@
+"""Package distribution analytics over large offer sets.
+
+Fills a ``packages.PackageIndex`` with generated offers (``datagen``, no
+database needed) and times each distribution query, reporting the median
+and worst latency per query and the time taken to build the columns.
+
+    cd backend
+    python -m benchmarks.package_distribution --offers 100000 1000000
+"""
+import argparse
+import json
+import statistics
+import time
+
+import datagen
+import packages
+
+
+def build_index(count):
+    generator = datagen.Generator(seed=42)
+    students = list(generator.students(max(1, count // 10)))
+    companies = [(doc["id"], doc["name"], doc["package"]) for doc in generator.companies(100)]
+    offers = list(generator.offers(count, [(doc["id"], doc["name"]) for doc in students], companies))
+
+    start = time.perf_counter()
+    columns = packages.OfferColumns(capacity=count)
+    for student in students:
+        columns.set_student(student["id"], student["department"])
+    columns.add(offers)
+    index = packages.PackageIndex()
+    index._columns = columns
+    index.loaded_at = time.monotonic()
+    return index, time.perf_counter() - start, students[0]["department"]
+
+
+def main(args):
+    results = {}
+    for count in args.offers:
+        index, build_seconds, department = build_index(count)
+        queries = {
+            "overall": lambda: index.distribution(args.bucket),
+            "one_department_year": lambda: index.distribution(args.bucket, department, 2024),
+            "by_department": lambda: index.by_department(args.bucket),
+            "by_year": lambda: index.by_year(args.bucket),
+        }
+        timings = {}
+        for name, query in queries.items():
+            query()
+            samples = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                query()
+                samples.append((time.perf_counter() - start) * 1000)
+            timings[name] = {"median_ms": round(statistics.median(samples), 2), "max_ms": round(max(samples), 2)}
+        results[str(count)] = {"build_ms": round(build_seconds * 1000, 1), "queries": timings}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--offers", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--bucket", type=float, default=1.0, help="Histogram bucket width in LPA")
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,99 @@
+"""Serialization cost of list responses: legacy ISO strings vs native BSON dates.
+
+Builds synthetic offers, encodes them to BSON both ways, then times what a
+list request does with them: BSON decode, the legacy per-document
+``fromisoformat`` loop (string layout only), response model validation and
+JSON encoding. No database is needed.
+
+    cd backend
+    python -m benchmarks.serialization --rows 1000 10000 100000
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import bson
+from pydantic import TypeAdapter
+
+from dates import CODEC_OPTIONS
+
+
+def make_offers(count, native):
+    rng = random.Random(42)
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    offers = []
+    for _ in range(count):
+        created_at = start + timedelta(seconds=rng.randint(0, 3 * 365 * 86400))
+        offer_date = created_at.replace(hour=0, minute=0, second=0)
+        offers.append({
+            "id": str(uuid.uuid4()),
+            "student_id": str(uuid.uuid4()),
+            "student_name": "Student Name",
+            "company_id": str(uuid.uuid4()),
+            "company_name": "Company Name",
+            "package": round(rng.uniform(5, 20), 2),
+            "role": "Software Engineer",
+            "date": offer_date if native else offer_date.date().isoformat(),
+            "created_at": created_at if native else created_at.isoformat(),
+        })
+    return [bson.encode(offer, codec_options=CODEC_OPTIONS) for offer in offers]
+
+
+def run(raw_docs, adapter, legacy):
+    gc.collect()
+    gc.disable()
+    try:
+        return _run(raw_docs, adapter, legacy)
+    finally:
+        gc.enable()
+
+
+def _run(raw_docs, adapter, legacy):
+    start = time.perf_counter()
+    docs = [bson.decode(raw, codec_options=CODEC_OPTIONS) for raw in raw_docs]
+    decoded = time.perf_counter()
+    if legacy:
+        for doc in docs:
+            if isinstance(doc.get('created_at'), str):
+                doc['created_at'] = datetime.fromisoformat(doc['created_at'])
+    prepared = time.perf_counter()
+    models = adapter.validate_python(docs)
+    validated = time.perf_counter()
+    adapter.dump_json(models)
+    encoded = time.perf_counter()
+    return {
+        "decode_ms": round((decoded - start) * 1000, 2),
+        "prepare_ms": round((prepared - decoded) * 1000, 2),
+        "validate_ms": round((validated - prepared) * 1000, 2),
+        "encode_ms": round((encoded - validated) * 1000, 2),
+        "total_ms": round((encoded - start) * 1000, 2),
+    }
+
+
+def main(args):
+    import server
+
+    adapter = TypeAdapter(List[server.Offer])
+    results = {}
+    for count in args.rows:
+        legacy_docs = make_offers(count, native=False)
+        native_docs = make_offers(count, native=True)
+        best = {}
+        for name, raw_docs, legacy in (("iso_strings", legacy_docs, True), ("bson_dates", native_docs, False)):
+            runs = [run(raw_docs, adapter, legacy) for _ in range(args.repeat)]
+            best[name] = min(runs, key=lambda r: r["total_ms"])
+        best["speedup"] = round(best["iso_strings"]["total_ms"] / best["bson_dates"]["total_ms"], 2)
+        results[count] = best
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,87 @@
+"""Cold start benchmark: time from process launch to the first response.
+
+Each run starts a fresh interpreter that imports the app, runs its lifespan
+startup and answers one request in-process, and reports where the time
+went: interpreter start, ``import server``, startup, and the first request.
+Runs are repeated for each ``STARTUP_MODE`` and the medians are printed.
+Uses the MongoDB in MONGO_URL; eager startup talks to it before serving.
+
+    cd backend
+    python -m benchmarks.startup --runs 5 --modes eager lazy
+    python -m benchmarks.startup --path /api/analytics/stats
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+async def child(path):
+    start = time.perf_counter()
+    import server
+    from benchmarks.asgi import lifespan, request
+
+    imported = time.perf_counter()
+    async with lifespan(server.app):
+        started = time.perf_counter()
+        response = await request(server.app, "GET", path)
+        answered = time.perf_counter()
+        # Wall clock, so the parent can measure from the moment it launched us
+        first_response_at = time.time()
+    print(json.dumps({
+        "status": response.status,
+        "import_seconds": imported - start,
+        "startup_seconds": started - imported,
+        "request_seconds": answered - started,
+        "first_response_at": first_response_at,
+    }))
+
+
+def run_once(mode, path, auto_seed):
+    env = {**os.environ, "STARTUP_MODE": mode, "AUTO_SEED": "true" if auto_seed else "false"}
+    launched_at = time.time()
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--child", "--path", path],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    sample = json.loads(result.stdout.strip().splitlines()[-1])
+    sample["time_to_first_response"] = sample.pop("first_response_at") - launched_at
+    sample["interpreter_seconds"] = (
+        sample["time_to_first_response"] - sample["import_seconds"] - sample["startup_seconds"]
+        - sample["request_seconds"]
+    )
+    return sample
+
+
+def main(args):
+    report = {}
+    for mode in args.modes:
+        samples = [run_once(mode, args.path, args.auto_seed) for _ in range(args.runs)]
+        report[mode] = {
+            "status": sorted({sample["status"] for sample in samples}),
+            **{
+                label: round(statistics.median(sample[name] for sample in samples) * 1000, 1)
+                for label, name in (("first_response", "time_to_first_response"),
+                                    ("interpreter", "interpreter_seconds"), ("import", "import_seconds"),
+                                    ("startup", "startup_seconds"), ("request", "request_seconds"))
+            },
+        }
+    print(json.dumps({"path": args.path, "runs": args.runs, "median_ms": report}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modes", nargs="+", default=["eager", "lazy"], choices=["eager", "lazy"])
+    parser.add_argument("--path", default="/api/health", help="Route requested once the app has started")
+    parser.add_argument("--auto-seed", action="store_true", help="Leave AUTO_SEED on (off by default)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        asyncio.run(child(args.path))
+    else:
+        main(args)
@@ -0,0 +1,255 @@
+"""Streaming CSV/JSONL bulk import.
+
+The request body is parsed incrementally and processed in fixed-size chunks:
+each chunk is validated, its foreign keys are resolved with one batched
+query, and the valid rows are written with a single unordered
+``insert_many``. Only one chunk and a capped error list are held in memory,
+so memory use does not grow with the size of the upload.
+"""
+import codecs
+import csv
+import json
+from collections import deque
+
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+FORMATS = ("csv", "jsonl")
+# A CSV record (quoted newlines included) longer than this is rejected instead of buffered
+MAX_RECORD_CHARS = 1 << 20
+
+
+async def _line_batches(stream):
+    """Decode a byte stream into batches of text lines (newlines kept), one batch per chunk"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in stream:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        if len(pending) > MAX_RECORD_CHARS:
+            # Hand over an overlong line rather than buffering it; it is rejected as a record
+            lines.append(pending)
+            pending = ""
+        if lines:
+            # \r\n becomes \n, inside quoted fields too
+            yield [line.rstrip("\r") + "\n" for line in lines]
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield [pending]
+
+
+async def _lines(stream):
+    """Decode a byte stream into text lines without buffering the whole body"""
+    async for lines in _line_batches(stream):
+        for line in lines:
+            yield line.rstrip("\r\n")
+
+
+class _NeedMore(Exception):
+    """The CSV record continues past the lines received so far"""
+
+
+class _RecordTooLong(Exception):
+    pass
+
+
+class _LineFeed:
+    """Lines for ``csv.reader``, refilled from the request body as it arrives.
+
+    The lines handed out since the last complete record are kept: when the
+    reader runs out in the middle of a record (a quoted field spanning lines),
+    they are put back and the record is read again once more lines are in.
+    """
+
+    def __init__(self):
+        self.lines = deque()
+        self.record = []
+        self.record_chars = 0
+        self.finished = False
+        self.ran_out = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.lines:
+            if self.finished:
+                self.ran_out = True
+                raise StopIteration
+            raise _NeedMore()
+        line = self.lines.popleft()
+        self.record.append(line)
+        self.record_chars += len(line)
+        if self.record_chars > MAX_RECORD_CHARS:
+            raise _RecordTooLong()
+        return line
+
+    def commit(self):
+        self.record = []
+        self.record_chars = 0
+
+    def rewind(self, skip=0):
+        """Put the current record's lines back, less the first ``skip``"""
+        self.lines.extendleft(reversed(self.record[skip:]))
+        self.commit()
+
+
+def _read_records(feed, reader):
+    """``(values, error)`` for each record completed by the lines in ``feed``"""
+    while True:
+        try:
+            values = next(reader)
+        except _NeedMore:
+            feed.rewind()
+            return
+        except StopIteration:
+            return
+        except _RecordTooLong:
+            # Most likely an unbalanced quote: skip the line it starts on and read on from the next one
+            feed.rewind(skip=1)
+            yield None, f"Record longer than {MAX_RECORD_CHARS} characters (unbalanced quote?)"
+            continue
+        except csv.Error as e:
+            feed.commit()
+            yield None, f"Invalid CSV: {e}"
+            continue
+        feed.commit()
+        if feed.ran_out:
+            # The body ended inside a quoted field
+            yield None, "Unterminated quoted field"
+            return
+        yield values, None
+
+
+async def _csv_records(stream):
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    async for lines in _line_batches(stream):
+        feed.lines.extend(lines)
+        for record in _read_records(feed, reader):
+            yield record
+    feed.finished = True
+    for record in _read_records(feed, reader):
+        yield record
+
+
+async def iter_rows(stream, fmt):
+    """Yield ``(row_number, row, error)`` for each record in the stream.
+
+    Row numbers are 1-based data rows (the CSV header is not counted). Empty
+    CSV cells are left out of the row so optional fields fall back to their
+    defaults.
+    """
+    row_number = 0
+    if fmt == "jsonl":
+        async for line in _lines(stream):
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield row_number, None, f"Invalid JSON: {e.msg}"
+                continue
+            if not isinstance(row, dict):
+                yield row_number, None, "Each line must be a JSON object"
+                continue
+            yield row_number, row, None
+        return
+
+    header = None
+    async for values, error in _csv_records(stream):
+        if error is None and (not values or (len(values) == 1 and not values[0].strip())):
+            continue
+        if header is None and error is None:
+            header = [name.strip() for name in values]
+            continue
+        row_number += 1
+        if error is not None:
+            yield row_number, None, error
+            continue
+        if len(values) != len(header):
+            yield row_number, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield row_number, {k: v for k, v in zip(header, values) if v != ""}, None
+
+
+def _describe(error):
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(p) for p in e['loc']) or 'row'}: {e['msg']}" for e in error.errors()
+        )
+    return str(error)
+
+
+class ImportReport:
+    def __init__(self, max_errors=MAX_REPORTED_ERRORS):
+        self.max_errors = max_errors
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, row_number, message):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row_number, "error": message})
+
+    def as_dict(self):
+        return {
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors)
+        }
+
+
+async def run_import(rows, collection, build_doc, resolve_chunk=None, after_insert=None,
+                     chunk_size=CHUNK_SIZE):
+    """Validate and insert ``rows`` chunk by chunk.
+
+    ``build_doc(row, context)`` turns a raw row into the document to insert
+    and raises ``ValidationError``/``ValueError``/``LookupError`` to reject
+    it. ``resolve_chunk(rows)`` runs once per chunk and returns the
+    ``context`` (e.g. foreign key lookups). ``after_insert(docs, context)``
+    receives the documents that were actually written.
+    """
+    report = ImportReport()
+    chunk = []
+
+    async def flush():
+        context = await resolve_chunk([row for _, row in chunk]) if resolve_chunk else None
+        docs, numbers = [], []
+        for row_number, row in chunk:
+            try:
+                docs.append(build_doc(row, context))
+                numbers.append(row_number)
+            except (ValidationError, ValueError, LookupError) as e:
+                report.add_error(row_number, _describe(e))
+        chunk.clear()
+        if not docs:
+            return
+
+        failed_indexes = set()
+        try:
+            await collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                failed_indexes.add(write_error["index"])
+                report.add_error(numbers[write_error["index"]], write_error.get("errmsg", "Write failed"))
+        written = [doc for index, doc in enumerate(docs) if index not in failed_indexes]
+        report.inserted += len(written)
+        if written and after_insert:
+            await after_insert(written, context)
+
+    async for row_number, row, error in rows:
+        if error:
+            report.add_error(row_number, error)
+            continue
+        chunk.append((row_number, row))
+        if len(chunk) >= chunk_size:
+            await flush()
+    if chunk:
+        await flush()
+    return report.as_dict()
@@ -0,0 +1,271 @@
+"""Small in-process caches used by the API.
+
+``TTLCache`` is a bounded LRU map whose entries also expire after a fixed
+time-to-live. It keeps hit/miss/eviction counters so cache effectiveness can
+be reported.
+
+``ResponseCache`` and ``ResponseCacheMiddleware`` cache whole HTTP responses
+for read-mostly routes and answer conditional requests with 304.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+
+class TTLCache:
+    def __init__(self, max_size=1024, ttl=60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0 and self.ttl > 0
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class ResponseCache:
+    """Cache of serialized GET responses, invalidated by collection versions.
+
+    ``routes`` maps a request path to the collections its response is built
+    from. Write handlers call ``bump`` for the collections they change; any
+    cached response built from an older version of one of its collections is
+    treated as a miss. Entries also expire after ``ttl`` seconds, which bounds
+    staleness across processes that do not see each other's bumps, and the
+    total cached body size is capped at ``max_bytes`` (LRU eviction).
+
+    ``partition`` returns the data partition (tenant) being served; entries
+    and collection versions are kept apart per partition.
+    """
+
+    def __init__(self, routes, ttl=30.0, max_bytes=16 * 1024 * 1024, partition=lambda: None):
+        self.routes = routes
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.partition = partition
+        self._versions = {}
+        self._modified = {}
+        self._started = datetime.now(timezone.utc).replace(microsecond=0)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._route_stats = {path: {"hits": 0, "misses": 0, "not_modified": 0} for path in routes}
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_bytes > 0
+
+    def bump(self, *collections):
+        """Invalidate every cached response built from ``collections``"""
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        partition = self.partition()
+        for name in collections:
+            key = (partition, name)
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self._modified[key] = now
+
+    def snapshot(self, path):
+        """Current ``(versions, last_modified)`` of the collections behind ``path``"""
+        collections = [(self.partition(), name) for name in self.routes[path]]
+        versions = tuple(self._versions.get(key, 0) for key in collections)
+        last_modified = max((self._modified.get(key, self._started) for key in collections))
+        return versions, last_modified
+
+    def get(self, key, versions):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry["versions"] != versions or entry["expires_at"] <= time.monotonic():
+            self._discard(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, versions, last_modified, status, headers, body):
+        if not self.enabled or len(body) > self.max_bytes:
+            return None
+        self._discard(key)
+        entry = {
+            "versions": versions,
+            "expires_at": time.monotonic() + self.ttl,
+            "etag": '"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+            "last_modified": last_modified,
+            "status": status,
+            "headers": headers,
+            "body": body,
+        }
+        self._entries[key] = entry
+        self._bytes += len(body)
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+        return entry
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry["body"])
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def record(self, path, outcome):
+        self._route_stats[path][outcome] += 1
+
+    def stats(self):
+        routes = {}
+        for path, counts in self._route_stats.items():
+            lookups = counts["hits"] + counts["misses"]
+            routes[path] = {**counts, "hit_ratio": round(counts["hits"] / lookups, 4) if lookups else 0.0}
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "routes": routes
+        }
+
+
+def _is_fresh(entry, request_headers):
+    """Whether the client's conditional headers match the cached entry"""
+    if_none_match = request_headers.get(b"if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.decode("latin-1").split(",")]
+        return "*" in tags or entry["etag"] in tags
+    if_modified_since = request_headers.get(b"if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since.decode("latin-1"))
+        except (TypeError, ValueError):
+            return False
+        return entry["last_modified"] <= since
+    return False
+
+
+class ResponseCacheMiddleware:
+    """ASGI middleware serving cached GET responses with ETag/Last-Modified.
+
+    Conditional requests that match the cached validators get a 304 without
+    reaching the route handler, so no database work happens at all.
+    """
+
+    def __init__(self, app, cache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path")
+        if (scope["type"] != "http" or scope["method"] != "GET"
+                or path not in self.cache.routes or not self.cache.enabled):
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = dict(scope["headers"])
+        query = "&".join(sorted(scope.get("query_string", b"").decode("latin-1").split("&")))
+        key = (self.cache.partition(), path, query)
+        versions, last_modified = self.cache.snapshot(path)
+
+        entry = self.cache.get(key, versions)
+        if entry is not None:
+            self.cache.record(path, "hits")
+        else:
+            self.cache.record(path, "misses")
+            entry = await self._fill(scope, receive, send, key, versions, last_modified)
+            if entry is None:
+                return
+
+        if _is_fresh(entry, request_headers):
+            self.cache.record(path, "not_modified")
+            await send({"type": "http.response.start", "status": 304,
+                        "headers": self._validators(entry)})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await self._send_entry(entry, send)
+
+    async def _fill(self, scope, receive, send, key, versions, last_modified):
+        """Run the handler, caching a 200 response; anything else passes through"""
+        start = {}
+        chunks = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        body = b"".join(chunks)
+        headers = [(k, v) for k, v in start.get("headers", []) if k.lower() != b"content-length"]
+        entry = None
+        if start.get("status") == 200:
+            entry = self.cache.put(key, versions, last_modified, 200, headers, body)
+        if entry is None:
+            entry = {"status": start.get("status", 500), "headers": headers, "body": body,
+                     "etag": None, "last_modified": None}
+            await self._send_entry(entry, send)
+            return None
+        return entry
+
+    @staticmethod
+    def _validators(entry):
+        if entry["etag"] is None:
+            return []
+        return [
+            (b"etag", entry["etag"].encode()),
+            (b"last-modified", format_datetime(entry["last_modified"], usegmt=True).encode()),
+            (b"cache-control", b"no-cache"),
+        ]
+
+    async def _send_entry(self, entry, send):
+        headers = entry["headers"] + self._validators(entry)
+        headers.append((b"content-length", str(len(entry["body"])).encode()))
+        await send({"type": "http.response.start", "status": entry["status"], "headers": headers})
+        await send({"type": "http.response.body", "body": entry["body"]})
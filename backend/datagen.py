@@ -0,0 +1,147 @@
+"""Synthetic data at realistic scale, built from the seed data vocabulary.
+
+``Generator`` produces plain documents shaped exactly like the stored models
+(``Student(...).model_dump()`` etc.) without constructing a model per row.
+With a fixed seed the output, ids included, is reproducible.
+``fixtures.load`` writes them to MongoDB.
+
+    python manage.py generate --students 100000 --drop
+"""
+import random
+from datetime import date, datetime, timezone
+
+DEPARTMENTS = ["CSE", "ECE", "ME", "EEE", "IT", "Civil"]
+DOMAINS = ["IT Services", "Product", "Consulting", "Finance", "E-commerce", "Healthcare"]
+ROLES = ["Software Engineer", "Data Analyst", "Product Manager", "ML Engineer", "Full Stack Developer", "DevOps Engineer"]
+LOCATIONS = ["Bangalore", "Hyderabad", "Pune", "Mumbai", "Delhi", "Chennai"]
+
+FIRST_NAMES = ["Rahul", "Priya", "Amit", "Sneha", "Vikram", "Anjali", "Rohan", "Neha", "Karan", "Pooja",
+               "Aditya", "Divya", "Arjun", "Riya", "Sanjay", "Kavya", "Nikhil", "Shreya", "Akash", "Tanvi",
+               "Varun", "Ananya", "Harsh", "Ishita", "Gaurav", "Meera", "Siddharth", "Nisha", "Manish", "Sakshi",
+               "Rajesh", "Preeti", "Abhishek", "Swati", "Deepak", "Ritika", "Suresh", "Pallavi", "Vishal", "Megha",
+               "Naveen", "Simran", "Ashish", "Aditi", "Mohit", "Kritika", "Sandeep", "Shweta", "Pankaj", "Aarti"]
+
+LAST_NAMES = ["Sharma", "Verma", "Singh", "Kumar", "Reddy", "Gupta", "Patel", "Nair", "Iyer", "Rao"]
+
+COMPANIES = [
+    {"name": "TechCorp Solutions", "domain": "IT Services", "package": 8.5, "location": "Bangalore"},
+    {"name": "DataWorks Inc", "domain": "Product", "package": 12.0, "location": "Hyderabad"},
+    {"name": "CloudNine Systems", "domain": "IT Services", "package": 7.5, "location": "Pune"},
+    {"name": "InnovateTech", "domain": "Product", "package": 15.0, "location": "Bangalore"},
+    {"name": "FinanceHub", "domain": "Finance", "package": 10.0, "location": "Mumbai"},
+    {"name": "EcomGiant", "domain": "E-commerce", "package": 11.5, "location": "Bangalore"},
+    {"name": "HealthTech Solutions", "domain": "Healthcare", "package": 9.0, "location": "Chennai"},
+    {"name": "ConsultPro", "domain": "Consulting", "package": 13.5, "location": "Delhi"},
+    {"name": "AI Innovations", "domain": "Product", "package": 16.0, "location": "Bangalore"},
+    {"name": "WebDev Masters", "domain": "IT Services", "package": 6.5, "location": "Pune"}
+]
+
+# Share of students with at least one offer, as in the seed data (30-40 of 50)
+PLACED_SHARE = 0.7
+BATCH_SIZE = 5000
+# Version 4 / RFC 4122 variant bits of a random UUID, as uuid.UUID(int=..., version=4) sets them
+_UUID_CLEAR = ~((0xc000 << 48) | (0xf000 << 64))
+_UUID_SET = (0x8000 << 48) | (4 << 76)
+
+
+def company_website(name):
+    return f"https://{name.lower().replace(' ', '')}.com"
+
+
+class Generator:
+    """Reproducible document factory; ids come from the same seeded RNG"""
+
+    def __init__(self, seed=None, now=None):
+        self.rng = random.Random(seed)
+        self.now = now or datetime.now(timezone.utc)
+
+    def new_id(self):
+        # Same string as str(uuid.UUID(...)), without building the object: ids are a large share of the cost
+        h = f"{(self.rng.getrandbits(128) & _UUID_CLEAR) | _UUID_SET:032x}"
+        return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+    def offer_date(self):
+        rng = self.rng
+        return date(2020 + rng.randint(3, 5), rng.randint(1, 12), rng.randint(1, 28))
+
+    def students(self, count, start=0):
+        rng = self.rng
+        for i in range(start, start + count):
+            first_name = rng.choice(FIRST_NAMES)
+            last_name = rng.choice(LAST_NAMES)
+            dept = rng.choice(DEPARTMENTS)
+            yield {
+                "id": self.new_id(),
+                "name": f"{first_name} {last_name}",
+                "roll_number": f"21{dept}{1000 + i}",
+                "department": dept,
+                "cgpa": round(rng.uniform(6.5, 9.8), 2),
+                "email": f"{first_name.lower()}.{last_name.lower()}{i}@college.edu",
+                "phone": f"+91{rng.randint(7000000000, 9999999999)}",
+                "created_at": self.now,
+            }
+
+    def companies(self, count):
+        """The seed companies first, then numbered variations of them"""
+        rng = self.rng
+        for i in range(count):
+            base = COMPANIES[i % len(COMPANIES)]
+            series = i // len(COMPANIES)
+            name = base["name"] if series == 0 else f"{base['name']} {series + 1}"
+            yield {
+                "id": self.new_id(),
+                "name": name,
+                "domain": base["domain"] if series == 0 else rng.choice(DOMAINS),
+                "package": base["package"] if series == 0 else round(rng.uniform(5.0, 18.0), 1),
+                "location": base["location"] if series == 0 else rng.choice(LOCATIONS),
+                "website": company_website(name),
+                "created_at": self.now,
+            }
+
+    def drives(self, count, companies):
+        """``companies`` is a list of ``(id, name, package)``"""
+        rng = self.rng
+        for _ in range(count):
+            company_id, company_name, _package = rng.choice(companies)
+            role = rng.choice(ROLES)
+            yield {
+                "id": self.new_id(),
+                "company_id": company_id,
+                "company_name": company_name,
+                "date": self.offer_date(),
+                "eligible_departments": rng.sample(DEPARTMENTS, rng.randint(2, 4)),
+                "role": role,
+                "description": f"Campus recruitment drive for {role} position",
+                "created_at": self.now,
+            }
+
+    def offers(self, count, students, companies):
+        """``students`` is a list of ``(id, name)``; ``companies`` of ``(id, name, package)``.
+
+        Every offer goes to a different student until each student has one;
+        beyond that, students get additional offers at random.
+        """
+        rng = self.rng
+        distinct = min(count, len(students))
+        picks = rng.sample(range(len(students)), distinct)
+        for n in range(count):
+            student_id, student_name = students[picks[n] if n < distinct else rng.randrange(len(students))]
+            company_id, company_name, package = rng.choice(companies)
+            yield {
+                "id": self.new_id(),
+                "student_id": student_id,
+                "student_name": student_name,
+                "company_id": company_id,
+                "company_name": company_name,
+                "package": round(package + rng.uniform(-1.0, 2.0), 2),
+                "role": rng.choice(ROLES),
+                "date": self.offer_date(),
+                "created_at": self.now,
+            }
+
+
+def collect_refs(docs, refs, *fields):
+    """Pass ``docs`` through, appending the tuple of ``fields`` of each to ``refs``"""
+    for doc in docs:
+        refs.append(tuple(doc[field] for field in fields))
+        yield doc
@@ -0,0 +1,71 @@
+"""Typed date handling between the API models and BSON.
+
+Timestamps (``created_at``) are stored as native BSON dates. Calendar dates
+(``Offer.date``, ``Drive.date``) are ``datetime.date`` in the models and are
+stored as BSON dates at midnight UTC, since BSON has no date-only type.
+
+``CODEC_OPTIONS`` encodes ``date`` values through ``DateCodec`` and decodes
+BSON dates as naive UTC datetimes. Naive decoding is markedly cheaper in
+pymongo than tz-aware decoding; models restore the timezone with the
+``UTCDateTime`` field type, and Pydantic accepts the midnight datetimes for
+``date`` fields as they are.
+"""
+from datetime import date, datetime, time, timezone
+from typing import Annotated
+
+from bson.codec_options import CodecOptions, TypeEncoder, TypeRegistry
+from pydantic import AfterValidator
+
+
+class DateCodec(TypeEncoder):
+    python_type = date
+
+    def transform_python(self, value):
+        return day_start(value)
+
+
+CODEC_OPTIONS = CodecOptions(type_registry=TypeRegistry([DateCodec()]))
+
+
+def as_utc(value):
+    """Attach UTC to a naive datetime decoded from MongoDB"""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+UTCDateTime = Annotated[datetime, AfterValidator(as_utc)]
+
+
+def day_start(value):
+    """Midnight UTC of a calendar date, as stored in MongoDB"""
+    return datetime.combine(value, time.min, tzinfo=timezone.utc)
+
+
+def as_date(value):
+    """Calendar date of a stored value (BSON date, ``date`` or legacy ISO string)"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value[:10])
+
+
+def parse_timestamp(value):
+    """Parse a legacy ISO timestamp string into an aware UTC datetime"""
+    return as_utc(datetime.fromisoformat(value)).astimezone(timezone.utc)
+
+
+def date_fields(model):
+    """Names of the fields of ``model`` typed as calendar dates"""
+    return tuple(name for name, field in model.model_fields.items() if field.annotation is date)
+
+
+def decode_dates(doc, fields):
+    """Prepare a raw document for output without going through its model.
+
+    Datetimes in ``fields`` become calendar dates; every other datetime is
+    marked as UTC. The document is modified in place and returned.
+    """
+    for key, value in doc.items():
+        if isinstance(value, datetime):
+            doc[key] = value.date() if key in fields else as_utc(value)
+    return doc
@@ -0,0 +1,214 @@
+"""In-memory eligibility index over students.
+
+Every student is one row in a set of NumPy arrays (department code, CGPA,
+highest offered package), so matching a drive is a handful of vectorized
+comparisons and one sort instead of a join across students, drives and
+offers. Only ids go through the index; the page of matching students is
+then read from MongoDB by id.
+
+The index is loaded once at startup and kept current by the write routes
+(``upsert_student``, ``remove_student``, ``offer_added``,
+``refresh_student``). Writes made by other processes are picked up by a
+background reload once the index is older than ``max_age`` seconds.
+"""
+import asyncio
+import logging
+import time
+
+from lazyimport import lazy_import
+
+# NumPy is only needed once the index is loaded
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+BEST_PACKAGES_PIPELINE = [
+    {"$group": {"_id": "$student_id", "best": {"$max": "$package"}}},
+]
+
+
+class StudentColumns:
+    """Column storage; rows are never moved, removed rows are masked out"""
+
+    def __init__(self, capacity=1024):
+        self.ids = []
+        self.rows = {}
+        self.departments = {}
+        self.size = 0
+        self.department = np.zeros(capacity, dtype=np.int32)
+        self.cgpa = np.zeros(capacity, dtype=np.float64)
+        # Highest package offered to the student; NaN when they have no offer
+        self.best = np.full(capacity, np.nan, dtype=np.float64)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+    def _grow(self):
+        capacity = len(self.cgpa) * 2
+        for name, fill in (("department", 0), ("cgpa", 0.0), ("best", np.nan), ("alive", False)):
+            column = getattr(self, name)
+            grown = np.full(capacity, fill, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def department_code(self, name):
+        return self.departments.setdefault(name, len(self.departments))
+
+    def department_codes(self, names):
+        return [self.departments[name] for name in names if name in self.departments]
+
+    def upsert(self, student_id, department, cgpa):
+        row = self.rows.get(student_id)
+        if row is None:
+            if self.size == len(self.cgpa):
+                self._grow()
+            row = self.size
+            self.size += 1
+            self.ids.append(student_id)
+            self.rows[student_id] = row
+        self.department[row] = self.department_code(department)
+        self.cgpa[row] = cgpa
+        self.alive[row] = True
+
+    def remove(self, student_id):
+        row = self.rows.pop(student_id, None)
+        if row is not None:
+            self.alive[row] = False
+            self.best[row] = np.nan
+
+    def best_package(self, row):
+        best = self.best[row]
+        return None if np.isnan(best) else float(best)
+
+    def set_best(self, student_id, package, replace=False):
+        row = self.rows.get(student_id)
+        if row is None:
+            return
+        if replace or not package <= self.best[row]:
+            self.best[row] = np.nan if package is None else package
+
+
+def rank(columns, codes, min_cgpa=None, max_package=None, offset=0, limit=None):
+    """Rank matching rows of ``columns``; returns ``(total, rows[offset:offset + limit])``.
+
+    Students qualify when their department code is in ``codes``, they have
+    at least ``min_cgpa`` and hold no offer above ``max_package``. Ranking is
+    by CGPA, highest first, then by highest offered package, lowest (or none)
+    first, then by row for a stable order.
+    """
+    n = columns.size
+    mask = columns.alive[:n] & np.isin(columns.department[:n], codes)
+    if min_cgpa is not None:
+        mask &= columns.cgpa[:n] >= min_cgpa
+    best = columns.best[:n]
+    if max_package is not None:
+        mask &= ~(best > max_package)
+
+    rows = np.flatnonzero(mask)
+    total = len(rows)
+    if offset >= total:
+        return total, rows[:0]
+    cgpa = columns.cgpa[rows]
+    package = np.nan_to_num(best[rows], nan=-1.0)
+    end = total if limit is None else min(offset + limit, total)
+    if end < total // 4:
+        # Only the top of the ranking is needed; narrow it down before sorting
+        cut = np.partition(-cgpa, end - 1)[end - 1]
+        keep = -cgpa <= cut
+        rows, cgpa, package = rows[keep], cgpa[keep], package[keep]
+    order = np.lexsort((rows, package, -cgpa))[offset:end]
+    return total, rows[order]
+
+
+async def load_columns(db, capacity=1024):
+    """Read every student and their highest offered package into columns"""
+    students = await db.students.find({}, {"_id": 0, "id": 1, "department": 1, "cgpa": 1}).to_list(None)
+    best = await db.offers.aggregate(BEST_PACKAGES_PIPELINE, allowDiskUse=True).to_list(None)
+
+    def build():
+        columns = StudentColumns(capacity=max(capacity, len(students)))
+        for student in students:
+            columns.upsert(student["id"], student.get("department"), student.get("cgpa") or 0.0)
+        for row in best:
+            columns.set_best(row["_id"], row["best"])
+        return columns
+
+    # Filling the columns is a Python loop over every student; keep it off the event loop
+    return await asyncio.to_thread(build)
+
+
+class StudentIndex:
+    def __init__(self, max_age=300.0):
+        self.max_age = max_age
+        self.loaded_at = None
+        # Created by the first load
+        self._columns = None
+        self._pending = None
+        self._reload_task = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self):
+        return self.loaded_at is not None
+
+    def _apply(self, method, *args):
+        if self._columns is not None:
+            getattr(self._columns, method)(*args)
+        if self._pending is not None:
+            # Replayed onto the arrays being loaded so the update is not lost
+            self._pending.append((method, args))
+
+    async def load(self, db):
+        """(Re)build the index from MongoDB; concurrent writes are replayed onto it"""
+        async with self._lock:
+            self._pending = []
+            try:
+                start = time.perf_counter()
+                columns = await load_columns(db)
+                for method, args in self._pending:
+                    getattr(columns, method)(*args)
+
+                self._columns = columns
+                self.loaded_at = time.monotonic()
+                logger.info(f"Student index loaded: {columns.size} students in {time.perf_counter() - start:.2f}s")
+            finally:
+                self._pending = None
+
+    def reload_if_stale(self, db):
+        """Start a background reload when the index is older than ``max_age``"""
+        if self.max_age <= 0 or self.loaded_at is None:
+            return
+        if time.monotonic() - self.loaded_at < self.max_age:
+            return
+        if self._reload_task is None or self._reload_task.done():
+            self._reload_task = asyncio.create_task(self.load(db))
+
+    def upsert_student(self, student):
+        self._apply("upsert", student["id"], student["department"], student["cgpa"])
+
+    def remove_student(self, student_id):
+        self._apply("remove", student_id)
+
+    def offer_added(self, student_id, package):
+        self._apply("set_best", student_id, package)
+
+    async def refresh_student(self, db, student_id):
+        """Recompute a student's highest package after one of their offers went away"""
+        rows = await db.offers.aggregate(
+            [{"$match": {"student_id": student_id}}] + BEST_PACKAGES_PIPELINE
+        ).to_list(None)
+        self._apply("set_best", student_id, rows[0]["best"] if rows else None, True)
+
+    def match(self, departments, min_cgpa=None, max_package=None, offset=0, limit=100):
+        """Rank eligible students (see ``rank``); returns ``(total, [(student_id, best_package), ...])``"""
+        columns = self._columns
+        if columns is None:
+            return 0, []
+        total, rows = rank(columns, columns.department_codes(departments), min_cgpa, max_package, offset, limit)
+        return total, [(columns.ids[row], columns.best_package(row)) for row in rows]
+
+    def stats(self):
+        columns = self._columns
+        return {
+            "students": len(columns.rows) if columns is not None else 0,
+            "rows": columns.size if columns is not None else 0,
+            "age_seconds": round(time.monotonic() - self.loaded_at, 1) if self.loaded_at else None,
+        }
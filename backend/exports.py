@@ -0,0 +1,90 @@
+"""Streaming NDJSON/CSV exports.
+
+Rows are pulled from a Motor cursor in batches and encoded as they arrive,
+so memory stays flat and the first bytes go out as soon as the first batch
+is back from MongoDB, however large the collection is.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+
+BATCH_SIZE = 1000
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_value(value):
+    if isinstance(value, (list, tuple)):
+        return ";".join(str(item) for item in value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return "" if value is None else value
+
+
+async def iter_collection(collection, query=None, projection=None, batch_size=BATCH_SIZE, transform=None):
+    """Yield lists of documents, one per cursor batch, optionally transformed"""
+    cursor = collection.find(query or {}, projection or {"_id": 0}).sort("id", 1).batch_size(batch_size)
+    batch = []
+    async for doc in cursor:
+        batch.append(transform(doc) if transform else doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def iter_rows(rows, batch_size=BATCH_SIZE):
+    """Adapt an in-memory list of rows to the batched interface"""
+    for start in range(0, len(rows), batch_size):
+        yield rows[start:start + batch_size]
+
+
+async def encode(batches, fmt, fields):
+    """Encode batches of dicts as NDJSON lines or CSV rows with a header"""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        yield buffer.getvalue().encode()
+        async for batch in batches:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([_csv_value(doc.get(field)) for field in fields] for doc in batch)
+            yield buffer.getvalue().encode()
+    else:
+        async for batch in batches:
+            yield "".join(json.dumps(doc, default=_json_default) + "\n" for doc in batch).encode()
+
+
+async def gzipped(chunks):
+    """Gzip a byte stream incrementally"""
+    compressor = zlib.compressobj(wbits=31)
+    first = True
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if first:
+            # Push the first chunk out immediately to keep time-to-first-byte low
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            first = False
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_headers(name, fmt, gzip):
+    media_type, extension = FORMATS[fmt]
+    filename = f"{name}.{extension}"
+    if gzip:
+        media_type, filename = "application/gzip", f"{filename}.gz"
+    return media_type, {"Content-Disposition": f'attachment; filename="{filename}"'}
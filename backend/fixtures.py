@@ -0,0 +1,264 @@
+"""Idempotent loading of generated datasets (the sample seed and larger fixtures).
+
+A load is named, and everything it writes follows from its seed: the
+documents, their ids and the references between them are computed by
+``datagen.Generator`` up front, so nothing is read back while loading. Its
+progress is recorded in the ``fixture_loads`` collection, which makes
+loading the same fixture again a no-op:
+
+- On a replica set, a fixture of up to ``TRANSACTION_MAX_DOCUMENTS`` is
+  inserted in a single transaction, together with its completed marker.
+  Either all of it is there or none of it. Of two processes loading it at
+  the same time, one commits; the other's transaction fails on the marker
+  or a conflicting write, and it reports the load as in progress or done.
+- Otherwise (standalone mongod, or larger fixtures) batches are inserted one
+  by one and the marker counts the batches each collection has done. A load
+  that was interrupted is resumed from its marker: the documents are
+  generated again from the recorded seed and time, finished batches are
+  skipped, and the batch that may have been half written is replaced.
+  The marker is held by its loader under a lease, renewed with every
+  batch: a load whose lease has not yet run out is still going on in
+  another process and is left to it (status ``"in_progress"``).
+
+``build`` returns the same documents without a database, e.g. for tests.
+"""
+import asyncio
+import logging
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+import datagen
+from dates import as_utc
+
+logger = logging.getLogger(__name__)
+
+# The sample dataset of POST /api/seed and `manage.py seed`
+SAMPLE = "sample"
+SAMPLE_SIZE = {"students": 50, "companies": len(datagen.COMPANIES), "drives": 20}
+COLLECTIONS = ("students", "companies", "drives", "offers")
+# Larger fixtures are loaded in resumable batches; a transaction must finish within the server's time limit
+TRANSACTION_MAX_DOCUMENTS = 20000
+# A batched load not renewed for this long (one batch each time) is taken to have died and may be resumed
+LEASE_SECONDS = 120
+
+
+class _LoadedElsewhere(Exception):
+    """Another process holds the lease on the fixture's marker"""
+
+
+def fixture_counts(students, companies, drives, offers=None):
+    """Documents per collection; ``offers`` defaults to ``datagen.PLACED_SHARE`` of ``students``"""
+    if offers is None:
+        offers = int(students * datagen.PLACED_SHARE)
+    if not companies:
+        drives = offers = 0
+    elif not students:
+        offers = 0
+    return {"students": students, "companies": companies, "drives": drives, "offers": offers}
+
+
+def generate(counts, seed, now=None):
+    """``(collection, documents)`` pairs in load order; the documents are generated lazily.
+
+    Each collection must be consumed before the next one is generated: drives
+    and offers refer to the students and companies generated before them.
+    """
+    generator = datagen.Generator(seed, now)
+    student_refs, company_refs = [], []
+    yield "students", datagen.collect_refs(generator.students(counts["students"]), student_refs, "id", "name")
+    yield "companies", datagen.collect_refs(
+        generator.companies(counts["companies"]), company_refs, "id", "name", "package")
+    yield "drives", generator.drives(counts["drives"], company_refs)
+    yield "offers", generator.offers(counts["offers"], student_refs, company_refs)
+
+
+def build(students, companies, drives, offers=None, seed=0, now=None):
+    """The documents of a fixture as ``{collection: [document]}``, without touching a database"""
+    counts = fixture_counts(students, companies, drives, offers)
+    return {name: list(docs) for name, docs in generate(counts, seed, now)}
+
+
+async def supports_transactions(db):
+    # Transactions need a replica set (or a sharded cluster, whose mongos reports msg "isdbgrid")
+    hello = await db.client.admin.command("hello")
+    return "setName" in hello or hello.get("msg") == "isdbgrid"
+
+
+def _batches(docs, batch_size):
+    docs = iter(docs)
+    while batch := list(islice(docs, batch_size)):
+        yield batch
+
+
+async def _load_in_transaction(db, marker, report):
+    try:
+        async with await db.client.start_session() as session:
+            async with session.start_transaction():
+                for name, docs in generate(marker["counts"], marker["seed"], marker["now"]):
+                    inserted = 0
+                    for batch in _batches(docs, marker["batch_size"]):
+                        inserted += len((await db[name].insert_many(batch, session=session)).inserted_ids)
+                    report[name] = {"inserted": inserted}
+                await db.fixture_loads.insert_one(
+                    {**marker, "status": "completed", "completed_at": datetime.now(timezone.utc)}, session=session)
+    except DuplicateKeyError:
+        # Another process committed the same fixture first
+        raise _LoadedElsewhere()
+    except OperationFailure as e:
+        # A write conflict with another process's transaction that is still loading it
+        if e.has_error_label("TransientTransactionError"):
+            raise _LoadedElsewhere()
+        raise
+
+
+def _lease_expiry():
+    return datetime.now(timezone.utc) + timedelta(seconds=LEASE_SECONDS)
+
+
+async def _update_marker(db, marker, update):
+    """Update the marker unless another process has taken the load over"""
+    result = await db.fixture_loads.update_one({"id": marker["id"], "owner": marker["owner"]}, update)
+    if not result.matched_count:
+        raise _LoadedElsewhere()
+
+
+async def _take_over(db, name):
+    """The marker of an interrupted load, now leased to this process; ``None`` while its loader's lease holds"""
+    return await db.fixture_loads.find_one_and_update(
+        # Markers written before leases existed have none
+        {"id": name, "status": "loading", "$or": [
+            {"locked_until": {"$lt": datetime.now(timezone.utc)}}, {"locked_until": {"$exists": False}},
+        ]},
+        {"$set": {"owner": str(uuid.uuid4()), "locked_until": _lease_expiry()}},
+        {"_id": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def _load_in_batches(db, marker, report):
+    if marker.get("status") is None:
+        marker = {**marker, "status": "loading", "owner": str(uuid.uuid4()), "locked_until": _lease_expiry(),
+                  "batches": {name: 0 for name in COLLECTIONS}}
+        try:
+            await db.fixture_loads.insert_one(dict(marker))
+        except DuplicateKeyError:
+            # Started at the same time by another process
+            raise _LoadedElsewhere()
+    done = marker["batches"]
+    for name, docs in generate(marker["counts"], marker["seed"], marker["now"]):
+        inserted = 0
+        skipped = done[name]
+        pending = None
+
+        async def finish(number, insert):
+            nonlocal inserted
+            inserted += len((await insert).inserted_ids)
+            await _update_marker(db, marker, {"$set": {f"batches.{name}": number, "locked_until": _lease_expiry()}})
+
+        # The next batch is generated while the previous one is being written
+        for number, batch in enumerate(_batches(docs, marker["batch_size"]), 1):
+            if number <= skipped:
+                # Written by an earlier attempt; generated anyway so later references stay the same
+                continue
+            if pending is not None:
+                await finish(*pending)
+            if number == skipped + 1:
+                # An interrupted attempt may have written part of this batch
+                await db[name].delete_many({"id": {"$in": [doc["id"] for doc in batch]}})
+            pending = (number, asyncio.ensure_future(db[name].insert_many(batch, ordered=False)))
+        if pending is not None:
+            await finish(*pending)
+        report[name] = {"inserted": inserted, "skipped_batches": skipped}
+    await _update_marker(db, marker, {
+        "$set": {"status": "completed", "completed_at": datetime.now(timezone.utc)},
+        "$unset": {"owner": "", "locked_until": ""},
+    })
+
+
+def _already_loaded(marker):
+    return {"status": "already_loaded", "seed": marker["seed"], "counts": marker["counts"],
+            "mode": marker["mode"], "collections": {}, "seconds": 0.0}
+
+
+def _in_progress(marker):
+    logger.info(f"Fixture {marker['id']!r} is being loaded by another process")
+    return {"status": "in_progress", "seed": marker["seed"], "counts": marker["counts"],
+            "mode": marker["mode"], "collections": {}, "seconds": 0.0}
+
+
+async def _loaded_elsewhere(db, marker):
+    """Report on a load that another process got to first, finished or not"""
+    current = await db.fixture_loads.find_one({"id": marker["id"]}, {"_id": 0})
+    if current and current["status"] == "completed":
+        return _already_loaded(current)
+    return _in_progress(current or marker)
+
+
+async def load(db, name, students, companies, drives, offers=None, seed=None,
+               batch_size=datagen.BATCH_SIZE, transaction=None, require_empty=False):
+    """Load the fixture ``name`` unless it is already loaded; resumes an interrupted load.
+
+    Without a ``seed`` one is drawn and recorded, so a resumed load produces
+    the same documents. A resumed load keeps the sizes, seed and batch size it
+    was started with. ``transaction`` forces (``True``) or rules out
+    (``False``) loading in one transaction; by default one is used when the
+    server supports it and the fixture is small enough. With
+    ``require_empty``, a database that already has students but no record of
+    this fixture is left alone (status ``"skipped"``). A load that another
+    process is running, or takes over while this one is stalled, is left to
+    it (status ``"in_progress"``).
+
+    Returns ``{"status": "loaded" | "resumed" | "already_loaded" | "skipped" | "in_progress",
+    "seed", "counts", "mode", "collections", "seconds"}``. Summaries and
+    indexes are left to the caller.
+    """
+    start = time.perf_counter()
+    marker = await db.fixture_loads.find_one({"id": name}, {"_id": 0})
+    if marker and marker["status"] == "completed":
+        return _already_loaded(marker)
+    if marker:
+        taken = await _take_over(db, name)
+        if taken is None:
+            return await _loaded_elsewhere(db, marker)
+        marker = taken
+
+    resumed = marker is not None
+    if resumed:
+        marker["now"] = as_utc(marker["now"])
+        logger.info(f"Resuming fixture load {name!r} from {marker['batches']}")
+    elif require_empty and await db.students.estimated_document_count():
+        return {"status": "skipped", "seed": None, "counts": None, "mode": None, "collections": {}, "seconds": 0.0}
+    else:
+        now = datetime.now(timezone.utc)
+        counts = fixture_counts(students, companies, drives, offers)
+        if transaction is None:
+            transaction = sum(counts.values()) <= TRANSACTION_MAX_DOCUMENTS and await supports_transactions(db)
+        marker = {
+            "id": name,
+            "seed": seed if seed is not None else random.randrange(2 ** 32),
+            # Part of every document, so it is fixed for the whole load as well; BSON keeps milliseconds
+            "now": now.replace(microsecond=now.microsecond // 1000 * 1000),
+            "counts": counts,
+            "batch_size": batch_size,
+            "mode": "transaction" if transaction else "batches",
+            "started_at": now,
+        }
+
+    report = {}
+    try:
+        if marker["mode"] == "transaction":
+            await _load_in_transaction(db, marker, report)
+        else:
+            await _load_in_batches(db, marker, report)
+    except _LoadedElsewhere:
+        return await _loaded_elsewhere(db, marker)
+    seconds = time.perf_counter() - start
+    logger.info(f"Fixture {name!r} loaded in {seconds:.2f}s ({marker['mode']})")
+    return {"status": "resumed" if resumed else "loaded", "seed": marker["seed"], "counts": marker["counts"],
+            "mode": marker["mode"], "collections": report, "seconds": round(seconds, 2)}
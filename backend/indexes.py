@@ -0,0 +1,119 @@
+"""Declared MongoDB indexes and a reconciler that keeps the database in line.
+
+The handlers look documents up by application-level keys (``id``,
+``username``, foreign keys and filter fields), so each of those needs an
+index to avoid collection scans. ``ensure_indexes`` compares the declared set
+with what exists, creates anything missing and reports indexes that exist but
+are not declared. It is idempotent and safe to run on every startup.
+"""
+import logging
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# collection -> list of (name, keys, options)
+REQUIRED_INDEXES = {
+    "users": [
+        ("username_unique", [("username", ASCENDING)], {"unique": True}),
+    ],
+    "students": [
+        ("id_unique", [("id", ASCENDING)], {"unique": True}),
+        ("department_id", [("department", ASCENDING), ("id", ASCENDING)], {}),
+    ],
+    "companies": [
+        ("id_unique", [("id", ASCENDING)], {"unique": True}),
+    ],
+    "drives": [
+        ("id_unique", [("id", ASCENDING)], {"unique": True}),
+        ("company_id_id", [("company_id", ASCENDING), ("id", ASCENDING)], {}),
+        ("date", [("date", ASCENDING)], {}),
+        # Drives open to a department, for student profiles
+        ("eligible_departments_date", [("eligible_departments", ASCENDING), ("date", ASCENDING)], {}),
+    ],
+    "offers": [
+        ("id_unique", [("id", ASCENDING)], {"unique": True}),
+        ("student_id_id", [("student_id", ASCENDING), ("id", ASCENDING)], {}),
+        # A student's offers, best first, for student profiles
+        ("student_id_package", [("student_id", ASCENDING), ("package", DESCENDING), ("id", ASCENDING)], {}),
+        ("company_id_id", [("company_id", ASCENDING), ("id", ASCENDING)], {}),
+        ("date", [("date", ASCENDING)], {}),
+    ],
+    "analytics_summary": [
+        ("kind_key", [("kind", ASCENDING), ("key", ASCENDING)], {}),
+    ],
+    "outbox": [
+        ("id_unique", [("id", ASCENDING)], {"unique": True}),
+        ("status_available_at", [("status", ASCENDING), ("available_at", ASCENDING)], {}),
+        ("owner", [("owner", ASCENDING)], {"sparse": True}),
+        # Processed events are kept for a week for inspection
+        ("processed_at_ttl", [("processed_at", ASCENDING)], {"expireAfterSeconds": 7 * 24 * 3600}),
+    ],
+    "shortlists": [
+        ("drive_id_unique", [("drive_id", ASCENDING)], {"unique": True}),
+        ("student_id", [("students.student_id", ASCENDING)], {}),
+    ],
+    "shortlist_jobs": [
+        ("id_unique", [("id", ASCENDING)], {"unique": True}),
+        ("started_at", [("started_at", DESCENDING)], {}),
+    ],
+    # One marker per fixture; a second worker seeding at the same time fails instead of loading twice
+    "fixture_loads": [
+        ("id_unique", [("id", ASCENDING)], {"unique": True}),
+    ],
+}
+
+
+def _key_of(keys):
+    return tuple((field, direction) for field, direction in keys)
+
+
+async def ensure_indexes(db, check=False, declared=None):
+    """Reconcile declared indexes with the database.
+
+    With ``check=True`` nothing is created; the report only lists what is
+    missing. ``declared`` replaces ``REQUIRED_INDEXES`` (e.g. with
+    ``tenancy.scoped_indexes``). Returns a dict with ``missing``, ``created``, ``conflicts``,
+    ``failed`` and ``extra`` lists of ``"collection.index_name"`` strings.
+    """
+    report = {"missing": [], "created": [], "conflicts": [], "failed": [], "extra": []}
+
+    for collection_name, indexes in (declared or REQUIRED_INDEXES).items():
+        collection = db[collection_name]
+        existing = await collection.index_information()
+        existing_by_key = {
+            _key_of(info["key"]): (name, bool(info.get("unique")))
+            for name, info in existing.items()
+        }
+
+        to_create = []
+        declared_keys = set()
+        for name, keys, options in indexes:
+            key = _key_of(keys)
+            declared_keys.add(key)
+            label = f"{collection_name}.{name}"
+            if key in existing_by_key:
+                _, unique = existing_by_key[key]
+                if unique != bool(options.get("unique")):
+                    report["conflicts"].append(label)
+                continue
+            report["missing"].append(label)
+            to_create.append((label, IndexModel(keys, name=name, **options)))
+
+        for name, info in existing.items():
+            if name != "_id_" and _key_of(info["key"]) not in declared_keys:
+                report["extra"].append(f"{collection_name}.{name}")
+
+        if check:
+            continue
+        for label, model in to_create:
+            try:
+                await collection.create_indexes([model])
+                report["created"].append(label)
+            except OperationFailure as e:
+                # Typically duplicate values blocking a unique index
+                logger.error(f"Could not create index {label}: {e}")
+                report["failed"].append(label)
+
+    return report
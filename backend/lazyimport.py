@@ -0,0 +1,21 @@
+"""Deferred imports for heavy modules that most requests never touch.
+
+``lazy_import("numpy")`` returns a module object right away but only runs
+the module's code when one of its attributes is first used, which keeps it
+out of the app's import time (see benchmarks/startup.py).
+"""
+import importlib.util
+import sys
+
+
+def lazy_import(name):
+    """Module ``name``, executed on first attribute access"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,272 @@
+"""Maintenance commands for the PlacementIQ backend.
+
+Usage (from the backend directory):
+
+    python manage.py ensure-indexes          # create missing indexes
+    python manage.py ensure-indexes --check  # report only, exit 1 if any are missing
+    python manage.py rebuild-summaries       # recompute materialized analytics
+    python manage.py migrate-dates           # convert legacy ISO-string dates to BSON dates
+    python manage.py seed                    # load the sample dataset into an empty database (resumable)
+    python manage.py generate --students 100000 --drop   # load a synthetic dataset
+    python manage.py shortlists --min-cgpa 7 # compute shortlists for all upcoming drives
+    python manage.py propagate-renames       # apply pending name changes to drives/offers
+    python manage.py --tenant iitb seed      # any command, for one college (TENANCY_MODE)
+    python manage.py tenants --probe         # check that the colleges' data is kept apart
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+import datagen
+import fixtures
+import mongo
+import outbox
+import shortlists
+import summaries
+import tenancy
+from migrations import migrate_dates
+from dates import CODEC_OPTIONS
+from indexes import REQUIRED_INDEXES, ensure_indexes
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+
+def get_factory(args):
+    return mongo.MongoClientFactory(
+        args.mongo_url, args.db, {"serverSelectionTimeoutMS": 5000, **mongo.client_options()}, CODEC_OPTIONS,
+    )
+
+
+def get_db(args):
+    """Client and database; with tenancy, the database of ``--tenant`` (commands run in its scope)"""
+    factory = get_factory(args)
+    if args.tenancy == "database":
+        return factory, tenancy.DatabasePerTenant(factory)
+    if args.tenancy == "field":
+        return factory, tenancy.SharedDatabase(factory)
+    return factory, factory.database()
+
+
+def declared_indexes(args):
+    # Field mode puts the tenant first in every index key
+    return tenancy.scoped_indexes(REQUIRED_INDEXES) if args.tenancy == "field" else None
+
+
+async def clear_collections(args, db, names):
+    if args.tenancy == "field":
+        # The collections are shared: remove only this tenant's documents
+        for name in names:
+            await db[name].delete_many({})
+    else:
+        for name in names:
+            await db.drop_collection(name)
+
+
+async def cmd_ensure_indexes(args):
+    client, db = get_db(args)
+    try:
+        report = await ensure_indexes(db, check=args.check, declared=declared_indexes(args))
+    finally:
+        client.close()
+    print(json.dumps(report, indent=2))
+    if report["failed"] or report["conflicts"]:
+        return 1
+    if args.check and report["missing"]:
+        return 1
+    return 0
+
+
+async def cmd_rebuild_summaries(args):
+    client, db = get_db(args)
+    try:
+        totals = await summaries.rebuild(db)
+    finally:
+        client.close()
+    print(json.dumps(totals, indent=2, default=str))
+    return 0
+
+
+async def cmd_migrate_dates(args):
+    client, db = get_db(args)
+    try:
+        report = await migrate_dates(db, batch_size=args.batch_size)
+    finally:
+        client.close()
+    print(json.dumps(report, indent=2))
+    return 1 if any(stats["failed"] for stats in report.values()) else 0
+
+
+def generated_fixture_name(args):
+    # Same arguments, same documents: rerunning an interrupted or finished load resumes or skips it
+    return f"generated-{args.seed}-{args.students}-{args.companies}-{args.drives}-{args.offers}"
+
+
+async def cmd_generate(args):
+    client, db = get_db(args)
+    try:
+        if args.drop:
+            await clear_collections(
+                args, db, ("students", "companies", "drives", "offers", "analytics_summary", "placement_ledger",
+                           "fixture_loads"),
+            )
+        report = await fixtures.load(
+            db, generated_fixture_name(args), students=args.students, companies=args.companies,
+            drives=args.drives, offers=args.offers, seed=args.seed, batch_size=args.batch_size,
+            require_empty=not args.append,
+        )
+        if report["status"] == "skipped":
+            print(f"Database {args.db} already has data; pass --drop to replace it or --append to add to it",
+                  file=sys.stderr)
+            return 1
+        if report["status"] == "in_progress":
+            print(f"Another process is loading this fixture into {args.db}; run again once it has finished",
+                  file=sys.stderr)
+            return 1
+        # Indexes after the bulk load: building them once is cheaper than maintaining them per insert
+        report["indexes"] = await ensure_indexes(db, declared=declared_indexes(args))
+        await summaries.rebuild(db)
+    finally:
+        client.close()
+    print(json.dumps(report, indent=2))
+    return 1 if report["indexes"]["failed"] or report["indexes"]["conflicts"] else 0
+
+
+async def cmd_seed(args):
+    client, db = get_db(args)
+    try:
+        report = await fixtures.load(
+            db, fixtures.SAMPLE, **{**fixtures.SAMPLE_SIZE, "students": args.students, "drives": args.drives},
+            seed=args.seed, require_empty=True,
+        )
+        if report["status"] in ("skipped", "already_loaded"):
+            print(f"Database {args.db} already has data; nothing to seed", file=sys.stderr)
+            return 0
+        if report["status"] == "in_progress":
+            print(f"Another process is seeding {args.db}", file=sys.stderr)
+            return 0
+        report["indexes"] = await ensure_indexes(db, declared=declared_indexes(args))
+        await summaries.rebuild(db)
+    finally:
+        client.close()
+    print(json.dumps(report, indent=2))
+    return 1 if report["indexes"]["failed"] or report["indexes"]["conflicts"] else 0
+
+
+async def cmd_shortlists(args):
+    client, db = get_db(args)
+    try:
+        criteria = {"min_cgpa": args.min_cgpa, "max_package": args.max_package,
+                    "top": args.top, "include_past": args.include_past}
+        job = shortlists.new_job(criteria, requested_by="manage.py")
+        await db.shortlist_jobs.insert_one(dict(job))
+        await shortlists.run_job(db, job, args.workers)
+        job = await db.shortlist_jobs.find_one({"id": job["id"]}, {"_id": 0})
+    finally:
+        client.close()
+    print(json.dumps(job, indent=2, default=str))
+    return 0 if job["status"] == "completed" else 1
+
+
+async def cmd_propagate_renames(args):
+    client, db = get_db(args)
+    try:
+        requeued = await outbox.requeue_failed(db) if args.retry_failed else 0
+        totals = await outbox.drain(db)
+        failed = await db.outbox.count_documents({"status": "failed"})
+    finally:
+        client.close()
+    print(json.dumps({"requeued": requeued, **totals, "failed": failed}, indent=2))
+    return 1 if failed else 0
+
+
+async def cmd_tenants(args):
+    factory = get_factory(args)
+    try:
+        report = await tenancy.audit(factory, args.tenancy, args.tenants, probe=args.probe)
+    finally:
+        factory.close()
+    print(json.dumps(report, indent=2))
+    return 1 if report["problems"] else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PlacementIQ maintenance commands")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default=os.environ.get("DB_NAME", "placementiq_db"))
+    parser.add_argument("--tenancy", choices=tenancy.MODES, default=os.environ.get("TENANCY_MODE", "off").lower())
+    parser.add_argument("--tenants", type=lambda value: [name.strip() for name in value.split(",") if name.strip()],
+                        default=os.environ.get("TENANTS", ""), help="Comma-separated colleges served")
+    parser.add_argument("--tenant", help="College to run the command for (required with --tenancy)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    indexes_parser = subparsers.add_parser("ensure-indexes", help="Create or verify required indexes")
+    indexes_parser.add_argument("--check", action="store_true", help="Only report, do not create anything")
+    indexes_parser.set_defaults(func=cmd_ensure_indexes)
+
+    rebuild_parser = subparsers.add_parser("rebuild-summaries", help="Recompute analytics summaries from scratch")
+    rebuild_parser.set_defaults(func=cmd_rebuild_summaries)
+
+    migrate_parser = subparsers.add_parser("migrate-dates", help="Convert string dates to native BSON dates")
+    migrate_parser.add_argument("--batch-size", type=int, default=1000)
+    migrate_parser.set_defaults(func=cmd_migrate_dates)
+
+    seed_parser = subparsers.add_parser("seed", help="Load the sample dataset if the database is empty")
+    seed_parser.add_argument("--students", type=int, default=fixtures.SAMPLE_SIZE["students"])
+    seed_parser.add_argument("--drives", type=int, default=fixtures.SAMPLE_SIZE["drives"])
+    seed_parser.add_argument("--seed", type=int, default=None, help="Random seed, for a reproducible dataset")
+    seed_parser.set_defaults(func=cmd_seed)
+
+    generate_parser = subparsers.add_parser("generate", help="Load a synthetic dataset for load testing")
+    generate_parser.add_argument("--students", type=int, default=10000)
+    generate_parser.add_argument("--companies", type=int, default=100)
+    generate_parser.add_argument("--drives", type=int, default=500)
+    generate_parser.add_argument("--offers", type=int, default=None,
+                                 help="Defaults to 70%% of --students")
+    generate_parser.add_argument("--batch-size", type=int, default=datagen.BATCH_SIZE)
+    generate_parser.add_argument("--seed", type=int, default=42)
+    mode = generate_parser.add_mutually_exclusive_group()
+    mode.add_argument("--drop", action="store_true", help="Drop existing data first")
+    mode.add_argument("--append", action="store_true", help="Add to existing data")
+    generate_parser.set_defaults(func=cmd_generate)
+
+    shortlists_parser = subparsers.add_parser("shortlists", help="Compute shortlists for all upcoming drives")
+    shortlists_parser.add_argument("--min-cgpa", type=float)
+    shortlists_parser.add_argument("--max-package", type=float, help="Skip students holding a higher offer")
+    shortlists_parser.add_argument("--top", type=int, default=500, help="Shortlist size per drive")
+    shortlists_parser.add_argument("--include-past", action="store_true", help="Also drives that already happened")
+    shortlists_parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU)")
+    shortlists_parser.set_defaults(func=cmd_shortlists)
+
+    propagate_parser = subparsers.add_parser("propagate-renames", help="Drain the rename outbox")
+    propagate_parser.add_argument("--retry-failed", action="store_true",
+                                  help="Requeue events that exhausted their retries first")
+    propagate_parser.set_defaults(func=cmd_propagate_renames)
+
+    tenants_parser = subparsers.add_parser("tenants", help="Check that the colleges' data is kept apart")
+    tenants_parser.add_argument("--probe", action="store_true",
+                                help="Also write a document as one college and try to reach it as the others")
+    tenants_parser.set_defaults(func=cmd_tenants)
+
+    args = parser.parse_args(argv)
+    try:
+        tenancy.validate(args.tenancy, args.tenants)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.command == "tenants":
+        if args.tenancy == "off":
+            parser.error("tenants needs --tenancy database or field")
+    elif args.tenancy != "off" and args.tenant not in args.tenants:
+        parser.error(f"--tenant must name one of the colleges served: {', '.join(args.tenants)}")
+    # asyncio.run copies the context, so the command and its tasks run as the tenant
+    with tenancy.tenant_scope(args.tenant):
+        return asyncio.run(args.func(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,318 @@
+"""Request-level performance instrumentation with Prometheus text exposition.
+
+``MetricsMiddleware`` records per-route latency, in-flight requests and
+response sizes. A per-request ``RequestTimings`` accumulator lives in a
+context variable; the MongoDB command listener, the password pool and the
+response serializer add their time to it, so each request's cost can be
+split into database, bcrypt and serialization time. Motor copies the
+context into its executor threads, which is what lets command events be
+attributed to the request that issued them.
+
+Set ``SERVER_TIMING=1`` to also send the split as a ``Server-Timing`` header.
+"""
+import contextvars
+import threading
+import time
+
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.extend(self._render_sample(label_values, value))
+        return lines
+
+    def _render_sample(self, label_values, value):
+        return [f"{self.name}{_format_labels(self.labels, label_values)} {value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, *label_values, value):
+        with self._lock:
+            self._values[label_values] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, *label_values, value):
+        with self._lock:
+            state = self._values.get(label_values)
+            if state is None:
+                state = self._values[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _render_sample(self, label_values, state):
+        counts, total, count = state
+        names = self.labels + ("le",)
+        lines = [
+            f"{self.name}_bucket{_format_labels(names, label_values + (bound,))} {bucket_count}"
+            for bound, bucket_count in zip(self.buckets, counts)
+        ]
+        lines.append(f"{self.name}_bucket{_format_labels(names, label_values + ('+Inf',))} {count}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labels, label_values)} {total}")
+        lines.append(f"{self.name}_count{_format_labels(self.labels, label_values)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """Register a callable returning extra metrics (e.g. cache stats) at scrape time"""
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for metric in collector():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests_in_flight = registry.register(Gauge(
+    "placementiq_http_requests_in_flight", "HTTP requests currently being served"))
+http_request_duration = registry.register(Histogram(
+    "placementiq_http_request_duration_seconds", "HTTP request latency",
+    labels=("method", "route", "status")))
+http_response_size = registry.register(Histogram(
+    "placementiq_http_response_size_bytes", "HTTP response body size",
+    labels=("method", "route"), buckets=SIZE_BUCKETS))
+request_mongo_duration = registry.register(Histogram(
+    "placementiq_request_mongo_seconds", "MongoDB time spent per request", labels=("route",)))
+request_mongo_documents = registry.register(Histogram(
+    "placementiq_request_mongo_documents", "Documents returned by MongoDB per request",
+    labels=("route",), buckets=(1, 10, 100, 1000, 10000, 100000)))
+request_bcrypt_duration = registry.register(Histogram(
+    "placementiq_request_bcrypt_seconds", "bcrypt time spent per request", labels=("route",)))
+request_serialize_duration = registry.register(Histogram(
+    "placementiq_request_serialize_seconds", "Response validation and serialization time per request",
+    labels=("route",)))
+mongo_command_duration = registry.register(Histogram(
+    "placementiq_mongo_command_duration_seconds", "MongoDB command latency",
+    labels=("command", "collection")))
+mongo_command_failures = registry.register(Counter(
+    "placementiq_mongo_command_failures_total", "Failed MongoDB commands", labels=("command",)))
+
+
+class RequestTimings:
+    """Time and document counts attributed to one in-flight request"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.mongo_seconds = 0.0
+        self.mongo_commands = 0
+        self.mongo_documents = 0
+        self.bcrypt_seconds = 0.0
+        self.serialize_seconds = 0.0
+
+    def add(self, **amounts):
+        with self._lock:
+            for field, amount in amounts.items():
+                setattr(self, field, getattr(self, field) + amount)
+
+
+current_timings = contextvars.ContextVar("current_timings", default=None)
+
+
+def record(**amounts):
+    """Add to the current request's timings, if there is a request in progress"""
+    timings = current_timings.get()
+    if timings is not None:
+        timings.add(**amounts)
+
+
+def _documents_in_reply(reply):
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    if "value" in reply:
+        return 1 if reply["value"] is not None else 0
+    return 0
+
+
+class CommandTimer(monitoring.CommandListener):
+    """pymongo command listener feeding the MongoDB metrics"""
+
+    def __init__(self):
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        with self._lock:
+            self._collections[event.request_id] = collection if isinstance(collection, str) else ""
+
+    def succeeded(self, event):
+        with self._lock:
+            collection = self._collections.pop(event.request_id, "")
+        seconds = event.duration_micros / 1e6
+        documents = _documents_in_reply(event.reply)
+        mongo_command_duration.observe(event.command_name, collection, value=seconds)
+        record(mongo_seconds=seconds, mongo_commands=1, mongo_documents=documents)
+
+    def failed(self, event):
+        with self._lock:
+            self._collections.pop(event.request_id, None)
+        seconds = event.duration_micros / 1e6
+        mongo_command_failures.inc(event.command_name)
+        record(mongo_seconds=seconds, mongo_commands=1)
+
+
+command_timer = CommandTimer()
+
+
+def instrument_serialization():
+    """Time FastAPI's response validation/serialization step.
+
+    ``fastapi.routing.serialize_response`` is looked up at call time by the
+    request handler, so wrapping the module attribute covers every route.
+    """
+    from fastapi import routing
+
+    original = routing.serialize_response
+    if getattr(original, "_timed", False):
+        return
+
+    async def serialize_response(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await original(*args, **kwargs)
+        finally:
+            record(serialize_seconds=time.perf_counter() - start)
+
+    serialize_response._timed = True
+    routing.serialize_response = serialize_response
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route request metrics"""
+
+    def __init__(self, app, server_timing=False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", self._server_timing(timings, start).encode())
+                    ]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            current_timings.reset(token)
+            elapsed = time.perf_counter() - start
+            route = self._route_label(scope, status)
+            method = scope["method"]
+            http_request_duration.observe(method, route, str(status), value=elapsed)
+            http_response_size.observe(method, route, value=size)
+            request_mongo_duration.observe(route, value=timings.mongo_seconds)
+            request_mongo_documents.observe(route, value=timings.mongo_documents)
+            if timings.bcrypt_seconds:
+                request_bcrypt_duration.observe(route, value=timings.bcrypt_seconds)
+            if timings.serialize_seconds:
+                request_serialize_duration.observe(route, value=timings.serialize_seconds)
+
+    @staticmethod
+    def _route_label(scope, status):
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        # Responses served by middleware (e.g. cache hits) never reach the router;
+        # unmatched paths are collapsed to keep label cardinality bounded
+        return scope["path"] if status < 400 else "unmatched"
+
+    @staticmethod
+    def _server_timing(timings, start):
+        total = (time.perf_counter() - start) * 1000
+        return ", ".join([
+            f"app;dur={total:.2f}",
+            f'db;dur={timings.mongo_seconds * 1000:.2f};desc="{timings.mongo_commands} commands, '
+            f'{timings.mongo_documents} docs"',
+            f"bcrypt;dur={timings.bcrypt_seconds * 1000:.2f}",
+            f"serialize;dur={timings.serialize_seconds * 1000:.2f}",
+        ])
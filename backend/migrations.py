@@ -0,0 +1,70 @@
+"""One-shot data migrations.
+
+``migrate_dates`` converts legacy ISO-string ``created_at`` timestamps and
+``date`` fields into native BSON dates. It works in ``_id`` order in
+batches of ``bulk_write`` updates and only selects documents that still hold
+strings, so it can be interrupted and re-run at any time; converted documents
+are never touched twice. Values that cannot be parsed are left as they are
+and reported.
+"""
+import logging
+
+from pymongo import UpdateOne
+
+from dates import as_date, day_start, parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+# collection -> {field: parser}
+DATE_FIELDS = {
+    "users": {"created_at": parse_timestamp},
+    "students": {"created_at": parse_timestamp},
+    "companies": {"created_at": parse_timestamp},
+    "drives": {"created_at": parse_timestamp, "date": lambda value: day_start(as_date(value))},
+    "offers": {"created_at": parse_timestamp, "date": lambda value: day_start(as_date(value))},
+}
+
+MAX_REPORTED_FAILURES = 100
+
+
+async def migrate_dates(db, batch_size=1000):
+    """Convert string dates to BSON dates; returns per-collection counts"""
+    report = {}
+    for collection_name, parsers in DATE_FIELDS.items():
+        collection = db[collection_name]
+        stats = {"migrated": 0, "failed": 0, "failures": []}
+        string_fields = [{field: {"$type": "string"}} for field in parsers]
+        projection = {field: 1 for field in parsers}
+        last_id = None
+
+        while True:
+            query = {"$or": string_fields}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            batch = await collection.find(query, projection).sort("_id", 1).limit(batch_size).to_list(batch_size)
+            if not batch:
+                break
+            last_id = batch[-1]["_id"]
+
+            operations = []
+            for doc in batch:
+                update = {}
+                for field, parse in parsers.items():
+                    value = doc.get(field)
+                    if not isinstance(value, str):
+                        continue
+                    try:
+                        update[field] = parse(value)
+                    except ValueError:
+                        stats["failed"] += 1
+                        if len(stats["failures"]) < MAX_REPORTED_FAILURES:
+                            stats["failures"].append({"_id": str(doc["_id"]), "field": field, "value": value})
+                if update:
+                    operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": update}))
+            if operations:
+                result = await collection.bulk_write(operations, ordered=False)
+                stats["migrated"] += result.modified_count
+            logger.info(f"{collection_name}: migrated {stats['migrated']} documents so far")
+
+        report[collection_name] = stats
+    return report
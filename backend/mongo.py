@@ -0,0 +1,179 @@
+"""MongoDB client factory.
+
+Each process (each uvicorn worker) holds one ``MongoClientFactory`` and so
+one connection pool per MongoDB server. Pool size, idle and timeout settings
+come from the environment (``client_options``), so a deployment running N
+workers can keep N * ``MONGO_MAX_POOL_SIZE`` below what the server allows.
+
+The Motor client is created on first use rather than at import, so importing
+the app opens no sockets; ``warm`` opens the first connections during startup
+instead of on the first requests. ``LazyDatabase`` is the handle the rest of
+the code uses in place of a Motor database. ``PoolStats`` is a pymongo
+``ConnectionPoolListener`` keeping live counters for each pool.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReadPreference, monitoring
+
+logger = logging.getLogger(__name__)
+
+# environment variable -> MongoClient keyword
+OPTIONS = {
+    "MONGO_MAX_POOL_SIZE": "maxPoolSize",
+    "MONGO_MIN_POOL_SIZE": "minPoolSize",
+    "MONGO_MAX_IDLE_TIME_MS": "maxIdleTimeMS",
+    "MONGO_MAX_CONNECTING": "maxConnecting",
+    "MONGO_WAIT_QUEUE_TIMEOUT_MS": "waitQueueTimeoutMS",
+    "MONGO_SERVER_SELECTION_TIMEOUT_MS": "serverSelectionTimeoutMS",
+    "MONGO_CONNECT_TIMEOUT_MS": "connectTimeoutMS",
+    "MONGO_SOCKET_TIMEOUT_MS": "socketTimeoutMS",
+}
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+
+def client_options(environ=os.environ):
+    """MongoClient keywords for the pool settings present in ``environ``"""
+    return {keyword: int(environ[name]) for name, keyword in OPTIONS.items() if environ.get(name)}
+
+
+def read_preference(name):
+    if name not in READ_PREFERENCES:
+        raise ValueError(f"Unknown read preference {name!r}; use one of: {', '.join(READ_PREFERENCES)}")
+    return READ_PREFERENCES[name]
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Live connection counts per server; pymongo calls these from its own threads"""
+
+    def __init__(self):
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _update(self, address, **changes):
+        key = f"{address[0]}:{address[1]}"
+        with self._lock:
+            pool = self._pools.setdefault(key, {
+                "open": 0, "in_use": 0, "waiting": 0, "checkouts": 0, "checkout_failures": 0, "cleared": 0,
+            })
+            for name, change in changes.items():
+                pool[name] += change
+
+    def pool_created(self, event):
+        self._update(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._update(event.address, cleared=1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._update(event.address, open=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._update(event.address, open=-1)
+
+    def connection_check_out_started(self, event):
+        self._update(event.address, waiting=1)
+
+    def connection_check_out_failed(self, event):
+        self._update(event.address, waiting=-1, checkout_failures=1)
+
+    def connection_checked_out(self, event):
+        self._update(event.address, waiting=-1, in_use=1, checkouts=1)
+
+    def connection_checked_in(self, event):
+        self._update(event.address, in_use=-1)
+
+    def snapshot(self):
+        with self._lock:
+            return {address: dict(pool) for address, pool in self._pools.items()}
+
+
+class MongoClientFactory:
+    def __init__(self, url, db_name, options=None, codec_options=None, event_listeners=()):
+        self.url = url
+        self.db_name = db_name
+        self.options = dict(options or {})
+        self.codec_options = codec_options
+        self.event_listeners = list(event_listeners)
+        self.pool_stats = PoolStats()
+        self._client = None
+        self._databases = {}
+
+    @property
+    def created(self):
+        return self._client is not None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = AsyncIOMotorClient(
+                self.url, event_listeners=[*self.event_listeners, self.pool_stats], **self.options
+            )
+            logger.info(f"MongoDB client created with {self.options or 'default pool settings'}")
+        return self._client
+
+    def database(self, read_preference=None, name=None):
+        """The Motor database (``db_name`` unless ``name`` is given), optionally with its own read preference"""
+        name = name or self.db_name
+        key = (name, read_preference.name if read_preference is not None else None)
+        db = self._databases.get(key)
+        if db is None:
+            db = self.client.get_database(
+                name, codec_options=self.codec_options, read_preference=read_preference
+            )
+            self._databases[key] = db
+        return db
+
+    async def warm(self, connections=None):
+        """Connect and open up to ``connections`` pooled connections (default: minPoolSize, at least one)"""
+        count = max(1, connections or self.options.get("minPoolSize", 0))
+        start = time.perf_counter()
+        # Overlapping pings each need a connection of their own
+        await asyncio.gather(*(self.client.admin.command("ping") for _ in range(count)))
+        return time.perf_counter() - start
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+            self._databases.clear()
+
+    def stats(self):
+        return {"created": self.created, "options": self.options, "pools": self.pool_stats.snapshot()}
+
+
+class LazyDatabase:
+    """Stands in for a Motor database; the client is created on first use"""
+
+    def __init__(self, factory, read_preference=None):
+        self._factory = factory
+        self._read_preference = read_preference
+
+    def _database(self):
+        return self._factory.database(self._read_preference)
+
+    def __getattr__(self, name):
+        return getattr(self._database(), name)
+
+    def __getitem__(self, name):
+        return self._database()[name]
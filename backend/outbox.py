@@ -0,0 +1,227 @@
+"""Outbox for propagating renames into denormalized copies.
+
+Drives and offers carry copies of ``company_name`` and ``student_name`` so
+list reads need no joins. When a company or student is renamed, the update
+handler records an event in the ``outbox`` collection, and ``OutboxWorker``
+fans the rename out to drives and offers with batched ``update_many`` calls.
+
+An event is recorded *prepared* before the update and released once the
+update has landed. Until then no worker, in this process or another, may
+claim it, since it would copy the old name and mark the rename done. If the
+handler dies in between, the event becomes due by itself after
+``PREPARE_SECONDS``.
+
+Events only say which entity changed; the worker always copies the name the
+entity has *now*. That makes processing idempotent and insensitive to order:
+replaying an event, retrying it or handling two renames out of order all
+converge on the current name, and an event recorded for an update that never
+landed is a no-op. Failed batches are retried with exponential backoff;
+events that keep failing end up with status ``failed`` for inspection.
+Claims are leases, so events held by a crashed worker are picked up again.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from pymongo import UpdateMany, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# entity -> (source collection, [(target collection, foreign key, name copy)])
+TARGETS = {
+    "company": ("companies", [("drives", "company_id", "company_name"), ("offers", "company_id", "company_name")]),
+    "student": ("students", [("offers", "student_id", "student_name")]),
+}
+
+BATCH_SIZE = 100
+LEASE_SECONDS = 60
+MAX_ATTEMPTS = 10
+MAX_BACKOFF_SECONDS = 300
+# How long a prepared event waits for its update before it is processed anyway
+PREPARE_SECONDS = 60
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+async def record_rename(db, entity, entity_id):
+    """Prepare propagation of ``entity``'s name; call ``release`` with the returned id after the update"""
+    now = _now()
+    event_id = str(uuid.uuid4())
+    await db.outbox.insert_one({
+        "id": event_id,
+        "entity": entity,
+        "entity_id": entity_id,
+        "status": "prepared",
+        "attempts": 0,
+        "created_at": now,
+        "available_at": now + timedelta(seconds=PREPARE_SECONDS),
+    })
+    return event_id
+
+
+async def release(db, event_id):
+    """Make a prepared event due now that its update has landed"""
+    await db.outbox.update_one(
+        {"id": event_id, "status": "prepared"}, {"$set": {"status": "pending", "available_at": _now()}},
+    )
+
+
+async def _claim(db, batch_size, lease_seconds):
+    now = _now()
+    claimable = {"$or": [
+        {"status": {"$in": ["pending", "prepared"]}, "available_at": {"$lte": now}},
+        {"status": "processing", "locked_until": {"$lt": now}},
+    ]}
+    cursor = db.outbox.find(claimable, {"_id": 0, "id": 1}).sort("created_at", 1).limit(batch_size)
+    candidates = await cursor.to_list(batch_size)
+    if not candidates:
+        return None, []
+    owner = str(uuid.uuid4())
+    await db.outbox.update_many(
+        {"id": {"$in": [event["id"] for event in candidates]}, **claimable},
+        {"$set": {"status": "processing", "owner": owner,
+                  "locked_until": now + timedelta(seconds=lease_seconds)}},
+    )
+    # Another worker may have claimed some of them in between; keep only ours
+    return owner, await db.outbox.find({"owner": owner, "status": "processing"}, {"_id": 0}).to_list(None)
+
+
+async def propagate(db, entity, entity_ids):
+    """Copy current names of ``entity_ids`` into every target; returns modified counts"""
+    source, targets = TARGETS[entity]
+    current = await db[source].find({"id": {"$in": list(entity_ids)}}, {"_id": 0, "id": 1, "name": 1}).to_list(None)
+    modified = {}
+    for collection, foreign_key, name_field in targets:
+        operations = [
+            UpdateMany({foreign_key: doc["id"], name_field: {"$ne": doc["name"]}}, {"$set": {name_field: doc["name"]}})
+            for doc in current
+        ]
+        if operations:
+            result = await db[collection].bulk_write(operations, ordered=False)
+            modified[collection] = modified.get(collection, 0) + result.modified_count
+    return modified
+
+
+async def process_batch(db, batch_size=BATCH_SIZE, lease_seconds=LEASE_SECONDS):
+    """Claim and apply one batch of events.
+
+    Returns ``{"events": n, "modified": {collection: count}}``; ``events`` is
+    0 when nothing was due.
+    """
+    owner, events = await _claim(db, batch_size, lease_seconds)
+    if not events:
+        return {"events": 0, "modified": {}}
+
+    by_entity = {}
+    for event in events:
+        by_entity.setdefault(event["entity"], set()).add(event["entity_id"])
+
+    modified = {}
+    try:
+        for entity, entity_ids in by_entity.items():
+            for collection, count in (await propagate(db, entity, entity_ids)).items():
+                modified[collection] = modified.get(collection, 0) + count
+    except Exception as e:
+        logger.warning(f"Rename propagation failed for {len(events)} events: {e}")
+        retry_at = _now()
+        operations = []
+        for event in events:
+            attempts = event["attempts"] + 1
+            backoff = min(MAX_BACKOFF_SECONDS, 2 ** attempts)
+            operations.append(UpdateOne({"id": event["id"], "owner": owner}, {
+                "$set": {
+                    "status": "failed" if attempts >= MAX_ATTEMPTS else "pending",
+                    "attempts": attempts,
+                    "available_at": retry_at + timedelta(seconds=backoff),
+                    "last_error": str(e),
+                },
+                "$unset": {"owner": "", "locked_until": ""},
+            }))
+        await db.outbox.bulk_write(operations, ordered=False)
+        raise
+
+    await db.outbox.update_many({"owner": owner}, {
+        "$set": {"status": "done", "processed_at": _now()},
+        "$unset": {"owner": "", "locked_until": ""},
+    })
+    return {"events": len(events), "modified": modified}
+
+
+async def drain(db, batch_size=BATCH_SIZE):
+    """Process events until none are due; returns totals"""
+    totals = {"events": 0, "modified": {}}
+    while True:
+        result = await process_batch(db, batch_size)
+        if not result["events"]:
+            return totals
+        totals["events"] += result["events"]
+        for collection, count in result["modified"].items():
+            totals["modified"][collection] = totals["modified"].get(collection, 0) + count
+
+
+async def requeue_failed(db):
+    """Give events that exhausted their retries another round"""
+    result = await db.outbox.update_many(
+        {"status": "failed"}, {"$set": {"status": "pending", "attempts": 0, "available_at": _now()}}
+    )
+    return result.modified_count
+
+
+class OutboxWorker:
+    """Background task draining the outbox; ``notify`` wakes it right away.
+
+    ``on_propagated`` is called with the names of the collections that were
+    modified, e.g. to invalidate cached responses.
+    """
+
+    def __init__(self, db, interval=5.0, batch_size=BATCH_SIZE, on_propagated=None):
+        self.db = db
+        self.interval = interval
+        self.batch_size = batch_size
+        self.on_propagated = on_propagated
+        self.processed = 0
+        self.failures = 0
+        self._wake = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def notify(self):
+        self._wake.set()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                result = await process_batch(self.db, self.batch_size)
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Outbox batch failed: {e}")
+                result = None
+            if result and result["events"]:
+                self.processed += result["events"]
+                if self.on_propagated and any(result["modified"].values()):
+                    self.on_propagated([name for name, count in result["modified"].items() if count])
+                if result["events"] == self.batch_size:
+                    continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self):
+        return {"processed": self.processed, "failures": self.failures}
@@ -0,0 +1,291 @@
+"""In-memory package distribution over every offer.
+
+Each offer is one row in a set of NumPy arrays (package, year, and the
+department of the student who holds it), so quantiles, per-department and
+per-year breakdowns and histograms are vectorized passes over the columns
+instead of aggregations over the offers collection.
+
+Like the eligibility index, it is loaded once and kept current by the write
+routes (``offers_added``, ``offer_removed``, ``student_moved``); writes made
+by other processes are picked up by a background reload once the index is
+older than ``max_age`` seconds.
+"""
+import asyncio
+import logging
+import math
+import time
+
+from dates import as_date
+from lazyimport import lazy_import
+
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+OFFER_FIELDS = {"_id": 0, "id": 1, "student_id": 1, "package": 1, "date": 1}
+QUANTILES = {"p25": 0.25, "median": 0.5, "p75": 0.75, "p90": 0.9}
+# Histograms wider than this are refused rather than built
+MAX_BUCKETS = 500
+# Department code of offers whose student no longer exists
+NO_DEPARTMENT = -1
+
+
+class OfferColumns:
+    """Column storage; rows are never moved, removed rows are masked out"""
+
+    def __init__(self, capacity=1024):
+        self.rows = {}
+        self.student_rows = {}
+        self.student_departments = {}
+        self.departments = {}
+        self.size = 0
+        self.package = np.zeros(capacity, dtype=np.float64)
+        self.year = np.zeros(capacity, dtype=np.int16)
+        self.department = np.full(capacity, NO_DEPARTMENT, dtype=np.int16)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+    def _grow(self, needed):
+        capacity = max(len(self.package) * 2, needed)
+        for name, fill in (("package", 0.0), ("year", 0), ("department", NO_DEPARTMENT), ("alive", False)):
+            column = getattr(self, name)
+            grown = np.full(capacity, fill, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def department_code(self, name):
+        if name is None:
+            return NO_DEPARTMENT
+        return self.departments.setdefault(name, len(self.departments))
+
+    def department_names(self):
+        names = [None] * len(self.departments)
+        for name, code in self.departments.items():
+            names[code] = name
+        return names
+
+    def set_student(self, student_id, department):
+        self.student_departments[student_id] = department
+
+    def add(self, offers):
+        """Append offers; ``student_departments`` must already know their students"""
+        offers = [offer for offer in offers if offer["id"] not in self.rows]
+        if not offers:
+            return
+        start = self.size
+        end = start + len(offers)
+        if end > len(self.package):
+            self._grow(end)
+        self.package[start:end] = [offer["package"] for offer in offers]
+        self.year[start:end] = [as_date(offer["date"]).year for offer in offers]
+        self.department[start:end] = [
+            self.department_code(self.student_departments.get(offer["student_id"])) for offer in offers
+        ]
+        self.alive[start:end] = True
+        for row, offer in enumerate(offers, start):
+            self.rows[offer["id"]] = row
+            self.student_rows.setdefault(offer["student_id"], []).append(row)
+        self.size = end
+
+    def remove(self, offer_id):
+        row = self.rows.pop(offer_id, None)
+        if row is not None:
+            self.alive[row] = False
+
+    def move_student(self, student_id, department):
+        """Re-file a student's offers under ``department`` (``None``: the student was deleted)"""
+        if department is None:
+            self.student_departments.pop(student_id, None)
+        else:
+            self.student_departments[student_id] = department
+        rows = self.student_rows.get(student_id)
+        if rows:
+            self.department[rows] = self.department_code(department)
+
+
+def bucket_edges(packages, width):
+    """Histogram edges ``width`` LPA apart covering sorted ``packages``"""
+    low = math.floor(float(packages[0]) / width) * width
+    buckets = int((float(packages[-1]) - low) // width) + 1
+    if low + buckets * width <= packages[-1]:
+        # Rounding left the largest package on the last edge
+        buckets += 1
+    if buckets > MAX_BUCKETS:
+        raise ValueError(f"A bucket width of {width} needs {buckets} buckets; at most {MAX_BUCKETS} are allowed")
+    return low + width * np.arange(buckets + 1)
+
+
+def _describe_sorted(packages, edges):
+    """Summary and histogram of a non-empty sorted array.
+
+    On sorted data a quantile is an index lookup (NumPy's default linear
+    interpolation) and a histogram is one ``searchsorted`` over the edges.
+    """
+    n = len(packages)
+    positions = np.array(list(QUANTILES.values())) * (n - 1)
+    below = np.floor(positions).astype(np.intp)
+    above = np.minimum(below + 1, n - 1)
+    quantiles = packages[below] + (packages[above] - packages[below]) * (positions - below)
+    counts = np.diff(np.searchsorted(packages, edges))
+    return {
+        "count": int(n),
+        "mean": round(float(packages.mean()), 2),
+        "min": round(float(packages[0]), 2),
+        "max": round(float(packages[-1]), 2),
+        **{name: round(float(value), 2) for name, value in zip(QUANTILES, quantiles)},
+        "histogram": {"edges": [round(float(edge), 2) for edge in edges], "counts": counts.tolist()},
+    }
+
+
+def describe(packages, width):
+    """Summary and histogram of a set of packages"""
+    if not len(packages):
+        return {"count": 0, "histogram": {"edges": [], "counts": []}}
+    packages = np.sort(packages)
+    return _describe_sorted(packages, bucket_edges(packages, width))
+
+
+def describe_groups(packages, codes, width):
+    """``[(code, description)]`` for each code present, sharing one set of histogram edges.
+
+    Rows are ordered by (code, package) with a single float sort: each code is
+    offset by a span wider than the package range, so the groups come out as
+    contiguous, already sorted slices. Picking groups out one mask at a time,
+    or an argsort followed by gathers, costs several times more.
+    """
+    if not len(packages):
+        return []
+    low = int(codes.min())
+    floor = float(packages.min())
+    span = 2.0 ** math.ceil(math.log2(float(packages.max()) - floor + 1))
+    keys = np.sort((codes - low) * span + (packages - floor))
+
+    offsets = np.flatnonzero(np.bincount(codes - low))
+    starts = np.searchsorted(keys, offsets * span)
+    ends = np.append(starts[1:], len(keys))
+    # Removing the offset again is exact up to float rounding; rounding to 1e-6 LPA undoes that
+    groups = [np.round(keys[start:end] - (offset * span - floor), 6)
+              for offset, start, end in zip(offsets, starts, ends)]
+    edges = bucket_edges(np.array([float(packages.min()), float(packages.max())]), width)
+    return [(int(offset) + low, _describe_sorted(group, edges)) for offset, group in zip(offsets, groups)]
+
+
+async def load_columns(db, capacity=1024):
+    """Read every offer and its student's department into columns"""
+    students = await db.students.find({}, {"_id": 0, "id": 1, "department": 1}).to_list(None)
+    offers = await db.offers.find({}, OFFER_FIELDS).to_list(None)
+
+    def build():
+        columns = OfferColumns(capacity=max(capacity, len(offers)))
+        for student in students:
+            columns.set_student(student["id"], student.get("department"))
+        columns.add(offers)
+        return columns
+
+    # Building the columns loops over every offer; keep it off the event loop
+    return await asyncio.to_thread(build)
+
+
+class PackageIndex:
+    def __init__(self, max_age=300.0):
+        self.max_age = max_age
+        self.loaded_at = None
+        # Created by the first load
+        self._columns = None
+        self._pending = None
+        self._reload_task = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self):
+        return self.loaded_at is not None
+
+    def _apply(self, method, *args):
+        if self._columns is not None:
+            getattr(self._columns, method)(*args)
+        if self._pending is not None:
+            # Replayed onto the arrays being loaded so the update is not lost
+            self._pending.append((method, args))
+
+    async def load(self, db):
+        """(Re)build the index from MongoDB; concurrent writes are replayed onto it"""
+        async with self._lock:
+            self._pending = []
+            try:
+                start = time.perf_counter()
+                columns = await load_columns(db)
+                for method, args in self._pending:
+                    getattr(columns, method)(*args)
+
+                self._columns = columns
+                self.loaded_at = time.monotonic()
+                logger.info(f"Package index loaded: {len(columns.rows)} offers in {time.perf_counter() - start:.2f}s")
+            finally:
+                self._pending = None
+
+    def reload_if_stale(self, db):
+        """Start a background reload when the index is older than ``max_age``"""
+        if self.max_age <= 0 or self.loaded_at is None:
+            return
+        if time.monotonic() - self.loaded_at < self.max_age:
+            return
+        if self._reload_task is None or self._reload_task.done():
+            self._reload_task = asyncio.create_task(self.load(db))
+
+    def offers_added(self, offers, departments):
+        """Record new offers; ``departments`` maps their student ids to departments"""
+        for student_id, department in departments.items():
+            self._apply("set_student", student_id, department)
+        self._apply("add", list(offers))
+
+    def offer_removed(self, offer_id):
+        self._apply("remove", offer_id)
+
+    def student_moved(self, student_id, department):
+        """A student changed department, or was deleted (``department=None``)"""
+        self._apply("move_student", student_id, department)
+
+    def _selection(self, department=None, year=None, with_department=False):
+        """Packages, years and department codes of the live rows matching the filters"""
+        columns = self._columns
+        n = columns.size
+        mask = columns.alive[:n].copy()
+        if with_department:
+            # Offers of deleted students have no department
+            mask &= columns.department[:n] != NO_DEPARTMENT
+        if department is not None:
+            mask &= columns.department[:n] == columns.departments.get(department, -2)
+        if year is not None:
+            mask &= columns.year[:n] == year
+        return columns.package[:n][mask], columns.year[:n][mask], columns.department[:n][mask]
+
+    def distribution(self, width, department=None, year=None):
+        """Summary and histogram of every offer, optionally for one department and/or year"""
+        if self._columns is None:
+            return describe(np.zeros(0), width)
+        packages, _, _ = self._selection(department, year)
+        return describe(packages, width)
+
+    def by_department(self, width, year=None):
+        """One distribution per department, on shared histogram edges"""
+        if self._columns is None:
+            return []
+        packages, _, codes = self._selection(year=year, with_department=True)
+        names = self._columns.department_names()
+        groups = describe_groups(packages, codes, width)
+        return sorted(({"department": names[code], **stats} for code, stats in groups),
+                      key=lambda group: group["department"])
+
+    def by_year(self, width, department=None):
+        """One distribution per offer year, on shared histogram edges"""
+        if self._columns is None:
+            return []
+        packages, years, _ = self._selection(department=department)
+        return [{"year": str(code), **stats} for code, stats in describe_groups(packages, years, width)]
+
+    def stats(self):
+        columns = self._columns
+        return {
+            "offers": len(columns.rows) if columns is not None else 0,
+            "rows": columns.size if columns is not None else 0,
+            "age_seconds": round(time.monotonic() - self.loaded_at, 1) if self.loaded_at else None,
+        }
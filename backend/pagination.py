@@ -0,0 +1,63 @@
+"""Keyset pagination helpers shared by the list endpoints.
+
+Pages are ordered by the application-level ``id`` key and continue from the
+last id of the previous page (``?after=<id>``), so each page costs O(limit)
+no matter how deep into the collection the client is.
+"""
+from fastapi import HTTPException
+
+from dates import day_start
+
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 1000
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def build_projection(fields, model):
+    """Translate a comma separated ``fields=`` value into a Mongo projection.
+
+    ``id`` is always included because it is the pagination key. Returns None
+    when no projection was requested.
+    """
+    if not fields:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in model.model_fields]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown field(s) for {model.__name__}: {', '.join(unknown)}"
+        )
+    projection = {"_id": 0, "id": 1}
+    for field in requested:
+        projection[field] = 1
+    return projection
+
+
+async def fetch_page(collection, query, after=None, limit=DEFAULT_PAGE_SIZE, projection=None):
+    """Return ``(docs, next_cursor)`` for one page of ``collection``.
+
+    ``next_cursor`` is the id to pass as ``after`` for the following page, or
+    None when this is the last page.
+    """
+    query = dict(query)
+    if after:
+        query["id"] = {"$gt": after}
+    cursor = collection.find(query, projection or {"_id": 0}).sort("id", 1).limit(limit + 1)
+    docs = await cursor.to_list(limit + 1)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = docs[-1]["id"]
+    return docs, next_cursor
+
+
+def date_range(date_from=None, date_to=None):
+    """Mongo condition for an inclusive date range, or None when unbounded"""
+    condition = {}
+    if date_from is not None:
+        condition["$gte"] = day_start(date_from)
+    if date_to is not None:
+        condition["$lte"] = day_start(date_to)
+    return condition or None
@@ -0,0 +1,75 @@
+"""Bounded worker pool for password hashing and verification.
+
+bcrypt is deliberately slow (100-300 ms per call) and would stall the event
+loop if called inline from an async handler. The pool runs it on a small
+dedicated thread pool (bcrypt releases the GIL while hashing) and caps how
+much work may queue up, so a login burst degrades into fast 503s instead of
+unbounded latency for every other request.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PoolSaturated(Exception):
+    """Raised when the pool already has its maximum amount of work queued"""
+
+    def __init__(self, retry_after):
+        super().__init__("Password worker pool is saturated")
+        self.retry_after = retry_after
+
+
+class PasswordWorkerPool:
+    def __init__(self, max_workers=2, max_queue=32, retry_after=1):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password")
+        # Running plus queued calls; only touched from the event loop thread
+        self._pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.rejected = 0
+
+    def _finished(self, future):
+        self._pending -= 1
+        if future.cancelled():
+            self.cancelled += 1
+        elif future.exception() is not None:
+            self.failed += 1
+        else:
+            self.completed += 1
+
+    async def run(self, fn, *args):
+        if self._pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise PoolSaturated(self.retry_after)
+        loop = asyncio.get_running_loop()
+        future = self._executor.submit(fn, *args)
+        self._pending += 1
+
+        def done(future):
+            # A call stays pending until its thread is done with it, even if the caller
+            # was cancelled meanwhile; the callback runs on the worker thread
+            try:
+                loop.call_soon_threadsafe(self._finished, future)
+            except RuntimeError:
+                # The loop is already closed (shutdown)
+                pass
+
+        future.add_done_callback(done)
+        return await asyncio.wrap_future(future, loop=loop)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "rejected": self.rejected
+        }
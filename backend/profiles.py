@@ -0,0 +1,52 @@
+"""Student profiles: a student together with their offers and drives.
+
+``load_profile`` reads the student, then their offers (best package first,
+from the ``offers.student_id_package`` index), the drives open to their
+department and the shortlists they appear on, the last three concurrently.
+The placement fields are derived from the offers, so a profile is always
+consistent with the offers it lists.
+"""
+import asyncio
+
+OFFER_FIELDS = {"_id": 0}
+DRIVE_FIELDS = {"_id": 0, "id": 1, "company_id": 1, "company_name": 1, "role": 1, "date": 1}
+# Only the student's own entry of each shortlist
+SHORTLIST_FIELDS = {"_id": 0, "drive_id": 1, "students.$": 1}
+
+
+async def load_profile(db, student_id):
+    """Profile of ``student_id``, or ``None`` when there is no such student"""
+    student = await db.students.find_one({"id": student_id}, {"_id": 0})
+    if not student:
+        return None
+
+    offers, drives, shortlisted = await asyncio.gather(
+        db.offers.find({"student_id": student_id}, OFFER_FIELDS).sort([("package", -1), ("id", 1)]).to_list(None),
+        db.drives.find({"eligible_departments": student["department"]}, DRIVE_FIELDS).sort("date", 1).to_list(None),
+        db.shortlists.find({"students.student_id": student_id}, SHORTLIST_FIELDS).to_list(None),
+    )
+
+    entries = {doc["drive_id"]: doc["students"][0] for doc in shortlisted if doc.get("students")}
+    participation = []
+    for drive in drives:
+        entry = entries.get(drive["id"])
+        participation.append({
+            "drive_id": drive["id"],
+            "company_id": drive.get("company_id"),
+            "company_name": drive.get("company_name"),
+            "role": drive.get("role"),
+            "date": drive.get("date"),
+            "shortlisted": entry is not None,
+            "rank": entry["rank"] if entry else None,
+            "conflicts": entry.get("conflicts", []) if entry else [],
+        })
+
+    return {
+        "student": student,
+        "offers": offers,
+        "offer_count": len(offers),
+        "highest_package": offers[0]["package"] if offers else None,
+        "placed": bool(offers),
+        "drives": participation,
+        "shortlisted_drives": sum(drive["shortlisted"] for drive in participation),
+    }
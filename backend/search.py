@@ -0,0 +1,296 @@
+"""In-process search over students, companies and drives.
+
+The index is a token-level inverted index: every searchable field is split
+into lowercase tokens, and each token maps to the documents containing it,
+weighted by field. A query term matches tokens exactly, by prefix (a binary
+search over the sorted vocabulary) or, when nothing matches that way,
+approximately: candidate words sharing enough trigrams with the term are
+kept if they are within one or two edits of it. Only alphabetic words go
+into the trigram index, so typo tolerance applies to names, places and roles
+rather than to roll numbers.
+
+Documents hit by every query term rank first, by the sum of their best
+match per term. The index is built at startup and kept current by the write
+routes; like the eligibility index it is rebuilt in the background once it
+is older than ``max_age`` seconds, to pick up writes from other processes.
+"""
+import asyncio
+import bisect
+import heapq
+import logging
+import re
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# kind -> (collection, {field: weight}, display fields)
+KINDS = {
+    "student": ("students", {"name": 1.0, "roll_number": 1.0, "email": 0.7}, ("name", "roll_number", "department")),
+    "company": ("companies", {"name": 1.0, "domain": 0.6, "location": 0.5}, ("name", "domain", "location")),
+    "drive": ("drives", {"role": 0.8}, ("role", "company_name", "date")),
+}
+
+TOKEN = re.compile(r"[a-z0-9]+")
+WORD = re.compile(r"[a-z]+")
+# Prefix expansion stops after this many vocabulary words per term
+MAX_EXPANSIONS = 256
+FUZZY_MIN_LENGTH = 4
+
+
+def tokens(text):
+    """Alphanumeric runs of ``text`` plus the words inside mixed runs ("sharma12" -> "sharma")"""
+    text = str(text).lower()
+    found = set(TOKEN.findall(text))
+    found.update(WORD.findall(text))
+    return found
+
+
+def trigrams(word):
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def within_distance(a, b, limit):
+    """True when ``a`` and ``b`` are at most ``limit`` edits apart.
+
+    Edits are insertions, deletions, substitutions and transpositions of
+    adjacent letters (optimal string alignment distance).
+    """
+    if abs(len(a) - len(b)) > limit:
+        return False
+    before, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if before is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return False
+        before, previous = previous, current
+    return previous[-1] <= limit
+
+
+class _Postings:
+    def __init__(self):
+        self.entries = []      # doc number -> (kind, id, display) or None once removed
+        self.free = []         # numbers of removed documents, reused by the next new ones
+        self.numbers = {}      # (kind, id) -> doc number
+        self.doc_tokens = {}   # doc number -> tokens it contributed
+        self.postings = {}     # token -> {doc number: field weight}
+        self.vocabulary = []   # sorted tokens, for prefix lookups
+        self.trigrams = {}     # trigram -> alphabetic tokens containing it
+
+    def _add_token(self, token, bulk):
+        self.postings[token] = {}
+        if not bulk:
+            bisect.insort(self.vocabulary, token)
+        if token.isalpha():
+            for trigram in trigrams(token):
+                self.trigrams.setdefault(trigram, set()).add(token)
+
+    def _drop_token(self, token):
+        del self.postings[token]
+        del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+        if token.isalpha():
+            for trigram in trigrams(token):
+                words = self.trigrams[trigram]
+                words.discard(token)
+                if not words:
+                    del self.trigrams[trigram]
+
+    def _unindex(self, number):
+        for token in self.doc_tokens.pop(number):
+            posting = self.postings[token]
+            posting.pop(number, None)
+            if not posting:
+                self._drop_token(token)
+
+    def upsert(self, kind, doc, bulk=False):
+        _, fields, display = KINDS[kind]
+        # An updated document keeps its number, so entries grow with the documents rather than the writes
+        number = self.numbers.get((kind, doc["id"]))
+        if number is not None:
+            self._unindex(number)
+        elif self.free:
+            number = self.free.pop()
+        else:
+            number = len(self.entries)
+            self.entries.append(None)
+        self.entries[number] = (kind, doc["id"], {field: doc.get(field) for field in display})
+        self.numbers[(kind, doc["id"])] = number
+
+        weights = {}
+        for field, weight in fields.items():
+            if doc.get(field):
+                for token in tokens(doc[field]):
+                    weights[token] = max(weights.get(token, 0.0), weight)
+        for token, weight in weights.items():
+            if token not in self.postings:
+                self._add_token(token, bulk)
+            self.postings[token][number] = weight
+        self.doc_tokens[number] = list(weights)
+
+    def remove(self, kind, doc_id):
+        number = self.numbers.pop((kind, doc_id), None)
+        if number is None:
+            return
+        self.entries[number] = None
+        self.free.append(number)
+        self._unindex(number)
+
+    def finish_bulk(self):
+        self.vocabulary = sorted(self.postings)
+
+    def _expand(self, term):
+        """``[(token, quality)]`` for the vocabulary words matching ``term``"""
+        matches = []
+        if term in self.postings:
+            matches.append((term, 1.0))
+        if len(term) >= 2:
+            start = bisect.bisect_right(self.vocabulary, term)
+            for token in self.vocabulary[start:start + MAX_EXPANSIONS]:
+                if not token.startswith(term):
+                    break
+                matches.append((token, 0.6 + 0.3 * len(term) / len(token)))
+        if matches or len(term) < FUZZY_MIN_LENGTH or not term.isalpha():
+            return matches
+
+        limit = 1 if len(term) <= 6 else 2
+        term_trigrams = trigrams(term)
+        # A substitution breaks up to three trigrams, a transposition of adjacent letters four
+        needed = max(1, len(term_trigrams) - 4 * limit)
+        shared = Counter()
+        for trigram in term_trigrams:
+            shared.update(self.trigrams.get(trigram, ()))
+        for token, count in shared.items():
+            if count >= needed and within_distance(term, token, limit):
+                matches.append((token, 0.5 * (1 - limit / (len(term) + 1))))
+        return matches
+
+    def _score(self, matches, within=None):
+        """Best score per document for one term, optionally only for documents in ``within``"""
+        scores = {}
+        for token, quality in matches:
+            posting = self.postings[token]
+            if within is not None and len(within) < len(posting):
+                items = ((number, posting[number]) for number in within if number in posting)
+            elif within is not None:
+                items = ((number, weight) for number, weight in posting.items() if number in within)
+            else:
+                items = posting.items()
+            for number, weight in items:
+                score = quality * weight
+                if score > scores.get(number, 0.0):
+                    scores[number] = score
+        return scores
+
+    def search(self, query, kinds=None, limit=20):
+        terms = list(dict.fromkeys(TOKEN.findall(query.lower())))
+        if not terms:
+            return []
+        expanded = []
+        for term in terms:
+            matches = self._expand(term)
+            expanded.append((sum(len(self.postings[token]) for token, _ in matches), matches))
+        # Rarest term first, so later terms are only scored for documents still in the running
+        expanded.sort(key=lambda item: item[0])
+
+        scores = self._score(expanded[0][1])
+        for _, matches in expanded[1:]:
+            if not scores:
+                break
+            term_scores = self._score(matches, scores)
+            scores = {number: score + term_scores[number] for number, score in scores.items()
+                      if number in term_scores}
+        if not scores and len(expanded) > 1:
+            # Nothing matches every term; fall back to the best partial matches
+            scores = Counter()
+            for _, matches in expanded:
+                scores.update(self._score(matches))
+
+        if kinds:
+            scores = {number: score for number, score in scores.items() if self.entries[number][0] in kinds}
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        results = []
+        for number, score in best:
+            kind, doc_id, display = self.entries[number]
+            results.append({"type": kind, "id": doc_id, "score": round(score, 3), **display})
+        return results
+
+    def stats(self):
+        return {"documents": len(self.numbers), "tokens": len(self.postings), "trigrams": len(self.trigrams)}
+
+
+class SearchIndex:
+    def __init__(self, max_age=300.0):
+        self.max_age = max_age
+        self.loaded_at = None
+        self._postings = _Postings()
+        self._pending = None
+        self._reload_task = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self):
+        return self.loaded_at is not None
+
+    def _apply(self, method, *args):
+        getattr(self._postings, method)(*args)
+        if self._pending is not None:
+            # Replayed onto the index being built so the update is not lost
+            self._pending.append((method, args))
+
+    async def load(self, db):
+        """(Re)build the index from MongoDB; concurrent writes are replayed onto it"""
+        async with self._lock:
+            self._pending = []
+            try:
+                start = time.perf_counter()
+                documents = {}
+                for kind, (collection, fields, display) in KINDS.items():
+                    projection = {"_id": 0, "id": 1, **{field: 1 for field in (*fields, *display)}}
+                    documents[kind] = await db[collection].find({}, projection).to_list(None)
+
+                def build():
+                    postings = _Postings()
+                    for kind, docs in documents.items():
+                        for doc in docs:
+                            postings.upsert(kind, doc, bulk=True)
+                    postings.finish_bulk()
+                    return postings
+
+                # Tokenizing every document is CPU work; keep it off the event loop
+                postings = await asyncio.to_thread(build)
+                for method, args in self._pending:
+                    getattr(postings, method)(*args)
+                self._postings = postings
+                self.loaded_at = time.monotonic()
+                logger.info(f"Search index loaded: {postings.stats()} in {time.perf_counter() - start:.2f}s")
+            finally:
+                self._pending = None
+
+    def reload_if_stale(self, db):
+        """Start a background reload when the index is older than ``max_age``"""
+        if self.max_age <= 0 or self.loaded_at is None:
+            return
+        if time.monotonic() - self.loaded_at < self.max_age:
+            return
+        if self._reload_task is None or self._reload_task.done():
+            self._reload_task = asyncio.create_task(self.load(db))
+
+    def upsert(self, kind, doc):
+        self._apply("upsert", kind, doc)
+
+    def remove(self, kind, doc_id):
+        self._apply("remove", kind, doc_id)
+
+    def search(self, query, kinds=None, limit=20):
+        return self._postings.search(query, kinds, limit)
+
+    def stats(self):
+        stats = self._postings.stats()
+        stats["age_seconds"] = round(time.monotonic() - self.loaded_at, 1) if self.loaded_at else None
+        return stats
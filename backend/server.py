@@ -1,35 +1,178 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response, status
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from contextlib import asynccontextmanager
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr, ConfigDict
 from typing import List, Optional
 import uuid
-from datetime import datetime, timezone, timedelta
-from passlib.context import CryptContext
+import asyncio
+from datetime import date, datetime, timezone, timedelta
+from functools import lru_cache
 from jose import JWTError, jwt
-import random
+import time
+
+import aggregations
+import dates
+from dates import UTCDateTime
+import bulk_import
+import eligibility
+import exports
+import fastjson
+import fixtures
+import metrics
+import mongo
+import outbox
+import packages
+import profiles
+import search
+import shortlists
+import stream
+import summaries
+import tenancy
+from caching import ResponseCache, ResponseCacheMiddleware, TTLCache
+import indexes
+from indexes import ensure_indexes
+from passwords import PasswordWorkerPool, PoolSaturated
+from writebehind import QueueFull, WriteBehindBuffer
+from pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, build_projection, date_range, fetch_page
+)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# MongoDB connection; pool settings come from the MONGO_* variables (see mongo.OPTIONS)
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client['placementiq_db']
+mongo_factory = mongo.MongoClientFactory(
+    mongo_url,
+    os.environ.get('DB_NAME', 'placementiq_db'),
+    options=mongo.client_options(),
+    # Dates are stored as native BSON dates; see dates.CODEC_OPTIONS
+    codec_options=dates.CODEC_OPTIONS,
+    event_listeners=[metrics.command_timer],
+)
+
+# Tenancy: off (one college), database (a database per college) or field (shared collections keyed by college)
+TENANCY_MODE = os.environ.get("TENANCY_MODE", "off").lower()
+TENANTS = [tenant.strip() for tenant in os.environ.get("TENANTS", "").split(",") if tenant.strip()]
+# Tenant of requests whose token names none; unset, such requests cannot reach any college's data
+DEFAULT_TENANT = os.environ.get("DEFAULT_TENANT") or None
+tenancy.validate(TENANCY_MODE, TENANTS, DEFAULT_TENANT)
+# Startup and shutdown work runs once per tenant; once, unscoped, when tenancy is off
+SERVED_TENANTS = TENANTS if TENANCY_MODE != "off" else [None]
+
+def tenant_database(read_preference=None):
+    """The database of the current tenant (see tenancy)"""
+    if TENANCY_MODE == "database":
+        return tenancy.DatabasePerTenant(mongo_factory, read_preference)
+    if TENANCY_MODE == "field":
+        return tenancy.SharedDatabase(mongo_factory, read_preference)
+    return mongo.LazyDatabase(mongo_factory, read_preference)
+
+# The client is created on first use and warmed up by the lifespan
+db = tenant_database()
+# Analytics reads may be sent to secondaries; their responses are then not cached (see response_cache)
+ANALYTICS_READ_PREFERENCE = os.environ.get("MONGO_ANALYTICS_READ_PREFERENCE", "primary")
+analytics_db = tenant_database(mongo.read_preference(ANALYTICS_READ_PREFERENCE))
+# Field mode puts the tenant first in every index key
+REQUIRED_INDEXES = tenancy.scoped_indexes(indexes.REQUIRED_INDEXES) if TENANCY_MODE == "field" else None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the startup steps, serve, then shut down (see the LIFECYCLE section)"""
+    await startup()
+    try:
+        yield
+    finally:
+        await shutdown_db_client()
 
 # Create the main app
-app = FastAPI(title="PlacementIQ API")
+app = FastAPI(title="PlacementIQ API", lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing; passlib is imported and set up on first use, not at import
+@lru_cache(maxsize=None)
+def password_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# bcrypt runs off the event loop on a bounded pool; saturation returns 503
+password_pool = PasswordWorkerPool(
+    max_workers=int(os.environ.get("PASSWORD_HASH_WORKERS", "2")),
+    max_queue=int(os.environ.get("PASSWORD_HASH_QUEUE", "32")),
+    retry_after=int(os.environ.get("PASSWORD_HASH_RETRY_AFTER", "1")),
+)
+
+# Serialized responses of read-mostly routes, keyed by the collections they read
+ALL_COLLECTIONS = ("students", "companies", "drives", "offers")
+# Routes built from analytics_db reads
+ANALYTICS_DB_ROUTES = {
+    "/api/analytics/stats": ALL_COLLECTIONS,
+    "/api/analytics/department-placements": ("students", "offers"),
+    "/api/analytics/company-packages": ("companies",),
+    "/api/analytics/yearly-trends": ("offers",),
+    "/api/analytics/role-distribution": ("offers",),
+}
+
+response_cache = ResponseCache(
+    routes={
+        "/api/companies": ("companies",),
+        "/api/drives": ("drives",),
+        # A lagging secondary read right after a write would be cached under the new version
+        **(ANALYTICS_DB_ROUTES if ANALYTICS_READ_PREFERENCE == "primary" else {}),
+        "/api/analytics/package-distribution": ("students", "offers"),
+        "/api/analytics/package-distribution/by-department": ("students", "offers"),
+        "/api/analytics/package-distribution/by-year": ("students", "offers"),
+    },
+    ttl=float(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", "30")),
+    max_bytes=int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+    partition=tenancy.current,
+)
+
+# Ranks eligible students for drives from memory; reloaded in the background when older than this
+student_index = tenancy.PerTenant(lambda: eligibility.StudentIndex(
+    max_age=float(os.environ.get("ELIGIBILITY_INDEX_MAX_AGE_SECONDS", "300")),
+))
+
+# Offer packages by department and year for distribution analytics; reloaded in the background when older than this
+package_index = tenancy.PerTenant(lambda: packages.PackageIndex(
+    max_age=float(os.environ.get("PACKAGE_INDEX_MAX_AGE_SECONDS", "300")),
+))
+
+# In-process search over students, companies and drives; reloaded in the background when older than this
+search_index = tenancy.PerTenant(lambda: search.SearchIndex(
+    max_age=float(os.environ.get("SEARCH_INDEX_MAX_AGE_SECONDS", "300")),
+))
+
+def shortlists_written(job):
+    # Profiles embed the student's shortlist entries; no cached route reads shortlists
+    profile_cache.clear()
+
+# Batch shortlist jobs fan out over this many worker processes (default: one per CPU)
+shortlist_runner = tenancy.PerTenant(lambda: shortlists.ShortlistRunner(
+    max_workers=int(os.environ["SHORTLIST_WORKERS"]) if os.environ.get("SHORTLIST_WORKERS") else None,
+    on_done=shortlists_written,
+))
+
+def names_propagated(collections):
+    response_cache.bump(*collections)
+    # Profiles embed the names held by offers and drives
+    profile_cache.clear()
+
+# Propagates company/student renames into the name copies held by drives and offers
+outbox_worker = tenancy.PerTenant(lambda: outbox.OutboxWorker(
+    db,
+    interval=float(os.environ.get("OUTBOX_POLL_SECONDS", "5")),
+    on_propagated=names_propagated,
+))
 
 # JWT settings
 # CRITICAL: JWT_SECRET_KEY must be set in .env file - no default fallback for security
@@ -46,6 +189,25 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 hours
 # Security
 security = HTTPBearer()
 
+# Authenticated users, keyed by username, so protected routes skip the users lookup
+principal_cache = tenancy.PerTenant(lambda: TTLCache(
+    max_size=int(os.environ.get("AUTH_CACHE_MAX_SIZE", "1024")),
+    ttl=float(os.environ.get("AUTH_CACHE_TTL_SECONDS", "60")),
+))
+
+# Student and company names for offer entry; only consulted in write-behind mode
+OFFER_WRITE_BEHIND = os.environ.get("OFFER_WRITE_BEHIND", "").lower() in ("1", "true", "yes")
+name_cache = tenancy.PerTenant(lambda: TTLCache(
+    max_size=int(os.environ.get("NAME_CACHE_MAX_SIZE", "10000")),
+    ttl=float(os.environ.get("NAME_CACHE_TTL_SECONDS", "30")) if OFFER_WRITE_BEHIND else 0,
+))
+
+# Student profiles by student id; writes in this process invalidate them, the TTL bounds the rest
+profile_cache = tenancy.PerTenant(lambda: TTLCache(
+    max_size=int(os.environ.get("PROFILE_CACHE_MAX_SIZE", "5000")),
+    ttl=float(os.environ.get("PROFILE_CACHE_TTL_SECONDS", "30")),
+))
+
 # ==================== MODELS ====================
 
 class User(BaseModel):
@@ -54,16 +216,19 @@ class User(BaseModel):
     username: str
     email: EmailStr
     password_hash: str
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: UTCDateTime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class UserCreate(BaseModel):
     username: str
     email: EmailStr
     password: str
+    # College to register with when several are served (TENANCY_MODE)
+    tenant: Optional[str] = None
 
 class UserLogin(BaseModel):
     username: str
     password: str
+    tenant: Optional[str] = None
 
 class Token(BaseModel):
     access_token: str
@@ -78,7 +243,7 @@ class Student(BaseModel):
     cgpa: float
     email: str
     phone: str
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: UTCDateTime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class StudentCreate(BaseModel):
     name: str
@@ -96,7 +261,7 @@ class Company(BaseModel):
     package: float  # in LPA
     location: str
     website: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: UTCDateTime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class CompanyCreate(BaseModel):
     name: str
@@ -110,19 +275,29 @@ class Drive(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     company_id: str
     company_name: str
-    date: str
+    date: date
     eligible_departments: List[str]
     role: str
     description: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: UTCDateTime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class DriveCreate(BaseModel):
     company_id: str
-    date: str
+    date: date
     eligible_departments: List[str]
     role: str
     description: Optional[str] = None
 
+class EligibleStudent(Student):
+    rank: int
+    highest_package: Optional[float] = None
+
+class ShortlistJobCreate(BaseModel):
+    min_cgpa: Optional[float] = Field(None, ge=0, le=10)
+    max_package: Optional[float] = Field(None, ge=0)
+    top: int = Field(500, ge=1, le=10000)
+    include_past: bool = False
+
 class Offer(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -132,23 +307,86 @@ class Offer(BaseModel):
     company_name: str
     package: float
     role: str
-    date: str
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    date: date
+    created_at: UTCDateTime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class OfferCreate(BaseModel):
     student_id: str
     company_id: str
     package: float
     role: str
-    date: str
+    date: date
+
+class DriveParticipation(BaseModel):
+    drive_id: str
+    company_id: str
+    company_name: str
+    role: str
+    date: date
+    shortlisted: bool
+    rank: Optional[int] = None
+    conflicts: List[str] = []
+
+class StudentProfile(BaseModel):
+    student: Student
+    offers: List[Offer]
+    offer_count: int
+    highest_package: Optional[float] = None
+    placed: bool
+    drives: List[DriveParticipation]
+    shortlisted_drives: int
 
 # ==================== AUTH HELPERS ====================
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return password_context().hash(password)
+
+async def run_password_work(fn, *args):
+    """Run a bcrypt helper on the password pool, mapping saturation to 503"""
+    def timed_call():
+        start = time.perf_counter()
+        result = fn(*args)
+        return result, time.perf_counter() - start
+
+    try:
+        result, seconds = await password_pool.run(timed_call)
+        metrics.record(bcrypt_seconds=seconds)
+        return result
+    except PoolSaturated as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication service is busy, please retry shortly",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+def token_claims(username: str):
+    """Claims of a new access token; with tenancy, the college it is valid for"""
+    claims = {"sub": username}
+    if TENANCY_MODE != "off":
+        claims["tenant"] = tenancy.require()
+    return claims
+
+def token_tenant(token: str):
+    """Tenant claim of a valid access token, if it names a tenant served here"""
+    try:
+        tenant = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("tenant")
+    except JWTError:
+        return None
+    return tenant if tenant in TENANTS else None
+
+def auth_tenant(requested: Optional[str]):
+    """Tenant a register or login request is for: the one it names, else the request's own"""
+    if TENANCY_MODE == "off":
+        return None
+    tenant = requested or tenancy.current()
+    if tenant is None:
+        raise HTTPException(status_code=400, detail="A tenant is required")
+    if tenant not in TENANTS:
+        raise HTTPException(status_code=400, detail="Unknown tenant")
+    return tenant
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -169,46 +407,97 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
+        # Requests run as the token's tenant unless it is no longer served here
+        if TENANCY_MODE != "off" and payload.get("tenant") != tenancy.current():
+            raise credentials_exception
     except JWTError:
         raise credentials_exception
     
-    user = await db.users.find_one({"username": username}, {"_id": 0})
+    user = principal_cache.get(username)
+    if user is not None:
+        return user
+    
+    user = await db.users.find_one({"username": username}, {"_id": 0, "password_hash": 0})
     if user is None:
         raise credentials_exception
+    principal_cache.set(username, user)
     return user
 
+def invalidate_user(username: str):
+    """Drop a cached principal; call whenever a user document changes"""
+    principal_cache.invalidate(username)
+
+# ==================== LIST HELPERS ====================
+
+PAGE_DATE_FIELDS = ("date",)
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+# Encode list pages with orjson and without re-validating them (see fastjson)
+FAST_JSON = os.environ.get("FAST_JSON", "").lower() in ("1", "true", "yes")
+
+def trusted_response(docs, model=None, headers=None):
+    start = time.perf_counter()
+    result = fastjson.trusted_response(docs, model, headers)
+    metrics.record(serialize_seconds=time.perf_counter() - start)
+    return result
+
+def page_response(response: Response, docs, next_cursor, projection, model=None):
+    """Return one list page, advertising the next cursor in a response header.
+
+    Projected pages are partial documents, so they skip response_model
+    validation and are returned as plain JSON. With FAST_JSON, full pages of
+    ``model`` skip it too.
+    """
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    if projection:
+        for doc in docs:
+            dates.decode_dates(doc, PAGE_DATE_FIELDS)
+        if FAST_JSON:
+            return trusted_response(docs, headers=headers)
+        return JSONResponse(content=jsonable_encoder(docs), headers=headers)
+    if FAST_JSON and model is not None:
+        return trusted_response(docs, model, headers)
+    response.headers.update(headers)
+    return docs
+
 # ==================== AUTH ROUTES ====================
 
 @api_router.post("/auth/register", response_model=Token)
 async def register(user_input: UserCreate):
+    with tenancy.tenant_scope(auth_tenant(user_input.tenant)):
+        return await register_user(user_input)
+
+async def register_user(user_input: UserCreate):
     # Check if user exists
     existing_user = await db.users.find_one({"username": user_input.username}, {"_id": 0})
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already registered")
     
     # Create user
-    user_dict = user_input.model_dump()
+    user_dict = user_input.model_dump(exclude={"tenant"})
     password = user_dict.pop("password")
-    user_obj = User(**user_dict, password_hash=get_password_hash(password))
+    password_hash = await run_password_work(get_password_hash, password)
+    user_obj = User(**user_dict, password_hash=password_hash)
     
     doc = user_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.users.insert_one(doc)
+    invalidate_user(user_obj.username)
     
     # Create token
-    access_token = create_access_token(data={"sub": user_obj.username})
+    access_token = create_access_token(data=token_claims(user_obj.username))
     return {"access_token": access_token, "token_type": "bearer"}
 
 @api_router.post("/auth/login", response_model=Token)
 async def login(user_input: UserLogin):
-    user = await db.users.find_one({"username": user_input.username}, {"_id": 0})
-    if not user or not verify_password(user_input.password, user["password_hash"]):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password"
-        )
-    
-    access_token = create_access_token(data={"sub": user["username"]})
+    with tenancy.tenant_scope(auth_tenant(user_input.tenant)):
+        user = await db.users.find_one({"username": user_input.username}, {"_id": 0})
+        if not user or not await run_password_work(verify_password, user_input.password, user["password_hash"]):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Incorrect username or password"
+            )
+        
+        access_token = create_access_token(data=token_claims(user["username"]))
     return {"access_token": access_token, "token_type": "bearer"}
 
 @api_router.get("/auth/me")
@@ -221,27 +510,49 @@ async def get_me(current_user: dict = Depends(get_current_user)):
 async def create_student(student: StudentCreate, current_user: dict = Depends(get_current_user)):
     student_obj = Student(**student.model_dump())
     doc = student_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.students.insert_one(doc)
+    await summaries.adjust_totals(db, students=1)
+    student_index.upsert_student(doc)
+    search_index.upsert("student", doc)
+    response_cache.bump("students")
     return student_obj
 
 @api_router.get("/students", response_model=List[Student])
-async def get_students():
-    students = await db.students.find({}, {"_id": 0}).to_list(1000)
-    for s in students:
-        if isinstance(s.get('created_at'), str):
-            s['created_at'] = datetime.fromisoformat(s['created_at'])
-    return students
+async def get_students(
+    response: Response,
+    after: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    department: Optional[str] = None,
+    min_cgpa: Optional[float] = None,
+):
+    query = {}
+    if department:
+        query["department"] = department
+    if min_cgpa is not None:
+        query["cgpa"] = {"$gte": min_cgpa}
+    projection = build_projection(fields, Student)
+    students, next_cursor = await fetch_page(db.students, query, after, limit, projection)
+    return page_response(response, students, next_cursor, projection, Student)
 
 @api_router.get("/students/{student_id}", response_model=Student)
 async def get_student(student_id: str):
     student = await db.students.find_one({"id": student_id}, {"_id": 0})
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
-    if isinstance(student.get('created_at'), str):
-        student['created_at'] = datetime.fromisoformat(student['created_at'])
     return student
 
+@api_router.get("/students/{student_id}/profile", response_model=StudentProfile)
+async def get_student_profile(student_id: str):
+    """A student with their offers, placement status and the drives open to them"""
+    profile = profile_cache.get(student_id)
+    if profile is None:
+        profile = await profiles.load_profile(db, student_id)
+        if not profile:
+            raise HTTPException(status_code=404, detail="Student not found")
+        profile_cache.set(student_id, profile)
+    return profile
+
 @api_router.put("/students/{student_id}", response_model=Student)
 async def update_student(student_id: str, student: StudentCreate, current_user: dict = Depends(get_current_user)):
     existing = await db.students.find_one({"id": student_id}, {"_id": 0})
@@ -249,11 +560,25 @@ async def update_student(student_id: str, student: StudentCreate, current_user:
         raise HTTPException(status_code=404, detail="Student not found")
     
     update_data = student.model_dump()
+    renamed = update_data["name"] != existing["name"]
+    if renamed:
+        # Prepared before the update and released after it (see outbox): no worker can
+        # propagate the old name in between, and a lost release only delays propagation
+        rename_event = await outbox.record_rename(db, "student", student_id)
     await db.students.update_one({"id": student_id}, {"$set": update_data})
+    name_cache.invalidate(("student", student_id))
+    profile_cache.invalidate(student_id)
+    response_cache.bump("students")
+    if renamed:
+        await outbox.release(db, rename_event)
+        outbox_worker.notify()
+    if update_data["department"] != existing["department"]:
+        await summaries.student_department_changed(db, student_id, update_data["department"])
+        package_index.student_moved(student_id, update_data["department"])
     
     updated = await db.students.find_one({"id": student_id}, {"_id": 0})
-    if isinstance(updated.get('created_at'), str):
-        updated['created_at'] = datetime.fromisoformat(updated['created_at'])
+    student_index.upsert_student(updated)
+    search_index.upsert("student", updated)
     return updated
 
 @api_router.delete("/students/{student_id}")
@@ -261,6 +586,13 @@ async def delete_student(student_id: str, current_user: dict = Depends(get_curre
     result = await db.students.delete_one({"id": student_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Student not found")
+    name_cache.invalidate(("student", student_id))
+    profile_cache.invalidate(student_id)
+    await summaries.student_deleted(db, student_id)
+    student_index.remove_student(student_id)
+    package_index.student_moved(student_id, None)
+    search_index.remove("student", student_id)
+    response_cache.bump("students")
     return {"message": "Student deleted successfully"}
 
 # ==================== COMPANY ROUTES ====================
@@ -269,25 +601,28 @@ async def delete_student(student_id: str, current_user: dict = Depends(get_curre
 async def create_company(company: CompanyCreate, current_user: dict = Depends(get_current_user)):
     company_obj = Company(**company.model_dump())
     doc = company_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.companies.insert_one(doc)
+    await summaries.adjust_totals(db, companies=1)
+    search_index.upsert("company", doc)
+    response_cache.bump("companies")
     return company_obj
 
 @api_router.get("/companies", response_model=List[Company])
-async def get_companies():
-    companies = await db.companies.find({}, {"_id": 0}).to_list(1000)
-    for c in companies:
-        if isinstance(c.get('created_at'), str):
-            c['created_at'] = datetime.fromisoformat(c['created_at'])
-    return companies
+async def get_companies(
+    response: Response,
+    after: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+):
+    projection = build_projection(fields, Company)
+    companies, next_cursor = await fetch_page(db.companies, {}, after, limit, projection)
+    return page_response(response, companies, next_cursor, projection, Company)
 
 @api_router.get("/companies/{company_id}", response_model=Company)
 async def get_company(company_id: str):
     company = await db.companies.find_one({"id": company_id}, {"_id": 0})
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
-    if isinstance(company.get('created_at'), str):
-        company['created_at'] = datetime.fromisoformat(company['created_at'])
     return company
 
 @api_router.put("/companies/{company_id}", response_model=Company)
@@ -297,11 +632,20 @@ async def update_company(company_id: str, company: CompanyCreate, current_user:
         raise HTTPException(status_code=404, detail="Company not found")
     
     update_data = company.model_dump()
+    renamed = update_data["name"] != existing["name"]
+    if renamed:
+        # Prepared before the update and released after it (see outbox): no worker can
+        # propagate the old name in between, and a lost release only delays propagation
+        rename_event = await outbox.record_rename(db, "company", company_id)
     await db.companies.update_one({"id": company_id}, {"$set": update_data})
+    name_cache.invalidate(("company", company_id))
+    response_cache.bump("companies")
+    if renamed:
+        await outbox.release(db, rename_event)
+        outbox_worker.notify()
     
     updated = await db.companies.find_one({"id": company_id}, {"_id": 0})
-    if isinstance(updated.get('created_at'), str):
-        updated['created_at'] = datetime.fromisoformat(updated['created_at'])
+    search_index.upsert("company", updated)
     return updated
 
 @api_router.delete("/companies/{company_id}")
@@ -309,6 +653,10 @@ async def delete_company(company_id: str, current_user: dict = Depends(get_curre
     result = await db.companies.delete_one({"id": company_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Company not found")
+    name_cache.invalidate(("company", company_id))
+    await summaries.adjust_totals(db, companies=-1)
+    search_index.remove("company", company_id)
+    response_cache.bump("companies")
     return {"message": "Company deleted successfully"}
 
 # ==================== DRIVE ROUTES ====================
@@ -325,27 +673,83 @@ async def create_drive(drive: DriveCreate, current_user: dict = Depends(get_curr
     drive_obj = Drive(**drive_dict)
     
     doc = drive_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.drives.insert_one(doc)
+    await summaries.adjust_totals(db, drives=1)
+    search_index.upsert("drive", doc)
+    response_cache.bump("drives")
+    profile_cache.clear()
     return drive_obj
 
 @api_router.get("/drives", response_model=List[Drive])
-async def get_drives():
-    drives = await db.drives.find({}, {"_id": 0}).to_list(1000)
-    for d in drives:
-        if isinstance(d.get('created_at'), str):
-            d['created_at'] = datetime.fromisoformat(d['created_at'])
-    return drives
+async def get_drives(
+    response: Response,
+    after: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    company_id: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+):
+    query = {}
+    if company_id:
+        query["company_id"] = company_id
+    date_filter = date_range(date_from, date_to)
+    if date_filter:
+        query["date"] = date_filter
+    projection = build_projection(fields, Drive)
+    drives, next_cursor = await fetch_page(db.drives, query, after, limit, projection)
+    return page_response(response, drives, next_cursor, projection, Drive)
 
 @api_router.get("/drives/{drive_id}", response_model=Drive)
 async def get_drive(drive_id: str):
     drive = await db.drives.find_one({"id": drive_id}, {"_id": 0})
     if not drive:
         raise HTTPException(status_code=404, detail="Drive not found")
-    if isinstance(drive.get('created_at'), str):
-        drive['created_at'] = datetime.fromisoformat(drive['created_at'])
     return drive
 
+@api_router.get("/drives/{drive_id}/eligible", response_model=List[EligibleStudent])
+async def get_eligible_students(
+    drive_id: str,
+    response: Response,
+    min_cgpa: Optional[float] = Query(None, ge=0, le=10),
+    max_package: Optional[float] = Query(
+        None, ge=0, description="Exclude students already holding an offer above this package (LPA)"
+    ),
+    department: Optional[List[str]] = Query(None, description="Narrow the drive's eligible departments"),
+    after: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Rank the students eligible for a drive, best CGPA first"""
+    drive = await db.drives.find_one({"id": drive_id}, {"_id": 0, "eligible_departments": 1})
+    if not drive:
+        raise HTTPException(status_code=404, detail="Drive not found")
+    departments = drive.get("eligible_departments") or []
+    if department:
+        departments = [d for d in departments if d in department]
+    try:
+        offset = int(after) if after else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if not student_index.loaded:
+        await student_index.load(db)
+    student_index.reload_if_stale(db)
+    total, matches = student_index.match(departments, min_cgpa, max_package, offset, limit)
+
+    students = await db.students.find({"id": {"$in": [sid for sid, _ in matches]}}, {"_id": 0}).to_list(None)
+    by_id = {student["id"]: student for student in students}
+    ranked = [
+        {**by_id[sid], "rank": offset + position + 1, "highest_package": best}
+        for position, (sid, best) in enumerate(matches) if sid in by_id
+    ]
+    headers = {TOTAL_COUNT_HEADER: str(total)}
+    if offset + len(matches) < total:
+        headers[NEXT_CURSOR_HEADER] = str(offset + len(matches))
+    if FAST_JSON:
+        return trusted_response(ranked, EligibleStudent, headers)
+    response.headers.update(headers)
+    return ranked
+
 @api_router.put("/drives/{drive_id}", response_model=Drive)
 async def update_drive(drive_id: str, drive: DriveCreate, current_user: dict = Depends(get_current_user)):
     existing = await db.drives.find_one({"id": drive_id}, {"_id": 0})
@@ -360,10 +764,11 @@ async def update_drive(drive_id: str, drive: DriveCreate, current_user: dict = D
     update_data = drive.model_dump()
     update_data["company_name"] = company["name"]
     await db.drives.update_one({"id": drive_id}, {"$set": update_data})
+    response_cache.bump("drives")
+    profile_cache.clear()
     
     updated = await db.drives.find_one({"id": drive_id}, {"_id": 0})
-    if isinstance(updated.get('created_at'), str):
-        updated['created_at'] = datetime.fromisoformat(updated['created_at'])
+    search_index.upsert("drive", updated)
     return updated
 
 @api_router.delete("/drives/{drive_id}")
@@ -371,15 +776,97 @@ async def delete_drive(drive_id: str, current_user: dict = Depends(get_current_u
     result = await db.drives.delete_one({"id": drive_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Drive not found")
+    await summaries.adjust_totals(db, drives=-1)
+    search_index.remove("drive", drive_id)
+    await db.shortlists.delete_one({"drive_id": drive_id})
+    response_cache.bump("drives")
+    profile_cache.clear()
     return {"message": "Drive deleted successfully"}
 
 # ==================== OFFER ROUTES ====================
 
+# What create_offer needs of an offer's student and company (see find_named)
+STUDENT_NAME_FIELDS = {"_id": 0, "id": 1, "name": 1, "department": 1}
+COMPANY_NAME_FIELDS = {"_id": 0, "id": 1, "name": 1}
+
+async def offers_inserted(docs, departments):
+    """Update summaries, the eligibility index and cached responses for new offers"""
+    await summaries.record_offers(db, docs, departments)
+    package_index.offers_added(docs, departments)
+    for doc in docs:
+        student_index.offer_added(doc["student_id"], doc["package"])
+        profile_cache.invalidate(doc["student_id"])
+    response_cache.bump("offers")
+
+async def offers_prepared(docs, contexts):
+    """Re-check a write-behind batch against the database before it is inserted.
+
+    The names came from ``name_cache``, which only sees this process's writes:
+    a rename or delete in another worker would otherwise be written into the
+    offers (and the rename's outbox event has already run). One ``$in`` read
+    per collection refreshes the names and refuses offers whose student or
+    company is gone.
+    """
+    students, companies = await asyncio.gather(
+        db.students.find({"id": {"$in": list({doc["student_id"] for doc in docs})}}, STUDENT_NAME_FIELDS).to_list(None),
+        db.companies.find({"id": {"$in": list({doc["company_id"] for doc in docs})}}, COMPANY_NAME_FIELDS).to_list(None),
+    )
+    students = {student["id"]: student for student in students}
+    companies = {company["id"]: company for company in companies}
+    for student in students.values():
+        name_cache.set(("student", student["id"]), student)
+    for company in companies.values():
+        name_cache.set(("company", company["id"]), company)
+
+    refused = {}
+    for index, (doc, departments) in enumerate(zip(docs, contexts)):
+        student = students.get(doc["student_id"])
+        company = companies.get(doc["company_id"])
+        if student is None:
+            refused[index] = LookupError("Student not found")
+            continue
+        if company is None:
+            refused[index] = LookupError("Company not found")
+            continue
+        doc["student_name"] = student["name"]
+        doc["company_name"] = company["name"]
+        departments[student["id"]] = student["department"]
+    return refused
+
+async def offers_flushed(docs, contexts):
+    departments = {}
+    for context in contexts:
+        departments.update(context)
+    await offers_inserted(docs, departments)
+
+# Coalesces concurrent offer inserts into insert_many batches when OFFER_WRITE_BEHIND is set
+# One buffer per tenant: its flusher task runs as the tenant whose request started it
+offer_writer = tenancy.PerTenant(lambda: WriteBehindBuffer(
+    db, "offers",
+    max_batch=int(os.environ.get("OFFER_WRITE_BEHIND_BATCH", "500")),
+    max_delay=float(os.environ.get("OFFER_WRITE_BEHIND_DELAY_MS", "20")) / 1000,
+    max_queue=int(os.environ.get("OFFER_WRITE_BEHIND_QUEUE", "5000")),
+    before_write=offers_prepared,
+    on_flushed=offers_flushed,
+)) if OFFER_WRITE_BEHIND else None
+
+async def find_named(kind, collection, entity_id, projection):
+    """``find_one`` by id through ``name_cache``"""
+    key = (kind, entity_id)
+    doc = name_cache.get(key)
+    if doc is None:
+        doc = await collection.find_one({"id": entity_id}, projection)
+        if doc:
+            name_cache.set(key, doc)
+    return doc
+
 @api_router.post("/offers", response_model=Offer)
 async def create_offer(offer: OfferCreate, current_user: dict = Depends(get_current_user)):
     # Get student and company names
-    student = await db.students.find_one({"id": offer.student_id}, {"_id": 0})
-    company = await db.companies.find_one({"id": offer.company_id}, {"_id": 0})
+    student, company = await asyncio.gather(
+        find_named("student", db.students, offer.student_id, STUDENT_NAME_FIELDS),
+        find_named("company", db.companies, offer.company_id, COMPANY_NAME_FIELDS),
+    )
     
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
@@ -392,116 +879,290 @@ async def create_offer(offer: OfferCreate, current_user: dict = Depends(get_curr
     offer_obj = Offer(**offer_dict)
     
     doc = offer_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
+    departments = {student["id"]: student["department"]}
+    if offer_writer is not None:
+        try:
+            # Returns once the batch holding this offer has been written, names re-checked
+            doc = await offer_writer.submit(doc, departments)
+        except LookupError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except QueueFull as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many offers pending, please retry shortly",
+                headers={"Retry-After": str(e.retry_after)},
+            )
+        return doc
     await db.offers.insert_one(doc)
+    await offers_inserted([doc], departments)
     return offer_obj
 
 @api_router.get("/offers", response_model=List[Offer])
-async def get_offers():
-    offers = await db.offers.find({}, {"_id": 0}).to_list(1000)
-    for o in offers:
-        if isinstance(o.get('created_at'), str):
-            o['created_at'] = datetime.fromisoformat(o['created_at'])
-    return offers
+async def get_offers(
+    response: Response,
+    after: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    student_id: Optional[str] = None,
+    company_id: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+):
+    query = {}
+    if student_id:
+        query["student_id"] = student_id
+    if company_id:
+        query["company_id"] = company_id
+    date_filter = date_range(date_from, date_to)
+    if date_filter:
+        query["date"] = date_filter
+    projection = build_projection(fields, Offer)
+    offers, next_cursor = await fetch_page(db.offers, query, after, limit, projection)
+    return page_response(response, offers, next_cursor, projection, Offer)
 
 @api_router.get("/offers/{offer_id}", response_model=Offer)
 async def get_offer(offer_id: str):
     offer = await db.offers.find_one({"id": offer_id}, {"_id": 0})
     if not offer:
         raise HTTPException(status_code=404, detail="Offer not found")
-    if isinstance(offer.get('created_at'), str):
-        offer['created_at'] = datetime.fromisoformat(offer['created_at'])
     return offer
 
 @api_router.delete("/offers/{offer_id}")
 async def delete_offer(offer_id: str, current_user: dict = Depends(get_current_user)):
-    result = await db.offers.delete_one({"id": offer_id})
-    if result.deleted_count == 0:
+    offer = await db.offers.find_one_and_delete({"id": offer_id}, {"_id": 0})
+    if not offer:
         raise HTTPException(status_code=404, detail="Offer not found")
+    await summaries.remove_offer(db, offer)
+    package_index.offer_removed(offer["id"])
+    await student_index.refresh_student(db, offer["student_id"])
+    profile_cache.invalidate(offer["student_id"])
+    response_cache.bump("offers")
     return {"message": "Offer deleted successfully"}
 
+# ==================== SEARCH ROUTES ====================
+
+@api_router.get("/search")
+async def search_all(
+    q: str = Query(..., min_length=1, max_length=200),
+    types: Optional[str] = Query(None, description="Comma separated subset of: student, company, drive"),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """Ranked, typo-tolerant search over students, companies and drives"""
+    kinds = None
+    if types:
+        kinds = {t.strip() for t in types.split(",") if t.strip()}
+        unknown = kinds - set(search.KINDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown type(s): {', '.join(sorted(unknown))}")
+    if not search_index.loaded:
+        await search_index.load(db)
+    search_index.reload_if_stale(db)
+    return [dates.decode_dates(result, PAGE_DATE_FIELDS) for result in search_index.search(q, kinds, limit)]
+
+# ==================== SHORTLIST ROUTES ====================
+
+@api_router.post("/shortlists/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def start_shortlist_job(criteria: ShortlistJobCreate, current_user: dict = Depends(get_current_user)):
+    """Start computing shortlists for every upcoming drive in the background"""
+    try:
+        job = await shortlist_runner.start(db, criteria.model_dump(), requested_by=current_user["username"])
+    except shortlists.JobAlreadyRunning as e:
+        raise HTTPException(status_code=409, detail=f"Shortlist job {e.job_id} is already running")
+    return dates.decode_dates(job, ())
+
+@api_router.get("/shortlists/jobs")
+async def get_shortlist_jobs(limit: int = Query(20, ge=1, le=100)):
+    """Most recent shortlist jobs, newest first"""
+    jobs = await db.shortlist_jobs.find({}, {"_id": 0}).sort("started_at", -1).limit(limit).to_list(limit)
+    return [dates.decode_dates(job, ()) for job in jobs]
+
+@api_router.get("/shortlists/jobs/{job_id}")
+async def get_shortlist_job(job_id: str):
+    """Status and progress of a shortlist job"""
+    job = await db.shortlist_jobs.find_one({"id": job_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Shortlist job not found")
+    return dates.decode_dates(job, ())
+
+@api_router.get("/shortlists/{drive_id}")
+async def get_shortlist(drive_id: str):
+    """Latest computed shortlist for a drive"""
+    shortlist = await db.shortlists.find_one({"drive_id": drive_id}, {"_id": 0})
+    if not shortlist:
+        raise HTTPException(status_code=404, detail="No shortlist computed for this drive")
+    return dates.decode_dates(shortlist, PAGE_DATE_FIELDS)
+
+# ==================== BULK IMPORT ROUTES ====================
+
+IMPORT_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "text/csv": {"schema": {"type": "string"}},
+            "application/x-ndjson": {"schema": {"type": "string"}},
+        },
+    }
+}
+
+def import_rows(request: Request, format: str):
+    if format not in bulk_import.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(bulk_import.FORMATS)}")
+    return bulk_import.iter_rows(request.stream(), format)
+
+def new_document(model, payload: BaseModel, **extra):
+    """Build the stored document for a validated create payload"""
+    return model(**payload.model_dump(), **extra).model_dump()
+
+@api_router.post("/import/students", openapi_extra=IMPORT_BODY)
+async def import_students(request: Request, format: str = "jsonl", current_user: dict = Depends(get_current_user)):
+    """Stream students from a CSV or JSONL body"""
+    async def after_insert(docs, context):
+        await summaries.adjust_totals(db, students=len(docs))
+        for doc in docs:
+            student_index.upsert_student(doc)
+            search_index.upsert("student", doc)
+        response_cache.bump("students")
+
+    return await bulk_import.run_import(
+        import_rows(request, format), db.students,
+        build_doc=lambda row, context: new_document(Student, StudentCreate(**row)),
+        after_insert=after_insert,
+    )
+
+@api_router.post("/import/companies", openapi_extra=IMPORT_BODY)
+async def import_companies(request: Request, format: str = "jsonl", current_user: dict = Depends(get_current_user)):
+    """Stream companies from a CSV or JSONL body"""
+    async def after_insert(docs, context):
+        await summaries.adjust_totals(db, companies=len(docs))
+        for doc in docs:
+            search_index.upsert("company", doc)
+        response_cache.bump("companies")
+
+    return await bulk_import.run_import(
+        import_rows(request, format), db.companies,
+        build_doc=lambda row, context: new_document(Company, CompanyCreate(**row)),
+        after_insert=after_insert,
+    )
+
+@api_router.post("/import/offers", openapi_extra=IMPORT_BODY)
+async def import_offers(request: Request, format: str = "jsonl", current_user: dict = Depends(get_current_user)):
+    """Stream offers from a CSV or JSONL body, resolving students and companies per chunk"""
+    async def resolve_chunk(rows):
+        student_ids = list({row.get("student_id") for row in rows if row.get("student_id")})
+        company_ids = list({row.get("company_id") for row in rows if row.get("company_id")})
+        students = await db.students.find(
+            {"id": {"$in": student_ids}}, {"_id": 0, "id": 1, "name": 1, "department": 1}
+        ).to_list(None)
+        companies = await db.companies.find(
+            {"id": {"$in": company_ids}}, {"_id": 0, "id": 1, "name": 1}
+        ).to_list(None)
+        return {
+            "students": {student["id"]: student for student in students},
+            "companies": {company["id"]: company for company in companies},
+        }
+
+    def build_doc(row, context):
+        offer = OfferCreate(**row)
+        student = context["students"].get(offer.student_id)
+        company = context["companies"].get(offer.company_id)
+        if not student:
+            raise LookupError("Student not found")
+        if not company:
+            raise LookupError("Company not found")
+        return new_document(Offer, offer, student_name=student["name"], company_name=company["name"])
+
+    async def after_insert(docs, context):
+        departments = {sid: student["department"] for sid, student in context["students"].items()}
+        await offers_inserted(docs, departments)
+
+    return await bulk_import.run_import(
+        import_rows(request, format), db.offers,
+        build_doc=build_doc, resolve_chunk=resolve_chunk, after_insert=after_insert,
+    )
+
 # ==================== ANALYTICS ROUTES ====================
 
 @api_router.get("/analytics/department-placements")
 async def get_department_placements():
     """Get placement count by department"""
-    offers = await db.offers.find({}, {"_id": 0}).to_list(1000)
-    students = await db.students.find({}, {"_id": 0}).to_list(1000)
-    
-    # Count placed students by department
-    placed_student_ids = {offer["student_id"] for offer in offers}
-    dept_counts = {}
-    
-    for student in students:
-        if student["id"] in placed_student_ids:
-            dept = student["department"]
-            dept_counts[dept] = dept_counts.get(dept, 0) + 1
-    
-    return {
-        "labels": list(dept_counts.keys()),
-        "values": list(dept_counts.values())
-    }
+    return await summaries.chart(analytics_db, "department")
 
 @api_router.get("/analytics/company-packages")
 async def get_company_packages():
     """Get average package by company"""
-    companies = await db.companies.find({}, {"_id": 0}).to_list(1000)
-    
-    company_data = {}
-    for company in companies:
-        company_data[company["name"]] = company["package"]
-    
-    return {
-        "labels": list(company_data.keys()),
-        "values": list(company_data.values())
-    }
+    return await aggregations.company_packages(analytics_db)
 
 @api_router.get("/analytics/yearly-trends")
 async def get_yearly_trends():
     """Get placement trends by year"""
-    offers = await db.offers.find({}, {"_id": 0}).to_list(1000)
-    
-    year_counts = {}
-    for offer in offers:
-        year = offer["date"][:4]  # Extract year from date
-        year_counts[year] = year_counts.get(year, 0) + 1
-    
-    sorted_years = sorted(year_counts.keys())
-    
-    return {
-        "labels": sorted_years,
-        "values": [year_counts[year] for year in sorted_years]
-    }
+    return await summaries.chart(analytics_db, "year")
 
 @api_router.get("/analytics/role-distribution")
 async def get_role_distribution():
     """Get offer distribution by role"""
-    offers = await db.offers.find({}, {"_id": 0}).to_list(1000)
-    
-    role_counts = {}
-    for offer in offers:
-        role = offer["role"]
-        role_counts[role] = role_counts.get(role, 0) + 1
-    
-    return {
-        "labels": list(role_counts.keys()),
-        "values": list(role_counts.values())
-    }
+    return await summaries.chart(analytics_db, "role")
+
+async def package_distributions():
+    if not package_index.loaded:
+        await package_index.load(db)
+    package_index.reload_if_stale(db)
+    return package_index
+
+@api_router.get("/analytics/package-distribution")
+async def get_package_distribution(
+    bucket: float = Query(1.0, gt=0, description="Histogram bucket width in LPA"),
+    department: Optional[str] = None,
+    year: Optional[int] = None,
+):
+    """Offer package count, mean, quantiles and histogram, optionally for one department and/or year"""
+    index = await package_distributions()
+    try:
+        return index.distribution(bucket, department, year)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@api_router.get("/analytics/package-distribution/by-department")
+async def get_package_distribution_by_department(
+    bucket: float = Query(1.0, gt=0, description="Histogram bucket width in LPA"),
+    year: Optional[int] = None,
+):
+    """Package distribution per department, with histograms on shared buckets"""
+    index = await package_distributions()
+    try:
+        return index.by_department(bucket, year)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@api_router.get("/analytics/package-distribution/by-year")
+async def get_package_distribution_by_year(
+    bucket: float = Query(1.0, gt=0, description="Histogram bucket width in LPA"),
+    department: Optional[str] = None,
+):
+    """Package distribution per offer year, with histograms on shared buckets"""
+    index = await package_distributions()
+    try:
+        return index.by_year(bucket, department)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @api_router.get("/analytics/stats")
 async def get_stats():
     """Get overall statistics"""
-    total_students = await db.students.count_documents({})
-    total_companies = await db.companies.count_documents({})
-    total_drives = await db.drives.count_documents({})
-    total_offers = await db.offers.count_documents({})
+    return await compute_stats()
+
+async def compute_stats():
+    # Read from the materialized summary maintained by the write handlers
+    totals = await summaries.totals(analytics_db)
+    total_students = totals.get("students", 0)
+    total_companies = totals.get("companies", 0)
+    total_drives = totals.get("drives", 0)
+    total_offers = totals.get("offers", 0)
     
     # Calculate average package
-    offers = await db.offers.find({}, {"_id": 0}).to_list(1000)
-    avg_package = sum(offer["package"] for offer in offers) / len(offers) if offers else 0
+    avg_package = totals.get("package_sum", 0) / total_offers if total_offers > 0 else 0
     
     # Calculate placement rate
-    placed_students = len(set(offer["student_id"] for offer in offers))
+    placed_students = totals.get("placed_students", 0)
     placement_rate = (placed_students / total_students * 100) if total_students > 0 else 0
     
     return {
@@ -514,135 +1175,132 @@ async def get_stats():
         "average_package": round(avg_package, 2)
     }
 
+async def dashboard_snapshot():
+    """Stats and chart series pushed to /api/stream subscribers"""
+    stats, department, year, role = await asyncio.gather(
+        compute_stats(),
+        summaries.chart(analytics_db, "department"),
+        summaries.chart(analytics_db, "year"),
+        summaries.chart(analytics_db, "role"),
+    )
+    return {"stats": stats, "charts": {"department": department, "year": year, "role": role}}
+
+# One change consumer per process, fanned out to every /api/stream client
+dashboard_hub = tenancy.PerTenant(lambda: stream.DashboardHub(
+    db,
+    dashboard_snapshot,
+    debounce=float(os.environ.get("STREAM_DEBOUNCE_MS", "250")) / 1000,
+    poll_interval=float(os.environ.get("STREAM_POLL_SECONDS", "5")),
+    buffer=int(os.environ.get("STREAM_BUFFER", "16")),
+    heartbeat=float(os.environ.get("STREAM_HEARTBEAT_SECONDS", "15")),
+))
+
+@api_router.get("/stream")
+async def stream_dashboard():
+    """Server-Sent Events: a dashboard snapshot, then deltas as offers, students and drives change"""
+    hub = dashboard_hub.instance()
+
+    async def events():
+        # Subscribed only once the response is being sent: a client that is gone before then never
+        # reaches the generator, and nothing would unsubscribe it
+        subscriber = None
+        try:
+            subscriber = await hub.subscribe()
+            async for name, data in hub.events(subscriber):
+                yield stream.KEEPALIVE if name is None else stream.format_event(name, data)
+        finally:
+            if subscriber is not None:
+                hub.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@api_router.post("/analytics/rebuild")
+async def rebuild_analytics(current_user: dict = Depends(get_current_user)):
+    """Recompute the materialized analytics summaries from scratch"""
+    totals = await summaries.rebuild(db)
+    await student_index.load(db)
+    await package_index.load(db)
+    response_cache.bump(*ALL_COLLECTIONS)
+    totals.pop("built_at", None)
+    return {"message": "Analytics summaries rebuilt", "totals": totals}
+
+# ==================== EXPORT ROUTES ====================
+
+EXPORT_COLLECTIONS = {
+    "students": Student,
+    "companies": Company,
+    "drives": Drive,
+    "offers": Offer,
+}
+
+ANALYTICS_EXPORTS = {
+    "department-placements": get_department_placements,
+    "company-packages": get_company_packages,
+    "yearly-trends": get_yearly_trends,
+    "role-distribution": get_role_distribution,
+}
+
+def export_response(name, batches, fmt, fields, gzip):
+    if fmt not in exports.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(exports.FORMATS)}")
+    body = exports.encode(batches, fmt, fields)
+    if gzip:
+        body = exports.gzipped(body)
+    media_type, headers = exports.stream_headers(name, fmt, gzip)
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+@api_router.get("/export/analytics/{view}")
+async def export_analytics(view: str, format: str = "csv", gzip: bool = False,
+                           current_user: dict = Depends(get_current_user)):
+    """Export one analytics chart as label/value rows"""
+    if view not in ANALYTICS_EXPORTS:
+        raise HTTPException(status_code=404, detail="Analytics view not found")
+    chart = await ANALYTICS_EXPORTS[view]()
+    rows = [{"label": label, "value": value} for label, value in zip(chart["labels"], chart["values"])]
+    return export_response(view, exports.iter_rows(rows), format, ["label", "value"], gzip)
+
+@api_router.get("/export/{collection}")
+async def export_collection(collection: str, format: str = "ndjson", gzip: bool = False,
+                            current_user: dict = Depends(get_current_user)):
+    """Stream a whole collection as NDJSON or CSV"""
+    if collection not in EXPORT_COLLECTIONS:
+        raise HTTPException(status_code=404, detail="Collection not found")
+    model = EXPORT_COLLECTIONS[collection]
+    fields = list(model.model_fields)
+    date_fields = dates.date_fields(model)
+    batches = exports.iter_collection(
+        db[collection], transform=lambda doc: dates.decode_dates(doc, date_fields)
+    )
+    return export_response(collection, batches, format, fields, gzip)
+
 # ==================== SEED DATA ====================
 
 @api_router.post("/seed")
 async def seed_data():
     """Populate database with sample data"""
-    
-    # Check if data already exists
-    if await db.students.count_documents({}) > 0:
+    # Idempotent: loaded at most once, and an interrupted load is finished (see fixtures)
+    report = await fixtures.load(
+        db, fixtures.SAMPLE, **fixtures.SAMPLE_SIZE, seed=SEED_RANDOM_SEED, require_empty=True,
+    )
+    if report["status"] in ("skipped", "already_loaded"):
         return {"message": "Database already has data. Skipping seed."}
+    if report["status"] == "in_progress":
+        raise HTTPException(status_code=409, detail="Sample data is being loaded by another process; try again shortly")
     
-    departments = ["CSE", "ECE", "ME", "EEE", "IT", "Civil"]
-    domains = ["IT Services", "Product", "Consulting", "Finance", "E-commerce", "Healthcare"]
-    roles = ["Software Engineer", "Data Analyst", "Product Manager", "ML Engineer", "Full Stack Developer", "DevOps Engineer"]
-    locations = ["Bangalore", "Hyderabad", "Pune", "Mumbai", "Delhi", "Chennai"]
-    
-    first_names = ["Rahul", "Priya", "Amit", "Sneha", "Vikram", "Anjali", "Rohan", "Neha", "Karan", "Pooja",
-                   "Aditya", "Divya", "Arjun", "Riya", "Sanjay", "Kavya", "Nikhil", "Shreya", "Akash", "Tanvi",
-                   "Varun", "Ananya", "Harsh", "Ishita", "Gaurav", "Meera", "Siddharth", "Nisha", "Manish", "Sakshi",
-                   "Rajesh", "Preeti", "Abhishek", "Swati", "Deepak", "Ritika", "Suresh", "Pallavi", "Vishal", "Megha",
-                   "Naveen", "Simran", "Ashish", "Aditi", "Mohit", "Kritika", "Sandeep", "Shweta", "Pankaj", "Aarti"]
-    
-    last_names = ["Sharma", "Verma", "Singh", "Kumar", "Reddy", "Gupta", "Patel", "Nair", "Iyer", "Rao"]
-    
-    companies_data = [
-        {"name": "TechCorp Solutions", "domain": "IT Services", "package": 8.5, "location": "Bangalore"},
-        {"name": "DataWorks Inc", "domain": "Product", "package": 12.0, "location": "Hyderabad"},
-        {"name": "CloudNine Systems", "domain": "IT Services", "package": 7.5, "location": "Pune"},
-        {"name": "InnovateTech", "domain": "Product", "package": 15.0, "location": "Bangalore"},
-        {"name": "FinanceHub", "domain": "Finance", "package": 10.0, "location": "Mumbai"},
-        {"name": "EcomGiant", "domain": "E-commerce", "package": 11.5, "location": "Bangalore"},
-        {"name": "HealthTech Solutions", "domain": "Healthcare", "package": 9.0, "location": "Chennai"},
-        {"name": "ConsultPro", "domain": "Consulting", "package": 13.5, "location": "Delhi"},
-        {"name": "AI Innovations", "domain": "Product", "package": 16.0, "location": "Bangalore"},
-        {"name": "WebDev Masters", "domain": "IT Services", "package": 6.5, "location": "Pune"}
-    ]
-    
-    # Create 50 students
-    students_list = []
-    for i in range(50):
-        first_name = random.choice(first_names)
-        last_name = random.choice(last_names)
-        name = f"{first_name} {last_name}"
-        roll = f"21{random.choice(departments)}{1000 + i}"
-        dept = random.choice(departments)
-        cgpa = round(random.uniform(6.5, 9.8), 2)
-        email = f"{first_name.lower()}.{last_name.lower()}@college.edu"
-        phone = f"+91{random.randint(7000000000, 9999999999)}"
-        
-        student = Student(
-            name=name,
-            roll_number=roll,
-            department=dept,
-            cgpa=cgpa,
-            email=email,
-            phone=phone
-        )
-        doc = student.model_dump()
-        doc['created_at'] = doc['created_at'].isoformat()
-        students_list.append(doc)
-    
-    await db.students.insert_many(students_list)
-    
-    # Create 10 companies
-    companies_list = []
-    for comp_data in companies_data:
-        company = Company(**comp_data, website=f"https://{comp_data['name'].lower().replace(' ', '')}.com")
-        doc = company.model_dump()
-        doc['created_at'] = doc['created_at'].isoformat()
-        companies_list.append(doc)
-    
-    await db.companies.insert_many(companies_list)
-    
-    # Get inserted data for reference
-    students = await db.students.find({}, {"_id": 0}).to_list(1000)
-    companies = await db.companies.find({}, {"_id": 0}).to_list(1000)
-    
-    # Create 20 drives
-    drives_list = []
-    for i in range(20):
-        company = random.choice(companies)
-        eligible_depts = random.sample(departments, random.randint(2, 4))
-        date = f"202{random.randint(3, 5)}-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}"
-        role = random.choice(roles)
-        
-        drive = Drive(
-            company_id=company["id"],
-            company_name=company["name"],
-            date=date,
-            eligible_departments=eligible_depts,
-            role=role,
-            description=f"Campus recruitment drive for {role} position"
-        )
-        doc = drive.model_dump()
-        doc['created_at'] = doc['created_at'].isoformat()
-        drives_list.append(doc)
-    
-    await db.drives.insert_many(drives_list)
-    
-    # Create 30-40 offers (some students get placed)
-    offers_list = []
-    placed_students = random.sample(students, random.randint(30, 40))
-    
-    for student in placed_students:
-        company = random.choice(companies)
-        role = random.choice(roles)
-        package = company["package"] + random.uniform(-1.0, 2.0)
-        date = f"202{random.randint(3, 5)}-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}"
-        
-        offer = Offer(
-            student_id=student["id"],
-            student_name=student["name"],
-            company_id=company["id"],
-            company_name=company["name"],
-            package=round(package, 2),
-            role=role,
-            date=date
-        )
-        doc = offer.model_dump()
-        doc['created_at'] = doc['created_at'].isoformat()
-        offers_list.append(doc)
-    
-    await db.offers.insert_many(offers_list)
+    await summaries.rebuild(db)
+    await student_index.load(db)
+    await package_index.load(db)
+    await search_index.load(db)
+    response_cache.bump(*ALL_COLLECTIONS)
+    profile_cache.clear()
     
     return {
         "message": "Database seeded successfully!",
-        "students": len(students_list),
-        "companies": len(companies_list),
-        "drives": len(drives_list),
-        "offers": len(offers_list)
+        **report["counts"],
+        "seed": report["seed"],
     }
 
 # ==================== ROOT ROUTES ====================
@@ -655,37 +1313,286 @@ async def root():
 async def health():
     return {"status": "healthy", "service": "PlacementIQ"}
 
+def collect_component_metrics():
+    """Cache and worker pool statistics, gathered at scrape time"""
+    cache_lookups = metrics.Counter(
+        "placementiq_cache_lookups_total", "Cache lookups by outcome", labels=("cache", "outcome"))
+    cache_entries = metrics.Gauge("placementiq_cache_entries", "Entries held by a cache", labels=("cache",))
+    principal = principal_cache.stats()
+    cache_lookups.inc("principal", "hit", amount=principal["hits"])
+    cache_lookups.inc("principal", "miss", amount=principal["misses"])
+    cache_entries.set("principal", value=principal["size"])
+    names = name_cache.stats()
+    cache_lookups.inc("names", "hit", amount=names["hits"])
+    cache_lookups.inc("names", "miss", amount=names["misses"])
+    cache_entries.set("names", value=names["size"])
+    profile = profile_cache.stats()
+    cache_lookups.inc("profiles", "hit", amount=profile["hits"])
+    cache_lookups.inc("profiles", "miss", amount=profile["misses"])
+    cache_entries.set("profiles", value=profile["size"])
+
+    response_stats = response_cache.stats()
+    route_lookups = metrics.Counter(
+        "placementiq_response_cache_lookups_total", "Response cache lookups per route",
+        labels=("route", "outcome"))
+    for route, counts in response_stats["routes"].items():
+        for outcome in ("hits", "misses", "not_modified"):
+            route_lookups.inc(route, outcome, amount=counts[outcome])
+    cache_entries.set("response", value=response_stats["entries"])
+    response_bytes = metrics.Gauge("placementiq_response_cache_bytes", "Bytes held by the response cache")
+    response_bytes.set(value=response_stats["bytes"])
+
+    pool = password_pool.stats()
+    password_pending = metrics.Gauge("placementiq_password_pool_pending", "Queued or running bcrypt calls")
+    password_pending.set(value=pool["pending"])
+    password_rejected = metrics.Counter(
+        "placementiq_password_pool_rejected_total", "bcrypt calls rejected with 503")
+    password_rejected.inc(amount=pool["rejected"])
+    password_calls = metrics.Counter(
+        "placementiq_password_pool_calls_total", "Finished bcrypt calls by outcome", labels=("outcome",))
+    for outcome in ("completed", "failed", "cancelled"):
+        password_calls.inc(outcome, amount=pool[outcome])
+
+    index = student_index.stats()
+    index_students = metrics.Gauge("placementiq_student_index_students", "Students held by the eligibility index")
+    index_students.set(value=index["students"])
+    index_age = metrics.Gauge("placementiq_student_index_age_seconds", "Seconds since the eligibility index was loaded")
+    if index["age_seconds"] is not None:
+        index_age.set(value=index["age_seconds"])
+    package_stats = package_index.stats()
+    package_offers = metrics.Gauge("placementiq_package_index_offers", "Offers held by the package distribution index")
+    package_offers.set(value=package_stats["offers"])
+    package_age = metrics.Gauge(
+        "placementiq_package_index_age_seconds", "Seconds since the package distribution index was loaded")
+    if package_stats["age_seconds"] is not None:
+        package_age.set(value=package_stats["age_seconds"])
+
+    worker = outbox_worker.stats()
+    outbox_processed = metrics.Counter(
+        "placementiq_outbox_events_total", "Rename events propagated by this process")
+    outbox_processed.inc(amount=worker["processed"])
+    outbox_failures = metrics.Counter(
+        "placementiq_outbox_failures_total", "Rename propagation batches that failed and were rescheduled")
+    outbox_failures.inc(amount=worker["failures"])
+
+    search_stats = search_index.stats()
+    search_documents = metrics.Gauge("placementiq_search_index_documents", "Documents held by the search index")
+    search_documents.set(value=search_stats["documents"])
+    search_tokens = metrics.Gauge("placementiq_search_index_tokens", "Distinct tokens in the search index")
+    search_tokens.set(value=search_stats["tokens"])
+    pool_connections = metrics.Gauge(
+        "placementiq_mongo_pool_connections", "MongoDB pool connections by state", labels=("address", "state"))
+    pool_checkouts = metrics.Counter(
+        "placementiq_mongo_pool_checkouts_total", "MongoDB connection checkouts by outcome", labels=("address", "outcome"))
+    for address, pool in mongo_factory.pool_stats.snapshot().items():
+        for state in ("open", "in_use", "waiting"):
+            pool_connections.set(address, state, value=pool[state])
+        pool_checkouts.inc(address, "ok", amount=pool["checkouts"])
+        pool_checkouts.inc(address, "failed", amount=pool["checkout_failures"])
+
+    collected = [pool_connections, pool_checkouts, cache_lookups, cache_entries, route_lookups, response_bytes, password_pending, password_rejected,
+                 index_students, index_age, outbox_processed, outbox_failures, search_documents, search_tokens]
+    hub = dashboard_hub.stats()
+    stream_subscribers = metrics.Gauge("placementiq_stream_subscribers", "Open /api/stream connections")
+    stream_subscribers.set(value=hub["subscribers"])
+    stream_deltas = metrics.Counter("placementiq_stream_deltas_total", "Dashboard deltas published to subscribers")
+    stream_deltas.inc(amount=hub["published"])
+    stream_resyncs = metrics.Counter(
+        "placementiq_stream_resyncs_total", "Slow subscribers sent a snapshot instead of queued deltas")
+    stream_resyncs.inc(amount=hub["resyncs"])
+    collected += [stream_subscribers, stream_deltas, stream_resyncs]
+    if offer_writer is not None:
+        writer = offer_writer.stats()
+        writer_pending = metrics.Gauge("placementiq_offer_writer_pending", "Offers queued for the next write-behind batch")
+        writer_pending.set(value=writer["pending"])
+        writer_batches = metrics.Counter("placementiq_offer_writer_batches_total", "Write-behind insert_many batches")
+        writer_batches.inc(amount=writer["batches"])
+        writer_rejected = metrics.Counter(
+            "placementiq_offer_writer_rejected_total", "Offers rejected with 503 because the queue was full")
+        writer_rejected.inc(amount=writer["rejected"])
+        writer_refused = metrics.Counter(
+            "placementiq_offer_writer_refused_total", "Offers refused at flush because their student or company was gone")
+        writer_refused.inc(amount=writer["refused"])
+        collected += [writer_pending, writer_batches, writer_rejected, writer_refused]
+    return collected
+
+metrics.registry.add_collector(collect_component_metrics)
+metrics.instrument_serialization()
+
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus text exposition of request, MongoDB and cache metrics"""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+@api_router.get("/metrics/mongo-pool")
+async def get_mongo_pool():
+    """Connection pool settings and live per-server counts for this worker"""
+    return {"pid": os.getpid(), **mongo_factory.stats()}
+
 # Include the router in the main app
 app.include_router(api_router)
 
+# Added before CORS so CORS stays outermost and cached bodies never carry CORS headers
+app.add_middleware(ResponseCacheMiddleware, cache=response_cache)
+
+if TENANCY_MODE != "off":
+    # Outside the response cache, whose entries are kept per tenant
+    app.add_middleware(tenancy.TenantMiddleware, tenant_of=token_tenant, default=DEFAULT_TENANT)
+
+@app.exception_handler(tenancy.NoTenant)
+async def no_tenant(request: Request, exc: tenancy.NoTenant):
+    return JSONResponse(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        content={"detail": "Sign in to a college to access its data"},
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Outermost, so latency covers cache hits and CORS handling too
+app.add_middleware(
+    metrics.MetricsMiddleware,
+    server_timing=os.environ.get("SERVER_TIMING", "").lower() in ("1", "true", "yes"),
 )
+
+# Configure logging; called from the lifespan so importing the app leaves logging alone
+def configure_logging():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
+# eager: connect and load indexes and summaries before serving; lazy: serve at once, everything on first use
+STARTUP_MODE = os.environ.get("STARTUP_MODE", "eager").lower()
+if STARTUP_MODE not in ("eager", "lazy"):
+    raise ValueError(f"STARTUP_MODE must be 'eager' or 'lazy', not {STARTUP_MODE!r}")
+# Seed an empty database in the background once serving (otherwise: python manage.py seed)
+# Off by default when serving several colleges: each one would get the sample data
+AUTO_SEED = os.environ.get("AUTO_SEED", "true" if TENANCY_MODE == "off" else "false").lower() in ("1", "true", "yes")
+# Random seed of the sample dataset (empty: a new one per database, recorded in fixture_loads)
+SEED_RANDOM_SEED = int(os.environ["SEED_RANDOM_SEED"]) if os.environ.get("SEED_RANDOM_SEED") else None
+startup_task = None
+
+# ==================== LIFECYCLE ====================
+
+async def startup_mongo():
+    """Create the MongoDB client and open its first connections"""
+    try:
+        seconds = await mongo_factory.warm(int(os.environ.get("MONGO_WARM_CONNECTIONS", "0")) or None)
+        logger.info(f"MongoDB connection pool warmed in {seconds * 1000:.0f} ms")
+    except Exception as e:
+        logger.error(f"Error connecting to MongoDB: {e}")
+
 async def shutdown_db_client():
-    client.close()
+    """Stop background work, then close the MongoDB client"""
+    if startup_task is not None and not startup_task.done():
+        startup_task.cancel()
+        try:
+            await startup_task
+        except asyncio.CancelledError:
+            pass
+    if offer_writer is not None:
+        # Write out queued offers while the client is still open
+        for writer in offer_writer.instances():
+            await writer.close()
+    for hub in dashboard_hub.instances():
+        await hub.close()
+    for runner in shortlist_runner.instances():
+        await runner.shutdown()
+    for worker in outbox_worker.instances():
+        await worker.stop()
+    mongo_factory.close()
+    password_pool.shutdown()
+
+async def startup_indexes():
+    """Create any missing indexes before the app starts serving"""
+    try:
+        report = await ensure_indexes(db, declared=REQUIRED_INDEXES)
+        if report["created"]:
+            logger.info(f"Created indexes: {', '.join(report['created'])}")
+        if report["extra"]:
+            logger.info(f"Undeclared indexes present: {', '.join(report['extra'])}")
+        if report["conflicts"] or report["failed"]:
+            logger.warning(f"Index problems: {report['conflicts'] + report['failed']}")
+    except Exception as e:
+        logger.error(f"Error ensuring indexes: {e}")
 
-# Auto-seed on startup
-@app.on_event("startup")
 async def startup_seed():
     """Auto-seed database on first run"""
     try:
-        count = await db.students.count_documents({})
-        if count == 0:
-            logger.info("No data found. Auto-seeding database...")
-            await seed_data()
-            logger.info("Database seeded successfully!")
+        # Also finishes a seed that an earlier run left incomplete; databases with other data are left alone
+        result = await seed_data()
+        logger.info(result["message"])
     except Exception as e:
         logger.error(f"Error during auto-seed: {e}")
+
+async def startup_summaries():
+    """Build the analytics summaries if they have never been computed"""
+    try:
+        if not await summaries.is_built(db):
+            logger.info("Building analytics summaries...")
+            await summaries.rebuild(db)
+    except Exception as e:
+        logger.error(f"Error building analytics summaries: {e}")
+
+async def startup_student_index():
+    """Load the in-memory student index used for drive eligibility"""
+    try:
+        await student_index.load(db)
+    except Exception as e:
+        logger.error(f"Error loading student index: {e}")
+
+async def startup_package_index():
+    """Load the in-memory offer packages used for distribution analytics"""
+    try:
+        await package_index.load(db)
+    except Exception as e:
+        logger.error(f"Error loading package index: {e}")
+
+async def startup_search_index():
+    """Build the in-process search index"""
+    try:
+        await search_index.load(db)
+    except Exception as e:
+        logger.error(f"Error building search index: {e}")
+
+def startup_outbox_worker():
+    """Start propagating renames, including any left over from a previous run"""
+    outbox_worker.start()
+
+async def startup_background():
+    """Startup work that runs once the app is already serving"""
+    for tenant in SERVED_TENANTS:
+        with tenancy.tenant_scope(tenant):
+            if STARTUP_MODE == "lazy":
+                await startup_indexes()
+                await startup_summaries()
+            if AUTO_SEED:
+                # seed_data rebuilds the summaries and in-memory indexes itself
+                await startup_seed()
+
+async def startup():
+    """Startup steps, in order; each one logs its own failure so the app still starts"""
+    global startup_task
+    configure_logging()
+    if STARTUP_MODE == "eager":
+        await startup_mongo()
+    for tenant in SERVED_TENANTS:
+        with tenancy.tenant_scope(tenant):
+            if STARTUP_MODE == "eager":
+                await startup_indexes()
+                await startup_summaries()
+                await startup_student_index()
+                await startup_package_index()
+                await startup_search_index()
+            startup_outbox_worker()
+    startup_task = asyncio.create_task(startup_background())
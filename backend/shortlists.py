@@ -0,0 +1,232 @@
+"""Batch shortlists for every upcoming drive.
+
+A job loads students and their highest offers once into
+``eligibility.StudentColumns``, groups the drives by date and fans the groups
+out to a ``ProcessPoolExecutor``. Workers receive the columns once, through
+the pool initializer, and return for each drive its ranked shortlist and
+its conflicts: shortlisted students who are also on the shortlist of
+another drive the same day. Results are written to ``shortlists`` with
+``bulk_write`` as the groups complete; progress is kept in ``shortlist_jobs``.
+
+The event loop only awaits: MongoDB I/O is async, building the columns runs
+in a thread and ranking runs in the worker processes.
+"""
+import asyncio
+import logging
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from pymongo import ReplaceOne
+
+from dates import day_start
+from eligibility import StudentColumns, load_columns, rank
+from lazyimport import lazy_import
+
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+DRIVE_FIELDS = {"_id": 0, "id": 1, "company_id": 1, "company_name": 1, "role": 1, "date": 1, "eligible_departments": 1}
+# Tasks per worker; more, smaller tasks give finer progress and better balance
+TASKS_PER_WORKER = 4
+
+_columns = None
+
+
+class JobAlreadyRunning(Exception):
+    def __init__(self, job_id):
+        super().__init__(job_id)
+        self.job_id = job_id
+
+
+def _init_worker(ids, departments, department, cgpa, best, alive):
+    """Pool initializer: receive the student columns once per worker process"""
+    global _columns
+    columns = StudentColumns(capacity=0)
+    columns.ids = ids
+    columns.departments = departments
+    columns.department, columns.cgpa, columns.best, columns.alive = department, cgpa, best, alive
+    columns.size = len(ids)
+    _columns = columns
+
+
+def _shortlist_task(groups, criteria):
+    """Shortlist each group of same-day drives; runs in a worker process"""
+    columns = _columns
+    results = []
+    for drives in groups:
+        ranked = []
+        for drive in drives:
+            codes = columns.department_codes(drive.get("eligible_departments") or [])
+            total, rows = rank(columns, codes, criteria["min_cgpa"], criteria["max_package"], 0, criteria["top"])
+            ranked.append((drive, total, rows))
+
+        # Students shortlisted for more than one drive that day
+        clashes = {}
+        if len(ranked) > 1:
+            unique, counts = np.unique(np.concatenate([rows for _, _, rows in ranked]), return_counts=True)
+            repeated = set(unique[counts > 1].tolist())
+            for drive, _, rows in ranked:
+                for row in rows.tolist():
+                    if row in repeated:
+                        clashes.setdefault(row, []).append(drive["id"])
+
+        for drive, total, rows in ranked:
+            students = []
+            conflicted = 0
+            for position, row in enumerate(rows.tolist()):
+                others = [drive_id for drive_id in clashes.get(row, ()) if drive_id != drive["id"]]
+                conflicted += bool(others)
+                students.append({
+                    "student_id": columns.ids[row],
+                    "rank": position + 1,
+                    "cgpa": float(columns.cgpa[row]),
+                    "highest_package": columns.best_package(row),
+                    "conflicts": others,
+                })
+            results.append({
+                "drive_id": drive["id"],
+                "company_id": drive.get("company_id"),
+                "company_name": drive.get("company_name"),
+                "role": drive.get("role"),
+                "date": drive.get("date"),
+                "eligible": total,
+                "conflicts": conflicted,
+                "students": students,
+            })
+    return results
+
+
+def _tasks(drives, target):
+    """Pack drives into tasks of about ``target`` drives, never splitting a day"""
+    by_date = {}
+    for drive in drives:
+        by_date.setdefault(drive.get("date"), []).append(drive)
+    tasks, current, size = [], [], 0
+    for group in by_date.values():
+        current.append(group)
+        size += len(group)
+        if size >= target:
+            tasks.append(current)
+            current, size = [], 0
+    if current:
+        tasks.append(current)
+    return tasks
+
+
+async def run_job(db, job, max_workers=None):
+    """Compute and store shortlists for ``job``, updating its progress document"""
+    jobs = db.shortlist_jobs
+    criteria = job["criteria"]
+    loop = asyncio.get_running_loop()
+    pool = None
+    try:
+        query = {} if criteria["include_past"] else {"date": {"$gte": day_start(datetime.now(timezone.utc).date())}}
+        drives = await db.drives.find(query, DRIVE_FIELDS).to_list(None)
+        columns = await load_columns(db)
+        n = columns.size
+
+        workers = max_workers or multiprocessing.cpu_count()
+        tasks = _tasks(drives, max(1, -(-len(drives) // (workers * TASKS_PER_WORKER))))
+        await jobs.update_one({"id": job["id"]}, {"$set": {
+            "drives_total": len(drives), "students": len(columns.rows), "tasks_total": len(tasks),
+        }})
+
+        start = time.perf_counter()
+        pool = ProcessPoolExecutor(
+            max_workers=min(workers, max(1, len(tasks))),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(columns.ids, columns.departments, columns.department[:n], columns.cgpa[:n],
+                      columns.best[:n], columns.alive[:n]),
+        )
+        futures = [loop.run_in_executor(pool, _shortlist_task, task, criteria) for task in tasks]
+        for future in asyncio.as_completed(futures):
+            results = await future
+            computed_at = datetime.now(timezone.utc)
+            operations = [
+                ReplaceOne({"drive_id": doc["drive_id"]},
+                           {**doc, "job_id": job["id"], "criteria": criteria, "computed_at": computed_at},
+                           upsert=True)
+                for doc in results
+            ]
+            if operations:
+                await db.shortlists.bulk_write(operations, ordered=False)
+            await jobs.update_one({"id": job["id"]}, {"$inc": {"tasks_done": 1, "drives_done": len(results)}})
+
+        logger.info(f"Shortlist job {job['id']}: {len(drives)} drives in {time.perf_counter() - start:.2f}s")
+        await jobs.update_one({"id": job["id"]}, {"$set": {
+            "status": "completed", "finished_at": datetime.now(timezone.utc),
+        }})
+    except asyncio.CancelledError:
+        await jobs.update_one({"id": job["id"]}, {"$set": {
+            "status": "failed", "error": "cancelled", "finished_at": datetime.now(timezone.utc),
+        }})
+        raise
+    except Exception as e:
+        logger.exception(f"Shortlist job {job['id']} failed")
+        await jobs.update_one({"id": job["id"]}, {"$set": {
+            "status": "failed", "error": str(e), "finished_at": datetime.now(timezone.utc),
+        }})
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def new_job(criteria, requested_by=None):
+    return {
+        "id": str(uuid.uuid4()),
+        "status": "running",
+        "criteria": criteria,
+        "requested_by": requested_by,
+        "drives_total": None,
+        "drives_done": 0,
+        "tasks_total": None,
+        "tasks_done": 0,
+        "students": None,
+        "error": None,
+        "started_at": datetime.now(timezone.utc),
+        "finished_at": None,
+    }
+
+
+class ShortlistRunner:
+    """Runs one shortlist job at a time as a background task of the app.
+
+    ``on_done`` is called with the job once it has finished, completed or
+    not (a failed job may have written part of its shortlists), e.g. to
+    invalidate cached responses.
+    """
+
+    def __init__(self, max_workers=None, on_done=None):
+        self.max_workers = max_workers
+        self.on_done = on_done
+        self._task = None
+        self._job_id = None
+
+    async def start(self, db, criteria, requested_by=None):
+        if self._task is not None and not self._task.done():
+            raise JobAlreadyRunning(self._job_id)
+        job = new_job(criteria, requested_by)
+        await db.shortlist_jobs.insert_one(dict(job))
+        self._job_id = job["id"]
+        self._task = asyncio.create_task(self._run(db, job))
+        return job
+
+    async def _run(self, db, job):
+        try:
+            await run_job(db, job, self.max_workers)
+        finally:
+            if self.on_done:
+                self.on_done(job)
+
+    async def shutdown(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
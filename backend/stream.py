@@ -0,0 +1,216 @@
+"""Live dashboard updates for Server-Sent Events clients.
+
+``DashboardHub`` keeps one snapshot of the dashboard (stats and chart
+series) per process and fans changes out to every subscriber, so N open
+dashboards cost one change consumer and one snapshot computation per change
+instead of N pollers re-reading analytics.
+
+Changes are noticed through a MongoDB change stream on the watched
+collections. Change streams need a replica set; on a standalone mongod the
+hub falls back to recomputing the snapshot every ``poll_interval`` seconds.
+Bursts of changes are coalesced for ``debounce`` seconds before the
+snapshot is recomputed, and only what differs from the previous snapshot is
+published as a delta.
+
+Each subscriber has a bounded queue. A subscriber that falls ``buffer``
+deltas behind has its queue dropped and is sent one fresh snapshot instead,
+so a slow client can never hold memory or delay the others.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+
+from pymongo.errors import OperationFailure
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Server error code for $changeStream on a standalone server
+CHANGE_STREAMS_UNSUPPORTED = 40573
+RESYNC = object()
+CLOSED = object()
+KEEPALIVE = ": keepalive\n\n"
+
+
+def format_event(name, data):
+    """One SSE message"""
+    return f"event: {name}\ndata: {json.dumps(data, separators=(',', ':'), default=str)}\n\n"
+
+
+def diff(previous, current):
+    """What changed between two snapshots; ``None`` when nothing did.
+
+    Stats are compared field by field. Chart series are sent as
+    ``{label: value}`` for changed or new labels and ``{label: None}`` for
+    labels that disappeared.
+    """
+    delta = {}
+    stats = {key: value for key, value in current["stats"].items() if previous["stats"].get(key) != value}
+    if stats:
+        delta["stats"] = stats
+    charts = {}
+    for name, chart in current["charts"].items():
+        before = dict(zip(previous["charts"][name]["labels"], previous["charts"][name]["values"]))
+        after = dict(zip(chart["labels"], chart["values"]))
+        changes = {label: value for label, value in after.items() if before.get(label) != value}
+        changes.update({label: None for label in before if label not in after})
+        if changes:
+            charts[name] = changes
+    if charts:
+        delta["charts"] = charts
+    return delta or None
+
+
+class Subscriber:
+    def __init__(self, buffer):
+        self.queue = asyncio.Queue(maxsize=buffer)
+
+    def offer(self, delta):
+        """Queue a delta; returns False when the subscriber had to be resynced instead"""
+        try:
+            self.queue.put_nowait(delta)
+            return True
+        except asyncio.QueueFull:
+            # Too far behind for deltas to be useful; replace them with one snapshot
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            return False
+
+
+class DashboardHub:
+    def __init__(self, db, snapshot, collections=("offers", "students", "drives"), debounce=0.25,
+                 poll_interval=5.0, buffer=16, heartbeat=15.0):
+        self.db = db
+        # Coroutine function returning {"stats": {...}, "charts": {name: {"labels", "values"}}}
+        self.snapshot = snapshot
+        self.collections = list(collections)
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.buffer = buffer
+        self.heartbeat = heartbeat
+        self.current = None
+        self.mode = None
+        self.published = 0
+        self.changes = 0
+        self.resyncs = 0
+        self._subscribers = set()
+        self._dirty = asyncio.Event()
+        self._tasks = []
+        self._lock = asyncio.Lock()
+
+    async def subscribe(self):
+        """Register a subscriber, starting the change consumer for the first one"""
+        async with self._lock:
+            if not self._tasks:
+                self.current = await self.snapshot()
+                # The consumer outlives this request: keep its tenant, but charge its queries to no request
+                context = contextvars.copy_context()
+                context.run(metrics.current_timings.set, None)
+                self._tasks = [asyncio.create_task(self._watch(), context=context),
+                               asyncio.create_task(self._publish(), context=context)]
+            subscriber = Subscriber(self.buffer)
+            self._subscribers.add(subscriber)
+            return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Drop a subscriber; the consumer stops with the last one.
+
+        Synchronous, so it also runs from a stream that is being cancelled.
+        """
+        self._subscribers.discard(subscriber)
+        if not self._subscribers:
+            self._stop()
+
+    async def events(self, subscriber):
+        """``(name, data)`` pairs for one client; ``(None, None)`` asks for a keepalive"""
+        yield "snapshot", self.current
+        while True:
+            try:
+                item = await asyncio.wait_for(subscriber.queue.get(), self.heartbeat)
+            except asyncio.TimeoutError:
+                yield None, None
+                continue
+            if item is CLOSED:
+                return
+            if item is RESYNC:
+                yield "snapshot", self.current
+            else:
+                yield "delta", item
+
+    async def _watch(self):
+        pipeline = [{"$match": {"ns.coll": {"$in": self.collections}}}]
+        while True:
+            try:
+                async with self.db.watch(pipeline) as changes:
+                    self.mode = "change_stream"
+                    async for _ in changes:
+                        self.changes += 1
+                        self._dirty.set()
+            except OperationFailure as e:
+                if e.code != CHANGE_STREAMS_UNSUPPORTED:
+                    logger.warning(f"Dashboard change stream failed, retrying: {e}")
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                logger.info("Change streams need a replica set; dashboard updates fall back to polling")
+                break
+            except Exception as e:
+                logger.warning(f"Dashboard change stream failed, retrying: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+        self.mode = "polling"
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            self._dirty.set()
+
+    async def _publish(self):
+        while True:
+            await self._dirty.wait()
+            # Let a burst of writes land before recomputing once
+            await asyncio.sleep(self.debounce)
+            self._dirty.clear()
+            try:
+                current = await self.snapshot()
+            except Exception as e:
+                logger.error(f"Dashboard snapshot failed: {e}")
+                continue
+            delta = diff(self.current, current)
+            self.current = current
+            if delta is None:
+                continue
+            self.published += 1
+            for subscriber in list(self._subscribers):
+                if not subscriber.offer(delta):
+                    self.resyncs += 1
+
+    def _stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        self.mode = None
+        return tasks
+
+    async def close(self):
+        """End every subscriber's stream and stop the consumer"""
+        async with self._lock:
+            for subscriber in self._subscribers:
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                subscriber.queue.put_nowait(CLOSED)
+            self._subscribers.clear()
+            for task in self._stop():
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+    def stats(self):
+        return {
+            "subscribers": len(self._subscribers),
+            "mode": self.mode,
+            "changes": self.changes,
+            "published": self.published,
+            "resyncs": self.resyncs,
+        }
@@ -0,0 +1,197 @@
+"""Materialized analytics summaries, maintained incrementally by the write handlers.
+
+Two collections back the dashboards:
+
+``analytics_summary``
+    ``{_id: "totals"}`` holds collection counts, the running package sum and
+    the distinct placed-student count. Chart buckets live in one document
+    each, ``{_id: "<kind>:<key>", kind, key, count}``, for the ``department``,
+    ``year`` and ``role`` kinds.
+
+``placement_ledger``
+    ``{_id: student_id, offers, department}`` for every student with at least
+    one offer. A ledger document being created or deleted is what marks a
+    student becoming placed or unplaced, which keeps the distinct count exact
+    under concurrent writes. ``department`` is cleared once the student is
+    deleted, matching the aggregation semantics where department counts only
+    include existing students.
+
+Every update is an atomic ``$inc``; ``rebuild`` recomputes everything from
+the source collections and is the repair path if the two ever drift.
+"""
+from datetime import datetime, timezone
+
+from pymongo import ReturnDocument, UpdateOne
+
+import aggregations
+from dates import as_date
+
+TOTALS_ID = "totals"
+BUCKET_KINDS = ("department", "year", "role")
+
+
+def offer_year(offer):
+    return str(as_date(offer["date"]).year)
+
+
+def _bucket_update(kind, key, delta):
+    return UpdateOne(
+        {"_id": f"{kind}:{key}"},
+        {"$inc": {"count": delta}, "$set": {"kind": kind, "key": key}},
+        upsert=True
+    )
+
+
+def _totals_update(deltas):
+    return UpdateOne({"_id": TOTALS_ID}, {"$inc": deltas}, upsert=True)
+
+
+async def adjust_totals(db, **deltas):
+    """Increment counters on the totals document, e.g. ``students=1``"""
+    await db.analytics_summary.update_one({"_id": TOTALS_ID}, {"$inc": deltas}, upsert=True)
+
+
+async def record_offers(db, offers, departments):
+    """Account for newly inserted offers.
+
+    ``departments`` maps each offer's student_id to the student's department.
+    """
+    if not offers:
+        return
+    per_student = {}
+    for offer in offers:
+        per_student[offer["student_id"]] = per_student.get(offer["student_id"], 0) + 1
+
+    student_ids = list(per_student)
+    result = await db.placement_ledger.bulk_write([
+        UpdateOne(
+            {"_id": student_id},
+            {"$inc": {"offers": count}, "$setOnInsert": {"department": departments.get(student_id)}},
+            upsert=True
+        )
+        for student_id, count in per_student.items()
+    ], ordered=False)
+    # An upsert means the student had no offers before this batch
+    newly_placed = [student_ids[index] for index in result.upserted_ids]
+
+    deltas = {}
+    for offer in offers:
+        for kind, key in (("year", offer_year(offer)), ("role", offer["role"])):
+            deltas[(kind, key)] = deltas.get((kind, key), 0) + 1
+    for student_id in newly_placed:
+        department = departments.get(student_id)
+        if department is not None:
+            deltas[("department", department)] = deltas.get(("department", department), 0) + 1
+
+    operations = [_bucket_update(kind, key, delta) for (kind, key), delta in deltas.items()]
+    operations.append(_totals_update({
+        "offers": len(offers),
+        "package_sum": sum(offer["package"] for offer in offers),
+        "placed_students": len(newly_placed),
+    }))
+    await db.analytics_summary.bulk_write(operations, ordered=False)
+
+
+async def remove_offer(db, offer):
+    """Account for a deleted offer document"""
+    student_id = offer["student_id"]
+    await db.placement_ledger.update_one({"_id": student_id}, {"$inc": {"offers": -1}})
+    unplaced = await db.placement_ledger.find_one_and_delete({"_id": student_id, "offers": {"$lte": 0}})
+
+    operations = [
+        _bucket_update("year", offer_year(offer), -1),
+        _bucket_update("role", offer["role"], -1),
+    ]
+    totals = {"offers": -1, "package_sum": -offer["package"]}
+    if unplaced:
+        totals["placed_students"] = -1
+        if unplaced.get("department") is not None:
+            operations.append(_bucket_update("department", unplaced["department"], -1))
+    operations.append(_totals_update(totals))
+    await db.analytics_summary.bulk_write(operations, ordered=False)
+
+
+async def student_deleted(db, student_id):
+    """Drop a deleted student from the department counts"""
+    before = await db.placement_ledger.find_one_and_update(
+        {"_id": student_id, "department": {"$ne": None}},
+        {"$set": {"department": None}}
+    )
+    operations = [_totals_update({"students": -1})]
+    if before:
+        operations.append(_bucket_update("department", before["department"], -1))
+    await db.analytics_summary.bulk_write(operations, ordered=False)
+
+
+async def student_department_changed(db, student_id, department):
+    """Move a placed student's count to their new department"""
+    before = await db.placement_ledger.find_one_and_update(
+        {"_id": student_id, "department": {"$ne": department}},
+        {"$set": {"department": department}},
+        return_document=ReturnDocument.BEFORE
+    )
+    if not before:
+        return
+    operations = [_bucket_update("department", department, 1)]
+    if before.get("department") is not None:
+        operations.append(_bucket_update("department", before["department"], -1))
+    await db.analytics_summary.bulk_write(operations, ordered=False)
+
+
+async def chart(db, kind):
+    """Read one bucket kind as the {labels, values} chart shape"""
+    cursor = db.analytics_summary.find({"kind": kind, "count": {"$gt": 0}}).sort("key", 1)
+    buckets = await cursor.to_list(None)
+    return {
+        "labels": [bucket["key"] for bucket in buckets],
+        "values": [bucket["count"] for bucket in buckets]
+    }
+
+
+async def totals(db):
+    return await db.analytics_summary.find_one({"_id": TOTALS_ID}) or {}
+
+
+async def is_built(db):
+    return "built_at" in await totals(db)
+
+
+async def rebuild(db):
+    """Recompute every summary from the source collections"""
+    await db.offers.aggregate([
+        {"$group": {"_id": "$student_id", "offers": {"$sum": 1}}},
+        {"$lookup": {"from": "students", "localField": "_id", "foreignField": "id", "as": "student"}},
+        {"$project": {
+            "offers": 1,
+            "department": {"$ifNull": [{"$arrayElemAt": ["$student.department", 0]}, None]}
+        }},
+        {"$out": "placement_ledger"},
+    ], allowDiskUse=True).to_list(None)
+
+    offer_stats = await aggregations.offer_stats(db)
+
+    charts = {
+        "department": await aggregations.department_placements(db),
+        "year": await aggregations.yearly_trends(db),
+        "role": await aggregations.role_distribution(db),
+    }
+    buckets = [
+        {"_id": f"{kind}:{key}", "kind": kind, "key": key, "count": count}
+        for kind, data in charts.items()
+        for key, count in zip(data["labels"], data["values"])
+    ]
+    await db.analytics_summary.delete_many({"kind": {"$in": list(BUCKET_KINDS)}})
+    if buckets:
+        await db.analytics_summary.insert_many(buckets)
+
+    totals_doc = {
+        "students": await db.students.count_documents({}),
+        "companies": await db.companies.count_documents({}),
+        "drives": await db.drives.count_documents({}),
+        "offers": await db.offers.count_documents({}),
+        "package_sum": offer_stats["package_sum"],
+        "placed_students": offer_stats["placed_students"],
+        "built_at": datetime.now(timezone.utc),
+    }
+    await db.analytics_summary.replace_one({"_id": TOTALS_ID}, totals_doc, upsert=True)
+    return totals_doc
@@ -0,0 +1,456 @@
+"""Serving several colleges (tenants) from one deployment.
+
+The tenant of a request comes from the ``tenant`` claim of its access token
+and is held in a context variable for the rest of the request, including
+tasks it starts. Everything tenant-specific reads it at the point of use:
+
+``DatabasePerTenant`` (``TENANCY_MODE=database``)
+    Each tenant gets its own database, ``<DB_NAME>_<tenant>``, on the one
+    shared client and connection pool.
+
+``SharedDatabase`` (``TENANCY_MODE=field``)
+    Tenants share the collections; every document carries a ``tenant`` field
+    that ``TenantCollection`` adds to filters, inserts and aggregation
+    pipelines, and strips from results. Indexes lead with the field (see
+    ``scoped_indexes``). The summary collections, whose ``_id``s are
+    computed keys and which are rebuilt with ``$out``, get one collection per
+    tenant instead. ``$lookup`` stages only join the tenant's own documents:
+    ids are unique per tenant only, and two tenants loaded from the same
+    seed share them. Change streams see every tenant's writes.
+
+``PerTenant`` holds one instance of an in-process cache, index or worker per
+tenant. Database access with no tenant in context raises ``NoTenant``, so a
+request that could not be attributed fails instead of seeing shared data.
+"""
+import contextvars
+import copy
+import re
+import uuid
+from contextlib import contextmanager
+
+from pymongo import InsertOne, ReplaceOne
+
+from mongo import LazyDatabase
+
+MODES = ("off", "database", "field")
+TENANT_FIELD = "tenant"
+# Keyed by computed _ids and rebuilt with $out, so split by collection in field mode
+PER_TENANT_COLLECTIONS = ("analytics_summary", "placement_ledger")
+# Tenant names become part of database and collection names
+NAME_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_-]{0,31}$")
+
+_current = contextvars.ContextVar("tenant", default=None)
+
+
+class NoTenant(Exception):
+    """Tenant data was accessed outside of any tenant"""
+
+
+def validate(mode, tenants, default=None):
+    if mode not in MODES:
+        raise ValueError(f"TENANCY_MODE must be one of {', '.join(MODES)}, not {mode!r}")
+    if mode == "off":
+        return
+    if not tenants:
+        raise ValueError(f"TENANCY_MODE={mode} needs the list of tenants in TENANTS")
+    for tenant in tenants:
+        if not NAME_PATTERN.match(tenant):
+            raise ValueError(f"Invalid tenant name {tenant!r}: use lowercase letters, digits, '-' and '_'")
+    if default is not None and default not in tenants:
+        raise ValueError(f"DEFAULT_TENANT {default!r} is not listed in TENANTS")
+
+
+def current():
+    """Tenant of the running request or task; ``None`` outside of any"""
+    return _current.get()
+
+
+def require():
+    tenant = _current.get()
+    if tenant is None:
+        raise NoTenant()
+    return tenant
+
+
+@contextmanager
+def tenant_scope(tenant):
+    """Run the block, and tasks it creates, as ``tenant``"""
+    token = _current.set(tenant)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def database_name(db_name, tenant):
+    return f"{db_name}_{tenant}"
+
+
+def collection_name(name, tenant):
+    """Physical collection behind ``name`` in field mode"""
+    return f"{name}_{tenant}" if name in PER_TENANT_COLLECTIONS else name
+
+
+def scoped_indexes(declared):
+    """Declared indexes with the tenant field leading each key (field mode).
+
+    TTL indexes must stay single-field and the per-tenant collections need no
+    prefix; both are kept as they are.
+    """
+    scoped = {}
+    for collection, indexes in declared.items():
+        if collection in PER_TENANT_COLLECTIONS:
+            scoped[collection] = indexes
+            continue
+        scoped[collection] = [
+            (name, keys, options) if "expireAfterSeconds" in options
+            else (f"{TENANT_FIELD}_{name}", [(TENANT_FIELD, 1), *keys], options)
+            for name, keys, options in indexes
+        ]
+    return scoped
+
+
+class TenantMiddleware:
+    """ASGI middleware running each request as the tenant named by its token.
+
+    ``tenant_of`` maps a bearer token to its tenant claim (``None`` when the
+    token is missing a claim or invalid); requests without one run as
+    ``default``.
+    """
+
+    def __init__(self, app, tenant_of, default=None):
+        self.app = app
+        self.tenant_of = tenant_of
+        self.default = default
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        tenant = None
+        authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() == "bearer" and token:
+            tenant = self.tenant_of(token)
+        with tenant_scope(tenant or self.default):
+            await self.app(scope, receive, send)
+
+
+class PerTenant:
+    """One instance per tenant, made by ``factory`` on first use.
+
+    Attribute access is forwarded to the current tenant's instance, so a
+    ``PerTenant`` stands in for a single instance at the call sites.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._instances = {}
+
+    def instance(self):
+        tenant = _current.get()
+        instance = self._instances.get(tenant)
+        if instance is None:
+            instance = self._instances[tenant] = self._factory()
+        return instance
+
+    def instances(self):
+        return list(self._instances.values())
+
+    def __getattr__(self, name):
+        return getattr(self.instance(), name)
+
+    def stats(self):
+        """Every tenant's ``stats()`` combined: counts summed, ages and limits the largest"""
+        reports = [instance.stats() for instance in self._instances.values()] or [self._factory().stats()]
+        merged = {}
+        for report in reports:
+            for key, value in report.items():
+                if key not in merged or merged[key] is None:
+                    merged[key] = value
+                elif isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                elif key.endswith("_seconds") or key.startswith("max_"):
+                    merged[key] = max(merged[key], value)
+                else:
+                    merged[key] += value
+        if "hit_ratio" in merged:
+            lookups = merged["hits"] + merged["misses"]
+            merged["hit_ratio"] = round(merged["hits"] / lookups, 4) if lookups else 0.0
+        return merged
+
+
+class DatabasePerTenant(LazyDatabase):
+    """The current tenant's own database"""
+
+    def _database(self):
+        return self._factory.database(self._read_preference, database_name(self._factory.db_name, require()))
+
+
+class SharedDatabase(LazyDatabase):
+    """The shared database, seen through the current tenant's documents"""
+
+    def __getattr__(self, name):
+        database = self._database()
+        if name.startswith("_") or hasattr(type(database), name):
+            # Database methods (watch, command, ...) are not scoped
+            return getattr(database, name)
+        return self[name]
+
+    def __getitem__(self, name):
+        tenant = require()
+        database = self._database()
+        if name in PER_TENANT_COLLECTIONS:
+            return database[collection_name(name, tenant)]
+        return TenantCollection(database[name], tenant)
+
+
+class TenantCollection:
+    """A shared collection restricted to one tenant's documents"""
+
+    def __init__(self, collection, tenant):
+        self.collection = collection
+        self.tenant = tenant
+
+    def __getattr__(self, name):
+        # Index management and the like work on the whole collection
+        return getattr(self.collection, name)
+
+    def _filter(self, filter):
+        # Overrides any tenant the caller asked for
+        return {**(filter or {}), TENANT_FIELD: self.tenant}
+
+    def _tag(self, document):
+        document[TENANT_FIELD] = self.tenant
+        return document
+
+    @staticmethod
+    def _projection(projection):
+        """Leave the tenant field out of results unless only named fields are returned anyway"""
+        if projection is None:
+            return {TENANT_FIELD: 0}
+        if any(value for key, value in projection.items() if key != "_id"):
+            return projection
+        return {**projection, TENANT_FIELD: 0}
+
+    def _pipeline(self, pipeline):
+        return [{"$match": {TENANT_FIELD: self.tenant}}, {"$project": {TENANT_FIELD: 0}}, *self._stages(pipeline)]
+
+    def _stages(self, pipeline):
+        stages = []
+        for stage in pipeline:
+            if "$out" in stage:
+                target = stage["$out"]
+                if target not in PER_TENANT_COLLECTIONS:
+                    raise ValueError(f"$out into the shared collection {target!r} would replace other tenants' data")
+                stage = {"$out": collection_name(target, self.tenant)}
+            elif "$lookup" in stage:
+                stages.extend(self._lookup(stage["$lookup"]))
+                continue
+            elif "$facet" in stage:
+                stage = {"$facet": {name: self._stages(facet) for name, facet in stage["$facet"].items()}}
+            elif "$graphLookup" in stage or "$unionWith" in stage:
+                raise ValueError(f"{next(iter(stage))} is not scoped to a tenant")
+            stages.append(stage)
+        return stages
+
+    def _lookup(self, lookup):
+        """A ``$lookup`` that only joins this tenant's documents, whose ids may equal another tenant's"""
+        lookup = dict(lookup)
+        target = lookup["from"]
+        if target in PER_TENANT_COLLECTIONS:
+            lookup["from"] = collection_name(target, self.tenant)
+            if "pipeline" in lookup:
+                lookup["pipeline"] = self._stages(lookup["pipeline"])
+            return [{"$lookup": lookup}]
+        if "pipeline" in lookup:
+            lookup["pipeline"] = self._pipeline(lookup["pipeline"])
+            return [{"$lookup": lookup}]
+        # Kept as an equality join, which uses the foreign index on MongoDB 4.x as well; the other
+        # tenants' matches are then dropped, and the tenant field removed from the ones kept
+        joined = f"${lookup['as']}"
+        own = {"$filter": {"input": joined, "as": "doc", "cond": {"$eq": [f"$$doc.{TENANT_FIELD}", self.tenant]}}}
+        untagged = {"$arrayToObject": {"$filter": {
+            "input": {"$objectToArray": "$$doc"}, "as": "field", "cond": {"$ne": ["$$field.k", TENANT_FIELD]},
+        }}}
+        return [{"$lookup": lookup}, {"$addFields": {lookup["as"]: {"$map": {"input": own, "as": "doc", "in": untagged}}}}]
+
+    def find(self, filter=None, projection=None, *args, **kwargs):
+        return self.collection.find(self._filter(filter), self._projection(projection), *args, **kwargs)
+
+    def find_one(self, filter=None, projection=None, *args, **kwargs):
+        return self.collection.find_one(self._filter(filter), self._projection(projection), *args, **kwargs)
+
+    def count_documents(self, filter, *args, **kwargs):
+        return self.collection.count_documents(self._filter(filter), *args, **kwargs)
+
+    def estimated_document_count(self, **kwargs):
+        # The collection metadata counts every tenant; count this one's documents instead
+        return self.collection.count_documents(self._filter(None))
+
+    def distinct(self, key, filter=None, **kwargs):
+        return self.collection.distinct(key, self._filter(filter), **kwargs)
+
+    def aggregate(self, pipeline, *args, **kwargs):
+        return self.collection.aggregate(self._pipeline(pipeline), *args, **kwargs)
+
+    def insert_one(self, document, *args, **kwargs):
+        return self.collection.insert_one(self._tag(document), *args, **kwargs)
+
+    def insert_many(self, documents, *args, **kwargs):
+        return self.collection.insert_many([self._tag(document) for document in documents], *args, **kwargs)
+
+    def update_one(self, filter, update, *args, **kwargs):
+        return self.collection.update_one(self._filter(filter), update, *args, **kwargs)
+
+    def update_many(self, filter, update, *args, **kwargs):
+        return self.collection.update_many(self._filter(filter), update, *args, **kwargs)
+
+    def replace_one(self, filter, replacement, *args, **kwargs):
+        return self.collection.replace_one(self._filter(filter), self._tag(replacement), *args, **kwargs)
+
+    def delete_one(self, filter, *args, **kwargs):
+        return self.collection.delete_one(self._filter(filter), *args, **kwargs)
+
+    def delete_many(self, filter, *args, **kwargs):
+        return self.collection.delete_many(self._filter(filter), *args, **kwargs)
+
+    def find_one_and_delete(self, filter, projection=None, *args, **kwargs):
+        return self.collection.find_one_and_delete(
+            self._filter(filter), self._projection(projection), *args, **kwargs)
+
+    def find_one_and_update(self, filter, update, projection=None, *args, **kwargs):
+        return self.collection.find_one_and_update(
+            self._filter(filter), update, self._projection(projection), *args, **kwargs)
+
+    def find_one_and_replace(self, filter, replacement, projection=None, *args, **kwargs):
+        return self.collection.find_one_and_replace(
+            self._filter(filter), self._tag(replacement), self._projection(projection), *args, **kwargs)
+
+    def bulk_write(self, requests, *args, **kwargs):
+        scoped = []
+        for request in requests:
+            # pymongo's write models keep their filter and document in private slots
+            request = copy.copy(request)
+            if isinstance(request, InsertOne):
+                request._doc = self._tag(dict(request._doc))
+            else:
+                request._filter = self._filter(request._filter)
+                if isinstance(request, ReplaceOne):
+                    request._doc = self._tag(dict(request._doc))
+            scoped.append(request)
+        return self.collection.bulk_write(scoped, *args, **kwargs)
+
+# Cross-collection references that must stay within one tenant: (collection, field, referenced collection)
+REFERENCES = (
+    ("offers", "student_id", "students"),
+    ("offers", "company_id", "companies"),
+    ("drives", "company_id", "companies"),
+)
+
+
+async def _tenant_counts(collection):
+    pipeline = [{"$group": {"_id": f"${TENANT_FIELD}", "count": {"$sum": 1}}}]
+    return {doc["_id"]: doc["count"] async for doc in collection.aggregate(pipeline)}
+
+
+async def _crossed_references(database, collection, field, target):
+    """Documents of ``collection`` whose ``field`` names a ``target`` document of another tenant"""
+    pipeline = [
+        {"$lookup": {"from": target, "localField": field, "foreignField": "id", "as": "referenced"}},
+        {"$unwind": "$referenced"},
+        {"$match": {"$expr": {"$ne": [f"${TENANT_FIELD}", f"$referenced.{TENANT_FIELD}"]}}},
+        {"$count": "count"},
+    ]
+    result = await database[collection].aggregate(pipeline).to_list(1)
+    return result[0]["count"] if result else 0
+
+
+async def _audit_field(database, tenants, report):
+    served = set(tenants)
+    for name in sorted(await database.list_collection_names()):
+        if name.startswith("system.") or any(name.startswith(f"{shared}_") for shared in PER_TENANT_COLLECTIONS):
+            continue
+        counts = await _tenant_counts(database[name])
+        report["documents"][name] = {str(tenant): count for tenant, count in counts.items()}
+        for tenant, count in counts.items():
+            if tenant is None:
+                report["problems"].append(f"{name}: {count} documents without a tenant")
+            elif tenant not in served:
+                report["problems"].append(f"{name}: {count} documents of unknown tenant {tenant!r}")
+        for index, info in (await database[name].index_information()).items():
+            keys = list(info["key"])
+            if index == "_id_" or "expireAfterSeconds" in info or keys[0][0] == TENANT_FIELD:
+                continue
+            report["problems"].append(f"{name}.{index}: index does not lead with {TENANT_FIELD!r}")
+    for collection, field, target in REFERENCES:
+        crossed = await _crossed_references(database, collection, field, target)
+        if crossed:
+            report["problems"].append(f"{collection}.{field}: {crossed} references to another tenant's {target}")
+
+
+async def _audit_databases(factory, tenants, report):
+    prefix = f"{factory.db_name}_"
+    names = await factory.client.list_database_names()
+    for name in names:
+        if name.startswith(prefix) and name[len(prefix):] not in tenants:
+            report["problems"].append(f"database {name} belongs to no served tenant")
+    for tenant in tenants:
+        database = factory.database(name=database_name(factory.db_name, tenant))
+        report["documents"][tenant] = {
+            name: await database[name].estimated_document_count()
+            for name in sorted(await database.list_collection_names()) if not name.startswith("system.")
+        }
+    if factory.db_name in names and await factory.database().students.estimated_document_count():
+        report["problems"].append(f"database {factory.db_name} holds students outside of any tenant")
+
+
+async def _probe(db, tenants, report):
+    """Write a student as the first tenant and make sure no other tenant can read, change or remove it"""
+    owner, others = tenants[0], tenants[1:]
+    probe_id = f"tenancy-probe-{uuid.uuid4()}"
+    leaks = []
+    with tenant_scope(owner):
+        await db.students.insert_one({"id": probe_id, "name": "Tenancy probe", "department": "probe"})
+    try:
+        with tenant_scope(owner):
+            if not await db.students.find_one({"id": probe_id}):
+                leaks.append(f"{owner}: cannot read its own probe")
+        for tenant in others:
+            with tenant_scope(tenant):
+                checks = {
+                    "find_one": await db.students.find_one({"id": probe_id}) is not None,
+                    "count_documents": await db.students.count_documents({"id": probe_id}) > 0,
+                    "aggregate": bool(await db.students.aggregate([{"$match": {"id": probe_id}}]).to_list(1)),
+                    "update_one": (await db.students.update_one(
+                        {"id": probe_id}, {"$set": {"name": tenant}})).matched_count > 0,
+                    "delete_one": (await db.students.delete_one({"id": probe_id})).deleted_count > 0,
+                }
+            leaks.extend(f"{tenant}: {operation} reached {owner}'s probe" for operation, hit in checks.items() if hit)
+    finally:
+        with tenant_scope(owner):
+            await db.students.delete_one({"id": probe_id})
+    report["probe"] = {"owner": owner, "checked": others, "leaks": leaks}
+    report["problems"].extend(leaks)
+
+
+async def audit(factory, mode, tenants, probe=False):
+    """Check that every document, index and reference belongs to exactly one served tenant.
+
+    Reports document counts per tenant and a list of ``problems``; with
+    ``probe=True`` it also writes a probe document as the first tenant and
+    tries to reach it as each of the others.
+    """
+    report = {"mode": mode, "tenants": list(tenants), "documents": {}, "problems": []}
+    if mode == "field":
+        await _audit_field(factory.database(), tenants, report)
+        db = SharedDatabase(factory)
+    else:
+        await _audit_databases(factory, tenants, report)
+        db = DatabasePerTenant(factory)
+    if probe:
+        if len(tenants) < 2:
+            report["problems"].append("the probe needs at least two tenants")
+        else:
+            await _probe(db, list(tenants), report)
+    return report
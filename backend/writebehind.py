@@ -0,0 +1,159 @@
+"""Write-behind buffer that coalesces inserts from concurrent requests.
+
+Each request hands its document to ``WriteBehindBuffer.submit`` and waits.
+A single flusher task collects whatever has queued up within ``max_delay``
+seconds (or until ``max_batch`` documents are waiting) and writes the batch
+with one ``insert_many``. The request is acknowledged only after that insert,
+and the ``on_flushed`` follow-up for its batch, have completed, so a
+successful response still means the document is stored; the write concern
+is whatever the client is configured with.
+
+A ``before_write`` hook sees each batch before it is inserted and may
+refuse documents (their requests get the exception it gives) or update them
+in place, e.g. to re-check data the request read earlier.
+
+The queue is bounded: once ``max_queue`` documents are waiting, ``submit``
+raises ``QueueFull`` and the caller should answer 503. ``close`` writes out
+everything still queued and is meant for application shutdown.
+"""
+import asyncio
+import logging
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised when the buffer already holds its maximum number of documents"""
+
+    def __init__(self, retry_after):
+        super().__init__("Write-behind queue is full")
+        self.retry_after = retry_after
+
+
+class WriteBehindBuffer:
+    def __init__(self, db, collection, max_batch=500, max_delay=0.02, max_queue=5000, retry_after=1,
+                 before_write=None, on_flushed=None):
+        self.db = db
+        self.collection = collection
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        # Awaited with (docs, contexts) before each insert; returns {index: exception} of refused docs
+        self.before_write = before_write
+        # Awaited with (docs, contexts) after each successful insert, before acknowledging
+        self.on_flushed = on_flushed
+        self._pending = []
+        self._wake = asyncio.Event()
+        self._full = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._closed = False
+        self.batches = 0
+        self.written = 0
+        self.rejected = 0
+        self.refused = 0
+
+    async def submit(self, doc, context=None):
+        """Queue ``doc`` and return once it has been written"""
+        if self._closed or len(self._pending) >= self.max_queue:
+            self.rejected += 1
+            raise QueueFull(self.retry_after)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((doc, context, future))
+        self._wake.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        # Shielded: a client disconnect must not drop a document that is already queued
+        return await asyncio.shield(future)
+
+    async def _run(self):
+        while True:
+            await self._wake.wait()
+            if len(self._pending) < self.max_batch:
+                # Give concurrent requests a moment to join the batch
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            await self._flush()
+
+    async def _flush(self):
+        async with self._lock:
+            self._wake.clear()
+            self._full.clear()
+            while self._pending:
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+                await self._write(batch)
+
+    async def _write(self, batch):
+        if self.before_write:
+            try:
+                refused = await self.before_write([doc for doc, _, _ in batch], [context for _, context, _ in batch])
+            except Exception as e:
+                refused = {index: e for index in range(len(batch))}
+            for index, error in refused.items():
+                future = batch[index][2]
+                if not future.done():
+                    future.set_exception(error)
+            self.refused += len(refused)
+            batch = [entry for index, entry in enumerate(batch) if index not in refused]
+            if not batch:
+                return
+
+        docs = [doc for doc, _, _ in batch]
+        failed = {}
+        try:
+            await self.db[self.collection].insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                failed[error["index"]] = e
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        written = [entry for index, entry in enumerate(batch) if index not in failed]
+        self.batches += 1
+        self.written += len(written)
+        if written and self.on_flushed:
+            try:
+                await self.on_flushed([doc for doc, _, _ in written], [context for _, context, _ in written])
+            except Exception as e:
+                # The documents are stored; only the follow-up failed
+                logger.error(f"Write-behind follow-up failed for {len(written)} documents: {e}")
+        for index, (doc, _, future) in enumerate(batch):
+            if future.done():
+                continue
+            if index in failed:
+                future.set_exception(failed[index])
+            else:
+                future.set_result(doc)
+
+    async def close(self):
+        """Stop accepting documents and write out everything still queued"""
+        self._closed = True
+        await self._flush()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return {
+            "pending": len(self._pending),
+            "max_queue": self.max_queue,
+            "batches": self.batches,
+            "written": self.written,
+            "rejected": self.rejected,
+            "refused": self.refused,
+        }
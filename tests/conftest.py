@@ -0,0 +1,63 @@
+"""Shared fixtures: the backend on the import path and a throwaway MongoDB database.
+
+Tests that need MongoDB take the ``mongo`` fixture and are skipped when no
+server answers at ``TEST_MONGO_URL`` (default ``mongodb://localhost:27017``).
+Each test gets its own database, dropped afterwards.
+"""
+import asyncio
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+from pymongo import MongoClient  # noqa: E402
+from pymongo.errors import PyMongoError  # noqa: E402
+
+from dates import CODEC_OPTIONS  # noqa: E402
+
+MONGO_URL = os.environ.get("TEST_MONGO_URL", "mongodb://localhost:27017")
+
+
+class Mongo:
+    """A test database; ``run(fn)`` awaits ``fn(client, db)`` on a fresh event loop and client"""
+
+    def __init__(self, url, db_name, replica_set):
+        self.url = url
+        self.db_name = db_name
+        self.replica_set = replica_set
+
+    def run(self, fn):
+        async def main():
+            client = AsyncIOMotorClient(self.url)
+            try:
+                return await fn(client, client.get_database(self.db_name, codec_options=CODEC_OPTIONS))
+            finally:
+                client.close()
+
+        return asyncio.run(main())
+
+
+@pytest.fixture(scope="session")
+def mongo_server():
+    client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+    try:
+        hello = client.admin.command("hello")
+    except PyMongoError:
+        client.close()
+        pytest.skip(f"no MongoDB server at {MONGO_URL}")
+    yield client, "setName" in hello
+    client.close()
+
+
+@pytest.fixture
+def mongo(mongo_server):
+    client, replica_set = mongo_server
+    db_name = f"placementiq_test_{uuid.uuid4().hex[:12]}"
+    yield Mongo(MONGO_URL, db_name, replica_set)
+    client.drop_database(db_name)
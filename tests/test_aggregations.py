@@ -0,0 +1,131 @@
+"""Parity of the analytics pipelines with the Python loops they replaced.
+
+The reference implementations are the loops of the original
+``/api/analytics`` routes, minus their ``to_list(1000)`` cap (the reason they
+were replaced) and with BSON dates handled next to ISO strings.
+"""
+import random
+from datetime import datetime
+
+import pytest
+
+import aggregations
+
+DEPARTMENTS = ["CSE", "IT", "ECE", "EEE", "MECH", "CIVIL"]
+ROLES = ["Software Engineer", "Data Analyst", "Product Manager", "Consultant", "Design Engineer"]
+
+
+def department_placements_loop(offers, students):
+    placed_student_ids = {offer["student_id"] for offer in offers}
+    dept_counts = {}
+    for student in students:
+        if student["id"] in placed_student_ids:
+            dept = student["department"]
+            dept_counts[dept] = dept_counts.get(dept, 0) + 1
+    return dept_counts
+
+
+def yearly_trends_loop(offers):
+    year_counts = {}
+    for offer in offers:
+        value = offer["date"]
+        year = value[:4] if isinstance(value, str) else str(value.year)
+        year_counts[year] = year_counts.get(year, 0) + 1
+    return year_counts
+
+
+def role_distribution_loop(offers):
+    role_counts = {}
+    for offer in offers:
+        role_counts[offer["role"]] = role_counts.get(offer["role"], 0) + 1
+    return role_counts
+
+
+def company_packages_loop(companies):
+    return {company["name"]: company["package"] for company in companies}
+
+
+def offer_stats_loop(offers):
+    return {
+        "average_package": sum(offer["package"] for offer in offers) / len(offers) if offers else 0,
+        "placed_students": len({offer["student_id"] for offer in offers}),
+    }
+
+
+def as_dict(chart):
+    return dict(zip(chart["labels"], chart["values"]))
+
+
+def make_dataset(students=1500, companies=25, offers=2600, seed=11):
+    """Students, companies and offers shaped like the seed data, more of them than one to_list(1000) sees"""
+    rng = random.Random(seed)
+    data = {
+        "students": [
+            {"id": f"student-{n}", "name": f"Student {n}", "department": rng.choice(DEPARTMENTS),
+             "cgpa": round(rng.uniform(6.0, 9.9), 2)}
+            for n in range(students)
+        ],
+        "companies": [
+            {"id": f"company-{n}", "name": f"Company {n}", "package": round(rng.uniform(3.5, 45.0), 1)}
+            for n in range(companies)
+        ],
+    }
+    data["offers"] = [
+        {"id": f"offer-{n}", "student_id": rng.choice(data["students"])["id"],
+         "company_id": rng.choice(data["companies"])["id"], "role": rng.choice(ROLES),
+         "package": round(rng.uniform(3.5, 45.0), 1),
+         "date": datetime(rng.randint(2019, 2025), rng.randint(1, 12), rng.randint(1, 28))}
+        for n in range(offers)
+    ]
+    return data
+
+
+async def load_dataset(db):
+    """Over 1000 offers; some students deleted after placement, some dates still ISO strings"""
+    data = make_dataset()
+    for name, docs in data.items():
+        await db[name].insert_many(docs)
+    deleted = [student["id"] for student in data["students"][::7]]
+    await db.students.delete_many({"id": {"$in": deleted}})
+    legacy = [offer["id"] for offer in data["offers"][::3]]
+    await db.offers.update_many(
+        {"id": {"$in": legacy}}, [{"$set": {"date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$date"}}}}],
+    )
+
+
+def test_pipelines_match_python_loops(mongo):
+    async def check(client, db):
+        await load_dataset(db)
+        offers = await db.offers.find({}, {"_id": 0}).to_list(None)
+        students = await db.students.find({}, {"_id": 0}).to_list(None)
+        companies = await db.companies.find({}, {"_id": 0}).to_list(None)
+        assert len(offers) > 1000
+        assert any(isinstance(offer["date"], str) for offer in offers)
+        assert any(not isinstance(offer["date"], str) for offer in offers)
+        assert {offer["student_id"] for offer in offers} - {student["id"] for student in students}
+
+        assert as_dict(await aggregations.department_placements(db)) == department_placements_loop(offers, students)
+        assert as_dict(await aggregations.yearly_trends(db)) == yearly_trends_loop(offers)
+        assert as_dict(await aggregations.role_distribution(db)) == role_distribution_loop(offers)
+        assert as_dict(await aggregations.company_packages(db)) == company_packages_loop(companies)
+
+        stats = await aggregations.offer_stats(db)
+        expected = offer_stats_loop(offers)
+        assert stats["placed_students"] == expected["placed_students"]
+        assert stats["average_package"] == pytest.approx(expected["average_package"])
+        assert stats["package_sum"] == pytest.approx(sum(offer["package"] for offer in offers))
+
+        yearly = await aggregations.yearly_trends(db)
+        assert yearly["labels"] == sorted(yearly["labels"])
+
+    mongo.run(check)
+
+
+def test_empty_database(mongo):
+    async def check(client, db):
+        assert await aggregations.department_placements(db) == {"labels": [], "values": []}
+        assert await aggregations.yearly_trends(db) == {"labels": [], "values": []}
+        stats = await aggregations.offer_stats(db)
+        assert (stats["average_package"], stats["placed_students"]) == (0, 0)
+
+    mongo.run(check)
@@ -0,0 +1,72 @@
+"""CSV and JSONL record parsing of the bulk import (no database needed)."""
+import asyncio
+
+import pytest
+
+import bulk_import
+
+
+def parse(data, fmt="csv", chunk_size=None):
+    async def stream():
+        if chunk_size is None:
+            yield data
+            return
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
+
+    async def collect():
+        return [row async for row in bulk_import.iter_rows(stream(), fmt)]
+
+    return asyncio.run(collect())
+
+
+def test_quote_inside_unquoted_field_is_literal():
+    rows = parse(b'name,roll\nA,1\nB "x,2\nC,3\nD,4\n')
+    assert [row for _, row, _ in rows] == [
+        {"name": "A", "roll": "1"},
+        {"name": 'B "x', "roll": "2"},
+        {"name": "C", "roll": "3"},
+        {"name": "D", "roll": "4"},
+    ]
+
+
+def test_quoted_newlines_survive_any_chunking():
+    data = b'name,note\r\nA,"multi\r\nline, ""quoted"""\r\n\r\nB,plain\nC,"x"\n'
+    expected = [
+        (1, {"name": "A", "note": 'multi\nline, "quoted"'}, None),
+        (2, {"name": "B", "note": "plain"}, None),
+        (3, {"name": "C", "note": "x"}, None),
+    ]
+    for chunk_size in range(1, len(data) + 1):
+        assert parse(data, chunk_size=chunk_size) == expected
+
+
+def test_unterminated_quote_at_end_is_a_row_error():
+    assert parse(b'name,roll\nA,1\n"B,2\nC,3\n') == [
+        (1, {"name": "A", "roll": "1"}, None),
+        (2, None, "Unterminated quoted field"),
+    ]
+
+
+def test_overlong_record_is_rejected_and_reading_resumes(monkeypatch):
+    monkeypatch.setattr(bulk_import, "MAX_RECORD_CHARS", 50)
+    rows = parse(b'name,roll\n"A,1\n' + b"x,y\n" * 20 + b"C,3\n", chunk_size=7)
+    assert rows[0] == (1, None, "Record longer than 50 characters (unbalanced quote?)")
+    assert [row for _, row, _ in rows[1:]] == [{"name": "x", "roll": "y"}] * 20 + [{"name": "C", "roll": "3"}]
+
+
+def test_column_count_mismatch():
+    assert parse(b"name,roll\nA,1,extra\nB\n") == [
+        (1, None, "Expected 2 columns, got 3"),
+        (2, None, "Expected 2 columns, got 1"),
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [None, 3])
+def test_jsonl(chunk_size):
+    rows = parse(b'{"name": "A"}\n\n[1]\n{bad\n{"name": "B"}', fmt="jsonl", chunk_size=chunk_size)
+    assert [(number, row) for number, row, _ in rows] == [
+        (1, {"name": "A"}), (2, None), (3, None), (4, {"name": "B"}),
+    ]
+    assert rows[1][2] == "Each line must be a JSON object"
+    assert rows[2][2].startswith("Invalid JSON")
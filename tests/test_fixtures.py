@@ -0,0 +1,115 @@
+"""Generated fixtures: the documents themselves, and loading them once, resumably."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import fixtures
+from dates import as_utc
+from indexes import ensure_indexes
+
+NOW = datetime(2025, 6, 1, tzinfo=timezone.utc)
+SIZE = {"students": 120, "companies": 8, "drives": 15, "offers": 90}
+
+
+def test_build_is_reproducible_from_the_seed():
+    first = fixtures.build(**SIZE, seed=5, now=NOW)
+    assert fixtures.build(**SIZE, seed=5, now=NOW) == first
+    other = fixtures.build(**SIZE, seed=6, now=NOW)
+    assert {doc["id"] for doc in other["students"]}.isdisjoint(doc["id"] for doc in first["students"])
+
+
+def test_build_counts_and_references():
+    data = fixtures.build(**SIZE, seed=5, now=NOW)
+    assert {name: len(docs) for name, docs in data.items()} == SIZE
+
+    students = {doc["id"]: doc for doc in data["students"]}
+    companies = {doc["id"]: doc for doc in data["companies"]}
+    for drive in data["drives"]:
+        assert companies[drive["company_id"]]["name"] == drive["company_name"]
+    for offer in data["offers"]:
+        assert students[offer["student_id"]]["name"] == offer["student_name"]
+        assert companies[offer["company_id"]]["name"] == offer["company_name"]
+
+    assert fixtures.fixture_counts(10, 0, 5) == {"students": 10, "companies": 0, "drives": 0, "offers": 0}
+    assert fixtures.build(10, 0, 5, seed=5)["offers"] == []
+
+
+def load(db, transaction=False):
+    return fixtures.load(db, "test", **SIZE, seed=5, batch_size=20, transaction=transaction)
+
+
+async def counts(db):
+    return {name: await db[name].count_documents({}) for name in fixtures.COLLECTIONS}
+
+
+def test_load_once(mongo):
+    async def check(client, db):
+        report = await load(db)
+        assert report["status"] == "loaded"
+        assert await counts(db) == SIZE
+        assert (await load(db))["status"] == "already_loaded"
+        assert await counts(db) == SIZE
+
+        marker = await db.fixture_loads.find_one({"id": "test"})
+        assert marker["status"] == "completed"
+        assert "owner" not in marker and "locked_until" not in marker
+
+    mongo.run(check)
+
+
+def test_load_in_progress_elsewhere_is_left_alone(mongo):
+    async def check(client, db):
+        await db.fixture_loads.insert_one({
+            "id": "test", "seed": 5, "now": NOW, "counts": SIZE, "batch_size": 20, "mode": "batches",
+            "status": "loading", "batches": {name: 0 for name in fixtures.COLLECTIONS},
+            "owner": "another-process", "locked_until": datetime.now(timezone.utc) + timedelta(seconds=60),
+        })
+        assert (await load(db))["status"] == "in_progress"
+        assert await counts(db) == dict.fromkeys(fixtures.COLLECTIONS, 0)
+        assert (await db.fixture_loads.find_one({"id": "test"}))["owner"] == "another-process"
+
+    mongo.run(check)
+
+
+def test_interrupted_load_resumes_once_its_lease_expires(mongo):
+    async def check(client, db):
+        await load(db)
+        marker = await db.fixture_loads.find_one({"id": "test"})
+        # Make it look like the loader died after the first batch of offers
+        data = fixtures.build(**SIZE, seed=5, now=as_utc(marker["now"]))
+        written = [offer["id"] for offer in data["offers"][:20]]
+        await db.offers.delete_many({"id": {"$nin": written}})
+        await db.fixture_loads.update_one({"id": "test"}, {
+            "$set": {"status": "loading", "batches.offers": 1, "owner": "crashed",
+                     "locked_until": datetime.now(timezone.utc) - timedelta(seconds=1)},
+            "$unset": {"completed_at": ""},
+        })
+
+        report = await load(db)
+        assert report["status"] == "resumed"
+        assert report["collections"]["offers"] == {"inserted": SIZE["offers"] - 20, "skipped_batches": 1}
+        assert await counts(db) == SIZE
+        assert sorted(await db.offers.distinct("id")) == sorted(offer["id"] for offer in data["offers"])
+        assert (await db.fixture_loads.find_one({"id": "test"}))["status"] == "completed"
+
+    mongo.run(check)
+
+
+def test_concurrent_transactional_loads_commit_once(mongo):
+    if not mongo.replica_set:
+        pytest.skip("transactions need a replica set")
+
+    async def check(client, db):
+        # The unique ids are what make the second transaction fail
+        await ensure_indexes(db)
+        reports = await asyncio.gather(load(db, transaction=True), load(db, transaction=True))
+
+        statuses = sorted(report["status"] for report in reports)
+        assert statuses[1] == "loaded"
+        assert statuses[0] in ("already_loaded", "in_progress")
+        assert await counts(db) == SIZE
+        assert await db.fixture_loads.count_documents({}) == 1
+        assert (await load(db, transaction=True))["status"] == "already_loaded"
+
+    mongo.run(check)
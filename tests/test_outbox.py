@@ -0,0 +1,56 @@
+"""Rename propagation through the outbox."""
+from datetime import timedelta
+
+import outbox
+
+
+async def add_company(db, name):
+    await db.companies.insert_one({"id": "c1", "name": name})
+    await db.drives.insert_one({"id": "d1", "company_id": "c1", "company_name": name})
+    await db.offers.insert_one({"id": "o1", "company_id": "c1", "company_name": name, "student_id": "s1"})
+
+
+def test_prepared_event_waits_for_its_update(mongo):
+    async def check(client, db):
+        await add_company(db, "Old")
+        event_id = await outbox.record_rename(db, "company", "c1")
+        # A worker polling before the update lands must not consume the event
+        assert await outbox.drain(db) == {"events": 0, "modified": {}}
+
+        await db.companies.update_one({"id": "c1"}, {"$set": {"name": "New"}})
+        await outbox.release(db, event_id)
+        totals = await outbox.drain(db)
+        assert totals["events"] == 1
+        assert (await db.drives.find_one({"id": "d1"}))["company_name"] == "New"
+        assert (await db.offers.find_one({"id": "o1"}))["company_name"] == "New"
+        assert (await db.outbox.find_one({"id": event_id}))["status"] == "done"
+
+    mongo.run(check)
+
+
+def test_unreleased_event_is_processed_after_the_prepare_window(mongo):
+    async def check(client, db):
+        await add_company(db, "Old")
+        event_id = await outbox.record_rename(db, "company", "c1")
+        await db.companies.update_one({"id": "c1"}, {"$set": {"name": "New"}})
+        # The handler died before releasing: the event comes due by itself
+        event = await db.outbox.find_one({"id": event_id})
+        overdue = event["available_at"] - timedelta(seconds=outbox.PREPARE_SECONDS)
+        await db.outbox.update_one({"id": event_id}, {"$set": {"available_at": overdue}})
+        assert (await outbox.drain(db))["events"] == 1
+        assert (await db.drives.find_one({"id": "d1"}))["company_name"] == "New"
+
+    mongo.run(check)
+
+
+def test_propagation_is_idempotent(mongo):
+    async def check(client, db):
+        await add_company(db, "Old")
+        await db.companies.update_one({"id": "c1"}, {"$set": {"name": "New"}})
+        for _ in range(2):
+            await outbox.release(db, await outbox.record_rename(db, "company", "c1"))
+        totals = await outbox.drain(db)
+        assert totals["events"] == 2
+        assert totals["modified"] == {"drives": 1, "offers": 1}
+
+    mongo.run(check)
@@ -0,0 +1,99 @@
+"""The in-process search index (no database needed)."""
+import search
+
+STUDENTS = [
+    {"id": "s1", "name": "Rahul Sharma", "roll_number": "21CSE101", "email": "rahul.sharma@college.edu",
+     "department": "CSE"},
+    {"id": "s2", "name": "Rahul Verma", "roll_number": "21CSE102", "email": "rverma@college.edu",
+     "department": "CSE"},
+    {"id": "s3", "name": "Priya Nair", "roll_number": "21ECE201", "email": "sharmaji@college.edu",
+     "department": "ECE"},
+    {"id": "s4", "name": "Ananya Sharmila", "roll_number": "21IT301", "email": "ananya@college.edu",
+     "department": "IT"},
+]
+COMPANIES = [
+    {"id": "c1", "name": "Infosys", "domain": "IT Services", "location": "Bangalore"},
+    {"id": "c2", "name": "Zoho", "domain": "Product", "location": "Chennai"},
+]
+DRIVES = [
+    {"id": "d1", "role": "Software Engineer", "company_name": "Infosys", "date": "2024-06-01"},
+    {"id": "d2", "role": "Data Analyst", "company_name": "Zoho", "date": "2024-07-01"},
+]
+
+
+def build():
+    index = search.SearchIndex()
+    for kind, docs in (("student", STUDENTS), ("company", COMPANIES), ("drive", DRIVES)):
+        for doc in docs:
+            index.upsert(kind, doc)
+    return index
+
+
+def ids(results):
+    return [result["id"] for result in results]
+
+
+def test_prefix_matches():
+    index = build()
+    assert ids(index.search("21cse10")) == ["s1", "s2"]
+    # Shorter completions score higher; names outweigh emails
+    assert ids(index.search("shar")) == ["s1", "s4", "s3"]
+    assert ids(index.search("chen")) == ["c2"]
+
+
+def test_typos_match_through_trigrams():
+    index = build()
+    assert ids(index.search("sofware enginer")) == ["d1"]
+    assert ids(index.search("infosis")) == ["c1"]
+    # Transposed letters, within one edit of "sharma" and "nair"
+    assert ids(index.search("rahul shamra")) == ["s1"]
+    assert ids(index.search("priya nari")) == ["s3"]
+    # Roll numbers are not in the trigram index
+    assert index.search("21cse901") == []
+
+
+def test_ranking():
+    index = build()
+    # Only documents matching every term, when there are any
+    assert ids(index.search("rahul sharma")) == ["s1"]
+    # An exact name beats an email prefix
+    results = index.search("sharma")
+    assert ids(results) == ["s1", "s3"] and results[0]["score"] > results[1]["score"]
+    # With no document matching every term, partial matches rank by their score
+    assert ids(index.search("zoho bangalore")) == ["c2", "c1"]
+    # An exact match beats a typo of it
+    assert index.search("bangalore")[0]["score"] > index.search("bangalroe")[0]["score"]
+    # Equal scores keep index order
+    assert ids(index.search("rahul")) == ["s1", "s2"]
+    assert ids(index.search("sharma", kinds={"company"})) == []
+    assert ids(index.search("zoho", kinds={"drive"})) == []
+
+
+def test_updates_and_deletes_drop_stale_tokens():
+    index = build()
+    index.upsert("student", {**STUDENTS[0], "name": "Rahul Kapoor", "email": "rahul.kapoor@college.edu"})
+    assert ids(index.search("kapoor")) == ["s1"]
+    assert ids(index.search("sharma")) == ["s3"]
+    assert index.search("kapoor")[0]["name"] == "Rahul Kapoor"
+
+    index.remove("company", "c2")
+    assert index.search("zoho") == []
+    assert index.search("chennai") == []
+    postings = index._postings
+    assert "chennai" not in postings.postings and "chennai" not in postings.vocabulary
+    assert not any("chennai" in words for words in postings.trigrams.values())
+
+
+def test_rewrites_reuse_document_slots():
+    index = build()
+    postings = index._postings
+    size = len(postings.entries)
+    for n in range(1000):
+        index.upsert("student", {**STUDENTS[1], "name": f"Rahul Verma {n}"})
+    assert len(postings.entries) == size
+
+    index.remove("drive", "d2")
+    index.upsert("drive", {"id": "d3", "role": "Platform Engineer", "company_name": "Zoho", "date": "2024-08-01"})
+    assert len(postings.entries) == size
+    assert ids(index.search("platform")) == ["d3"]
+    assert postings.stats()["documents"] == len(STUDENTS) + len(COMPANIES) + len(DRIVES)
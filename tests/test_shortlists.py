@@ -0,0 +1,42 @@
+"""Shortlist jobs and the hook that invalidates what they make stale."""
+import fixtures
+import profiles
+import shortlists
+
+CRITERIA = {"min_cgpa": None, "max_package": None, "top": 500, "include_past": True}
+
+
+def test_finished_job_calls_on_done_after_its_writes(mongo):
+    async def check(client, db):
+        data = fixtures.build(students=60, companies=5, drives=8, seed=3)
+        for name, docs in data.items():
+            await db[name].insert_many(docs)
+        finished = []
+        runner = shortlists.ShortlistRunner(max_workers=2, on_done=lambda job: finished.append(job["id"]))
+        job = await runner.start(db, CRITERIA)
+        await runner._task
+
+        assert finished == [job["id"]]
+        stored = await db.shortlist_jobs.find_one({"id": job["id"]})
+        assert stored["status"] == "completed"
+        assert await db.shortlists.count_documents({"job_id": job["id"]}) == len(data["drives"])
+
+        shortlisted = await db.shortlists.find_one({"students.0": {"$exists": True}})
+        profile = await profiles.load_profile(db, shortlisted["students"][0]["student_id"])
+        assert profile["shortlisted_drives"] >= 1
+
+    mongo.run(check)
+
+
+def test_failed_job_calls_on_done(mongo):
+    async def check(client, db):
+        finished = []
+        runner = shortlists.ShortlistRunner(on_done=lambda job: finished.append(job["id"]))
+        # Missing criteria keys make the job fail before it writes anything
+        job = await runner.start(db, {})
+        await runner._task
+
+        assert finished == [job["id"]]
+        assert (await db.shortlist_jobs.find_one({"id": job["id"]}))["status"] == "failed"
+
+    mongo.run(check)
@@ -0,0 +1,78 @@
+"""Dashboard fan-out to SSE subscribers (no database needed)."""
+import asyncio
+import copy
+
+from pymongo.errors import OperationFailure
+
+import metrics
+import stream
+
+
+class StandaloneDatabase:
+    """Refuses change streams, like a standalone mongod"""
+
+    def watch(self, pipeline):
+        raise OperationFailure("The $changeStream stage is only supported on replica sets",
+                               stream.CHANGE_STREAMS_UNSUPPORTED)
+
+
+class Dashboard:
+    def __init__(self):
+        self.state = {"stats": {"total_offers": 1}, "charts": {"role": {"labels": ["SDE"], "values": [1]}}}
+        self.timings = []
+
+    async def snapshot(self):
+        self.timings.append(metrics.current_timings.get())
+        return copy.deepcopy(self.state)
+
+
+async def publish(hub, dashboard, offers):
+    """Change the dashboard and wait for the hub to publish the delta"""
+    published = hub.published
+    dashboard.state["stats"]["total_offers"] = offers
+    hub._dirty.set()
+    for _ in range(200):
+        if hub.published > published:
+            return
+        await asyncio.sleep(0.005)
+    raise AssertionError("no delta published")
+
+
+def test_deltas_fan_out_and_slow_subscribers_resync():
+    async def check():
+        dashboard = Dashboard()
+        # Polling only when asked to, and no debounce
+        hub = stream.DashboardHub(StandaloneDatabase(), dashboard.snapshot, debounce=0, poll_interval=60,
+                                  buffer=2, heartbeat=60)
+        request_timings = metrics.RequestTimings()
+        token = metrics.current_timings.set(request_timings)
+        try:
+            fast = await hub.subscribe()
+            slow = await hub.subscribe()
+        finally:
+            metrics.current_timings.reset(token)
+
+        await publish(hub, dashboard, 2)
+        assert fast.queue.get_nowait() == slow.queue.get_nowait() == {"stats": {"total_offers": 2}}
+
+        # The slow subscriber's queue fills up; the third delta replaces its backlog with a resync
+        for offers in (3, 4, 5):
+            await publish(hub, dashboard, offers)
+            assert fast.queue.get_nowait() == {"stats": {"total_offers": offers}}
+        assert slow.queue.qsize() == 1
+        events = hub.events(slow)
+        assert await events.__anext__() == ("snapshot", dashboard.state)
+        assert await events.__anext__() == ("snapshot", dashboard.state)
+        await events.aclose()
+        assert hub.stats()["resyncs"] == 1
+        assert hub.stats()["mode"] == "polling"
+
+        # Only the first snapshot ran in the subscribing request; the consumer's are charged to none
+        assert dashboard.timings[0] is request_timings
+        assert dashboard.timings[1:] == [None] * 4
+
+        await hub.close()
+        assert fast.queue.get_nowait() is stream.CLOSED
+        assert hub.stats()["subscribers"] == 0 and hub.stats()["mode"] is None
+
+    asyncio.run(check())
@@ -0,0 +1,184 @@
+"""Tenant isolation in both TENANCY_MODEs: one database per tenant and a shared database."""
+import pytest
+from pymongo import InsertOne, ReplaceOne, UpdateOne
+
+import aggregations
+import fixtures
+import indexes
+import mongo as mongo_clients
+import tenancy
+from dates import CODEC_OPTIONS
+
+MODES = ("database", "field")
+TENANTS = ("north", "south")
+
+
+def test_scoped_indexes_lead_with_the_tenant():
+    scoped = tenancy.scoped_indexes(indexes.REQUIRED_INDEXES)
+    assert scoped["students"][0] == ("tenant_id_unique", [("tenant", 1), ("id", 1)], {"unique": True})
+    for name, keys, options in scoped["offers"]:
+        assert keys[0] == ("tenant", 1)
+    # TTL indexes must stay single-field; per-tenant collections need no prefix
+    assert ("processed_at_ttl", [("processed_at", 1)], {"expireAfterSeconds": 7 * 24 * 3600}) in scoped["outbox"]
+    assert scoped["analytics_summary"] == indexes.REQUIRED_INDEXES["analytics_summary"]
+
+
+def run_as_tenants(mongo, mode, fn):
+    """Await ``fn(db, raw)``: ``db`` as the app sees it, ``raw`` a tenant's unscoped database"""
+    async def main(client, _):
+        factory = mongo_clients.MongoClientFactory(mongo.url, mongo.db_name, codec_options=CODEC_OPTIONS)
+        db = tenancy.DatabasePerTenant(factory) if mode == "database" else tenancy.SharedDatabase(factory)
+
+        def raw(tenant):
+            if mode == "database":
+                return factory.database(name=tenancy.database_name(mongo.db_name, tenant))
+            return factory.database()
+
+        try:
+            await fn(db, raw)
+        finally:
+            for tenant in TENANTS:
+                await client.drop_database(tenancy.database_name(mongo.db_name, tenant))
+            factory.close()
+
+    mongo.run(main)
+
+
+async def add_students(db, tenant, names):
+    with tenancy.tenant_scope(tenant):
+        # The same ids for every tenant
+        await db.students.insert_many([
+            {"id": f"s{n}", "name": name, "department": "CSE", "cgpa": 8.0} for n, name in enumerate(names)
+        ])
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_reads_and_writes_stay_within_the_tenant(mongo, mode):
+    async def check(db, raw):
+        await add_students(db, "north", ["Asha", "Ravi"])
+        await add_students(db, "south", ["Meena", "Karthik"])
+
+        with tenancy.tenant_scope("north"):
+            assert [doc["name"] for doc in await db.students.find({}, {"_id": 0}).sort("id").to_list(None)] == [
+                "Asha", "Ravi"]
+            assert "tenant" not in await db.students.find_one({"id": "s0"})
+            assert await db.students.count_documents({}) == 2
+            assert await db.students.estimated_document_count() == 2
+
+            assert (await db.students.update_one({"id": "s0"}, {"$set": {"cgpa": 9.5}})).modified_count == 1
+            assert (await db.students.update_many({}, {"$set": {"department": "IT"}})).modified_count == 2
+            assert (await db.students.delete_one({"id": "s1"})).deleted_count == 1
+
+        with tenancy.tenant_scope("south"):
+            assert await db.students.find({}, {"_id": 0, "name": 1, "cgpa": 1, "department": 1}).sort(
+                "id").to_list(None) == [
+                {"name": "Meena", "cgpa": 8.0, "department": "CSE"},
+                {"name": "Karthik", "cgpa": 8.0, "department": "CSE"},
+            ]
+            assert (await db.students.delete_many({})).deleted_count == 2
+
+        with tenancy.tenant_scope("north"):
+            assert await db.students.find({}, {"_id": 0, "id": 1, "cgpa": 1, "department": 1}).to_list(None) == [
+                {"id": "s0", "cgpa": 9.5, "department": "IT"}]
+        if mode == "field":
+            assert [doc["tenant"] for doc in await raw("north").students.find().to_list(None)] == ["north"]
+
+    run_as_tenants(mongo, mode, check)
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_aggregate_and_bulk_write_stay_within_the_tenant(mongo, mode):
+    async def check(db, raw):
+        await add_students(db, "north", ["Asha", "Ravi"])
+        await add_students(db, "south", ["Meena"])
+
+        with tenancy.tenant_scope("south"):
+            result = await db.students.bulk_write([
+                UpdateOne({"id": "s0"}, {"$set": {"cgpa": 6.0}}),
+                UpdateOne({"id": "s1"}, {"$set": {"cgpa": 6.0}}),
+                ReplaceOne({"id": "s0"}, {"id": "s0", "name": "Meena R", "department": "ECE", "cgpa": 7.0}),
+                InsertOne({"id": "s9", "name": "Divya", "department": "ECE", "cgpa": 9.0}),
+            ])
+            # s1 is only north's
+            assert (result.matched_count, result.inserted_count) == (2, 1)
+            rows = await db.students.aggregate([
+                {"$group": {"_id": "$department", "count": {"$sum": 1}}}, {"$sort": {"_id": 1}},
+            ]).to_list(None)
+            assert rows == [{"_id": "ECE", "count": 2}]
+            docs = await db.students.aggregate([{"$sort": {"id": 1}}, {"$project": {"_id": 0}}]).to_list(None)
+            assert [doc["name"] for doc in docs] == ["Meena R", "Divya"]
+            assert all("tenant" not in doc for doc in docs)
+
+        with tenancy.tenant_scope("north"):
+            docs = await db.students.find({}, {"_id": 0, "name": 1, "cgpa": 1}).sort("id").to_list(None)
+            assert docs == [{"name": "Asha", "cgpa": 8.0}, {"name": "Ravi", "cgpa": 8.0}]
+        if mode == "field":
+            assert await raw("south").students.count_documents({"tenant": "south"}) == 2
+
+    run_as_tenants(mongo, mode, check)
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_out_writes_the_tenants_own_summary(mongo, mode):
+    async def check(db, raw):
+        await add_students(db, "north", ["Asha", "Ravi"])
+        await add_students(db, "south", ["Meena"])
+        pipeline = [{"$group": {"_id": "$department", "offers": {"$sum": 1}}}, {"$out": "placement_ledger"}]
+        for tenant in TENANTS:
+            with tenancy.tenant_scope(tenant):
+                await db.students.aggregate(pipeline).to_list(None)
+
+        for tenant, count in (("north", 2), ("south", 1)):
+            with tenancy.tenant_scope(tenant):
+                assert await db.placement_ledger.find().to_list(None) == [{"_id": "CSE", "offers": count}]
+        if mode == "field":
+            names = await raw("north").list_collection_names()
+            assert {"placement_ledger_north", "placement_ledger_south"} <= set(names)
+            assert "placement_ledger" not in names
+            with tenancy.tenant_scope("north"), pytest.raises(ValueError):
+                db.students.aggregate([{"$out": "students"}])
+
+    run_as_tenants(mongo, mode, check)
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_lookup_joins_only_the_tenants_documents_when_ids_collide(mongo, mode):
+    async def check(db, raw):
+        # Loaded from the same seed (as with a fixed SEED_RANDOM_SEED): every id exists for both tenants
+        data = fixtures.build(students=40, companies=5, drives=4, seed=7)
+        for tenant in TENANTS:
+            with tenancy.tenant_scope(tenant):
+                await fixtures.load(db, "sample", students=40, companies=5, drives=4, seed=7, transaction=False)
+        with tenancy.tenant_scope("south"):
+            await db.students.update_many({}, {"$set": {"department": "SOUTH"}})
+
+        placed = {offer["student_id"] for offer in data["offers"]}
+        departments = {}
+        for student in data["students"]:
+            if student["id"] in placed:
+                departments[student["department"]] = departments.get(student["department"], 0) + 1
+
+        with tenancy.tenant_scope("north"):
+            chart = await aggregations.department_placements(db)
+            assert dict(zip(chart["labels"], chart["values"])) == departments
+            joined = await db.offers.aggregate([
+                {"$limit": 1},
+                {"$lookup": {"from": "students", "localField": "student_id", "foreignField": "id", "as": "student"}},
+            ]).to_list(None)
+            assert len(joined[0]["student"]) == 1
+            assert joined[0]["student"][0]["department"] != "SOUTH"
+            assert "tenant" not in joined[0]["student"][0]
+            let_joined = await db.offers.aggregate([
+                {"$limit": 1},
+                {"$lookup": {"from": "students", "let": {"student": "$student_id"}, "as": "student", "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$id", "$$student"]}}},
+                ]}},
+            ]).to_list(None)
+            assert len(let_joined[0]["student"]) == 1
+            assert let_joined[0]["student"][0]["department"] != "SOUTH"
+
+        with tenancy.tenant_scope("south"):
+            chart = await aggregations.department_placements(db)
+            assert dict(zip(chart["labels"], chart["values"])) == {"SOUTH": len(placed)}
+
+    run_as_tenants(mongo, mode, check)
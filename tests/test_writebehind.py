@@ -0,0 +1,53 @@
+"""Write-behind batching of inserts."""
+import asyncio
+
+from writebehind import WriteBehindBuffer
+
+
+def test_batches_concurrent_submits(mongo):
+    async def check(client, db):
+        flushed = []
+
+        async def on_flushed(docs, contexts):
+            flushed.append(len(docs))
+
+        buffer = WriteBehindBuffer(db, "offers", max_batch=50, max_delay=0.05, on_flushed=on_flushed)
+        await asyncio.gather(*(buffer.submit({"id": str(i)}) for i in range(120)))
+        await buffer.close()
+        assert await db.offers.count_documents({}) == 120
+        assert sum(flushed) == 120
+        assert buffer.stats()["batches"] < 120
+
+    mongo.run(check)
+
+
+def test_before_write_refreshes_and_refuses(mongo):
+    async def check(client, db):
+        await db.companies.insert_one({"id": "c1", "name": "Renamed elsewhere"})
+
+        async def before_write(docs, contexts):
+            # The shape of server.offers_prepared: one $in read for the whole batch
+            ids = [doc["company_id"] for doc in docs]
+            names = {doc["id"]: doc["name"] async for doc in db.companies.find({"id": {"$in": ids}})}
+            refused = {}
+            for index, doc in enumerate(docs):
+                if doc["company_id"] not in names:
+                    refused[index] = LookupError("Company not found")
+                else:
+                    doc["company_name"] = names[doc["company_id"]]
+            return refused
+
+        buffer = WriteBehindBuffer(db, "offers", max_delay=0.05, before_write=before_write)
+        results = await asyncio.gather(
+            buffer.submit({"id": "o1", "company_id": "c1", "company_name": "Cached name"}),
+            buffer.submit({"id": "o2", "company_id": "deleted", "company_name": "Cached name"}),
+            return_exceptions=True,
+        )
+        await buffer.close()
+        assert results[0]["company_name"] == "Renamed elsewhere"
+        assert isinstance(results[1], LookupError)
+        stored = await db.offers.find({}, {"_id": 0}).to_list(None)
+        assert stored == [{"id": "o1", "company_id": "c1", "company_name": "Renamed elsewhere"}]
+        assert buffer.stats()["refused"] == 1
+
+    mongo.run(check)